@@ -0,0 +1,161 @@
+import asyncio
+
+import aiohttp
+from tqdm import tqdm
+
+import scraper
+from checkpoint import Checkpoint, STATUS_FAILED
+from metrics import metrics
+from parse_pool import cards_job, listing_job
+from rate_limiter import AdaptiveRateLimiter, failure_signal
+from response_cache import cache_from_args
+from scraper import (
+    RATE_LIMIT,
+    RETRIES,
+    TIMEOUT,
+    build_search_url,
+    configure_parsing,
+    day_fingerprint,
+    day_resume_plan,
+    defer_pages,
+    headers,
+    iter_days,
+    load_results,
+    pages_from_listing,
+    parse_args,
+    record_day,
+    save_results,
+)
+
+# --- Configuration ---
+# Limite globale de requêtes simultanées, tous jours confondus
+MAX_CONCURRENCY = 16
+
+limiter = AdaptiveRateLimiter(initial_rate=RATE_LIMIT)
+
+
+async def fetch_html(session, semaphore, url):
+    cache = scraper.cache
+    cached = cache.get(url)
+    if cached is not None:
+        return cached
+    if cache.replay:
+        print(f"[fetch_html] Absente du cache (replay) : {url}")
+        return None
+    for attempt in range(RETRIES):
+        async with semaphore:
+            await limiter.acquire_async()
+            try:
+                with metrics.span("requete"):
+                    async with session.get(url) as res:
+                        res.raise_for_status()
+                        html = await res.text()
+                limiter.on_success()
+                cache.put(url, html)
+                return html
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[fetch_html] Tentative {attempt+1}/{RETRIES} - Erreur {url}: {e}")
+                metrics.inc("reessais")
+                status, retry_after = failure_signal(e)
+                limiter.on_failure(status, retry_after)
+        await asyncio.sleep(limiter.retry_delay(attempt, retry_after))
+    return None
+
+
+async def parse_async(job, *args):
+    parse_pool = scraper.parse_pool
+    if parse_pool.executor is None:
+        # Analyse bloquante : on la sort de la boucle d'événements
+        return await asyncio.to_thread(job, *args)
+    return await asyncio.wrap_future(parse_pool.submit(job, *args))
+
+
+async def probe_day_async(session, semaphore, date_str):
+    html = await fetch_html(session, semaphore, build_search_url(date_str, 1))
+    if html is None:
+        return 1, 0, None
+    return pages_from_listing(await parse_async(listing_job, html))
+
+
+async def fetch_page_async(session, semaphore, page, date_str, progress):
+    html = await fetch_html(session, semaphore, build_search_url(date_str, page))
+    progress.update(1)
+    if html is None:
+        return None
+    return await parse_async(cards_job, html)
+
+
+async def scrape_day_async(session, semaphore, date_str, progress, checkpoint=None, force=False):
+    plan = day_resume_plan(date_str, checkpoint, force)
+    if plan is None:
+        print(f"⏭️  {date_str} déjà terminé, ignoré.")
+        return 0, 0
+    if plan:
+        entry = checkpoint.get("jour", date_str)
+        max_pages, fingerprint = entry["pages"], entry.get("empreinte")
+        pages, all_data, requests_done = plan, load_results(date_str), 0
+        print(f"🔁 {date_str} : reprise de {len(pages)} pages en échec sur {max_pages}.")
+    else:
+        max_pages, total_results, all_data = await probe_day_async(session, semaphore, date_str)
+        progress.total += 1
+        progress.update(1)
+        if all_data is None:
+            print(f"❌ Impossible de récupérer la première page pour {date_str}")
+            if checkpoint:
+                checkpoint.record("jour", date_str, STATUS_FAILED)
+            scraper.retry_queue.push({"type": "jour", "jour": date_str})
+            return 1, 0
+        print(f"🔍 {date_str} : {total_results} résultats trouvés sur {max_pages} pages.")
+        fingerprint = day_fingerprint(total_results, all_data)
+        pages, requests_done = range(2, max_pages + 1), 1
+    progress.total += len(pages)
+    progress.refresh()
+    results = await asyncio.gather(*(
+        fetch_page_async(session, semaphore, page, date_str, progress)
+        for page in pages
+    ))
+    failed_pages = []
+    for page, page_data in zip(pages, results):
+        if page_data is None:
+            failed_pages.append(page)
+        else:
+            all_data.extend(page_data)
+    save_results(all_data, date_str)
+    record_day(checkpoint, date_str, max_pages, all_data, failed_pages, fingerprint)
+    defer_pages(date_str, failed_pages, max_pages)
+    return requests_done + len(pages), len(all_data)
+
+
+async def loop_days_async(start_date_str, end_date_str, max_concurrency=MAX_CONCURRENCY,
+                          checkpoint=None, force=False):
+    """
+    Équivalent asynchrone de loop_days : une seule session (un seul pool de
+    connexions), une limite globale de concurrence, et toutes les pages de
+    tous les jours de l'intervalle planifiées ensemble.
+    """
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=max_concurrency)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        with tqdm(total=0, desc="📄 Pages") as progress:
+            results = await asyncio.gather(*(
+                scrape_day_async(session, semaphore, date_str, progress, checkpoint, force)
+                for date_str in iter_days(start_date_str, end_date_str)
+            ))
+    total_pages = sum(pages for pages, _ in results)
+    total_records = sum(records for _, records in results)
+    print(f'📊 Total : {total_records} données extraites sur {total_pages} pages.')
+    if scraper.cache.enabled:
+        print(f"🗄️  Cache : {scraper.cache.stats()}")
+    metrics.export(scraper.DAILY_DIR, "scraper_async")
+    return total_pages, total_records
+
+
+if __name__ == "__main__":
+    args = parse_args(default_workers=MAX_CONCURRENCY)
+    scraper.cache = cache_from_args(args)
+    with configure_parsing(args.parser, args.parse_workers), Checkpoint(args.checkpoint) as checkpoint, \
+            scraper.cache:
+        asyncio.run(loop_days_async(args.start, args.end, args.workers, checkpoint, args.force))
+        # Reprise différée en mode threads : il ne reste en général que quelques pages
+        scraper.drain_retry_queue(checkpoint)
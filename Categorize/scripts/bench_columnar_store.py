@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from columnar_store import backend, parse_montant, read_columns, update_store
+from consultation_index import ConsultationIndex, record_key
+
+# Compare, sur une année synthétique d'attributed_*.json (indent=2 comme
+# scraper.py), le parcours JSON actuel au stockage en colonnes :
+#   - chargement complet d'une année (montant, acheteur, nature) ;
+#   - montants d'une nature sur un trimestre (projection + filtres).
+# Vérifie aussi que les deux lectures donnent les mêmes montants.
+# Usage : python bench_columnar_store.py --par-jour 300 --annee 2024
+
+NATURES = [f"Nature {i}" for i in range(40)]
+ACHETEURS = [f"COMMUNE {i}" for i in range(500)]
+WORDS = "fourniture materiel bureau travaux entretien reseau eclairage achat produits nettoyage location".split()
+
+
+def generate(workdir, year, per_day, seed=1):
+    rng = random.Random(seed)
+    daily_dir = os.path.join(workdir, "data_daily")
+    os.makedirs(daily_dir)
+    consult_path = os.path.join(daily_dir, "consultations.ndjson")
+    day = date(year, 1, 1)
+    n = 0
+    with open(consult_path, "w", encoding="utf-8") as consultations:
+        while day.year == year:
+            records = []
+            for _ in range(per_day):
+                n += 1
+                record = {
+                    "reference": f"{n}/{year}",
+                    "objet": " ".join(rng.sample(WORDS, 5)),
+                    "acheteur": rng.choice(ACHETEURS),
+                    "date_publication": day.strftime("%d/%m/%Y"),
+                    "nombre_devis": str(rng.randint(1, 9)),
+                    "attribue": True,
+                    "entreprise_attributaire": f"SOCIETE {rng.randint(1, 2000)}",
+                    "montant": f"{rng.randint(1000, 500000)},00 MAD",
+                    "id_consultation": n,
+                }
+                records.append(record)
+                if rng.random() < 0.9:  # 10 % sans consultation détaillée
+                    consultations.write(json.dumps({
+                        "référence": record["reference"], "objet": record["objet"],
+                        "acheteur": record["acheteur"], "lieu": "RABAT", "catégorie": "Travaux",
+                        "nature": rng.choice(NATURES), "articles": [],
+                    }, ensure_ascii=False) + "\n")
+            with open(os.path.join(daily_dir, f"attributed_{day.isoformat()}.json"), "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            day += timedelta(days=1)
+    return daily_dir, consult_path, n
+
+
+def json_scan(daily_dir, index, date_from=None, date_to=None, nature=None):
+    """Lecture actuelle : json.load de chaque jour, jointure pour la nature."""
+    montants, acheteurs, natures = [], [], []
+    for filename in sorted(os.listdir(daily_dir)):
+        if not (filename.startswith("attributed_") and filename.endswith(".json")):
+            continue
+        day = filename[len("attributed_"):-len(".json")]
+        if (date_from and day < date_from) or (date_to and day > date_to):
+            continue
+        with open(os.path.join(daily_dir, filename), "r", encoding="utf-8") as f:
+            for record in json.load(f):
+                match = index.get(record_key(record))
+                record_nature = match["nature"] if match else None
+                if nature is not None and record_nature != nature:
+                    continue
+                montants.append(parse_montant(record["montant"]))
+                acheteurs.append(record["acheteur"])
+                natures.append(record_nature)
+    return np.array(montants), acheteurs, natures
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs stockage en colonnes")
+    parser.add_argument("--annee", type=int, default=2024)
+    parser.add_argument("--par-jour", type=int, default=300, help="Enregistrements attribués par jour")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_columnar_")
+    daily_dir, consult_path, total = generate(workdir, args.annee, args.par_jour)
+    store_dir = os.path.join(workdir, "store")
+    index_path = os.path.join(workdir, "consultations_index.sqlite")
+    print(f"📦 {total} enregistrements générés dans {daily_dir}")
+
+    build_s, _ = timed(lambda: update_store(daily_dir, store_dir, index_path, [consult_path]))
+    print(f"🧊 Stockage {backend()} construit en {build_s:.1f} s")
+
+    quarter = (f"{args.annee}-04-10", f"{args.annee}-07-09")
+    with ConsultationIndex(index_path) as index:
+        json_full_s, (json_montants, _, _) = timed(lambda: json_scan(daily_dir, index))
+        json_q_s, (json_q, _, _) = timed(lambda: json_scan(daily_dir, index, *quarter, nature=NATURES[0]))
+    store_full_s, full = timed(lambda: read_columns(store_dir, ["montant", "acheteur", "nature"]))
+    store_q_s, q = timed(lambda: read_columns(store_dir, ["montant"], *quarter, natures=[NATURES[0]]))
+
+    # Même contenu, à l'ordre près (le stockage regroupe chaque mois par nature)
+    assert len(full["montant"]) == len(json_montants) == total
+    assert np.allclose(np.sort(full["montant"]), np.sort(json_montants))
+    assert np.allclose(np.sort(q["montant"]), np.sort(json_q))
+    print(f"✅ Mêmes montants ({total} sur l'année, {len(json_q)} pour {NATURES[0]} du {quarter[0]} au {quarter[1]})")
+
+    print(f"\n=== Lecture d'une année ({total} enregistrements) ===")
+    print(f"{'JSON + jointure':<28} {json_full_s:7.2f} s")
+    print(f"{'colonnes (3 colonnes)':<28} {store_full_s:7.2f} s  (x{json_full_s / store_full_s:.1f})")
+    print("=== Une nature, un trimestre ===")
+    print(f"{'JSON + jointure':<28} {json_q_s:7.2f} s")
+    print(f"{'colonnes (filtres)':<28} {store_q_s:7.2f} s  (x{json_q_s / store_q_s:.1f})")
+    print(f"📁 {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import async_scraper
+import scraper
+from http_client import HttpClient
+from mock_server import LISTING_PATH, MockServer
+from rate_limiter import AdaptiveRateLimiter
+from retry_queue import RetryQueue
+
+# Compare le débit du moteur à threads (loop_days) et du moteur asyncio
+# (loop_days_async) sur le même intervalle de dates, contre le faux site local
+# de mock_server.py (comme bench_scrapers.py) : aucune requête vers le vrai
+# site, et sorties, file différée comprise, dans un dossier temporaire par moteur.
+# Usage : python bench_engines.py 01/07/2025 14/07/2025 --concurrency 16 --latence 80
+
+
+def attributed_outputs(workdir):
+    """Fichier attributed_*.json -> ses cartes, sans tenir compte de l'ordre des pages."""
+    outputs = {}
+    for name in sorted(os.listdir(workdir)):
+        if name.startswith("attributed_") and name.endswith(".json"):
+            with open(os.path.join(workdir, name), "r", encoding="utf-8") as f:
+                # Le moteur à threads range les pages dans leur ordre d'arrivée
+                outputs[name] = sorted(json.dumps(card, sort_keys=True) for card in json.load(f))
+    return outputs
+
+
+def run(label, args, server, func):
+    workdir = tempfile.mkdtemp(prefix=f"bench_{label}_")
+    scraper.SEARCH_URL = server.url + LISTING_PATH
+    scraper.window_search_url.cache_clear()
+    scraper.DAILY_DIR = workdir
+    scraper.MAX_WORKERS = args.workers
+    scraper.client = HttpClient(pool_size=args.workers, headers=scraper.headers)
+    # Même limiteur de départ pour les deux moteurs
+    scraper.limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.max_rate)
+    async_scraper.limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.max_rate)
+    scraper.retry_queue = RetryQueue(os.path.join(workdir, "dead_letter_scraper.jsonl"),
+                                     rounds=scraper.DEFERRED_ROUNDS, base_delay=args.deferred_delay)
+    before = server.stats()
+    start = time.perf_counter()
+    with scraper.configure_parsing(args.parser, args.parse_workers):
+        pages, records = func()
+    elapsed = time.perf_counter() - start
+    after = server.stats()
+    return {
+        "moteur": label,
+        "secondes": elapsed,
+        "pages": pages,
+        "requetes": sum(after.get(s, 0) - before.get(s, 0) for s in after),
+        "enregistrements": records,
+        "pages_par_s": pages / elapsed if elapsed else 0.0,
+        "dossier": workdir,
+    }
+
+
+def run_async(args):
+    result = asyncio.run(async_scraper.loop_days_async(args.start, args.end, args.concurrency))
+    # Reprise différée en mode threads, comme async_scraper.py (loop_days la fait aussi)
+    scraper.drain_retry_queue()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threads vs asyncio contre le faux site local")
+    parser.add_argument("start", nargs="?", default="01/07/2025", help="Date de début JJ/MM/AAAA")
+    parser.add_argument("end", nargs="?", default="07/07/2025", help="Date de fin JJ/MM/AAAA")
+    parser.add_argument("--concurrency", type=int, default=async_scraper.MAX_CONCURRENCY)
+    parser.add_argument("--workers", type=int, default=scraper.MAX_WORKERS, help="Threads I/O (moteur à threads)")
+    parser.add_argument("--rate", type=float, default=50.0, help="Débit initial (requêtes/s)")
+    parser.add_argument("--max-rate", type=float, default=200.0, help="Débit maximal du limiteur")
+    parser.add_argument("--parser", default="lxml", help="Backend d'analyse HTML")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Processus d'analyse HTML")
+    parser.add_argument("--deferred-delay", type=float, default=1.0,
+                        help="Délai avant le 1er tour de reprise différée (s)")
+    parser.add_argument("--latence", type=float, default=50, help="Latence moyenne du serveur (ms)")
+    parser.add_argument("--erreurs", type=float, default=0.0, help="Part de réponses 503 (0-1)")
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latence / 1000, error_rate=args.erreurs) as server:
+        results = [
+            run("threads", args, server, lambda: scraper.loop_days(args.start, args.end)),
+            run("asyncio", args, server, lambda: run_async(args)),
+        ]
+
+    print(f"\n=== Comparaison des moteurs ({server.url}, latence {args.latence} ms) ===")
+    for r in results:
+        print(
+            f"{r['moteur']:<8} {r['secondes']:8.1f} s | {r['pages']:5d} pages | {r['requetes']:5d} req | "
+            f"{r['enregistrements']:6d} enregistrements | {r['pages_par_s']:6.2f} pages/s "
+            f"→ {r['dossier']}"
+        )
+    threads, asyncio_ = results
+    if asyncio_["secondes"]:
+        print(f"Accélération asyncio : x{threads['secondes'] / asyncio_['secondes']:.2f}")
+    if attributed_outputs(threads["dossier"]) == attributed_outputs(asyncio_["dossier"]):
+        print("✅ Mêmes cartes dans les attributed_*.json des deux moteurs")
+    else:
+        print("❌ Cartes différentes dans les attributed_*.json des deux moteurs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import time
+
+import numpy as np
+
+from interval_index import NO_BIN, IntervalIndex, config_intervals
+
+# Compare l'ancienne classification des montants à interval_index.py :
+#   - intervalles de intervals.json : parcours linéaire de get_interval
+#     (copié ci-dessous) contre bisect (un montant) et searchsorted (colonne) ;
+#   - classes par percentiles : boucle sur les seuils de
+#     HiData/categorize_with_diffrent_range.py contre searchsorted.
+# Vérifie que les classes obtenues sont identiques, puis affiche montants/s.
+# Usage : python bench_interval_index.py --montants 5000000 --ancien 300000
+
+DEFAULT_CONFIG = [
+    {"min": 0, "max": 2000, "step": 100},
+    {"min": 2000, "max": 5000, "step": 500},
+    {"min": 5000, "max": 10000, "step": 1000},
+    {"min": 10000, "max": 100000, "step": 10000},
+    {"min": 100000, "max": 1000000, "step": 50000},
+]
+# Blocs qui se chevauchent, pas flottants, trou entre 30 et 40 : le premier intervalle doit l'emporter
+ODD_CONFIG = [
+    {"min": 0, "max": 10, "step": 2.5},
+    {"min": 5, "max": 30, "step": 5},
+    {"min": 40, "max": 41, "step": 0.1},
+]
+
+
+def old_intervals(config):
+    """Ancien charger_intervalles : pas cumulés dans une boucle while."""
+    intervalles = []
+    for bloc in config:
+        min_, max_, step = bloc["min"], bloc["max"], bloc["step"]
+        val = min_
+        while val < max_:
+            intervalles.append((val, val + step))
+            val += step
+    return intervalles
+
+
+def old_get_interval(montant, intervalles):
+    for interval in intervalles:
+        if interval[0] <= montant < interval[1]:
+            return f"{interval[0]}-{interval[1]}"
+    return None
+
+
+def old_percentile_bins(amounts, r):
+    """Répartition de categorize_with_diffrent_range.py (indices de catégorie)."""
+    thresholds = np.percentile(amounts, [100 / r * i for i in range(1, r)])
+    indices = []
+    for amount in amounts:
+        category_index = 0
+        for i, threshold in enumerate(thresholds):
+            if amount <= threshold:
+                category_index = i
+                break
+            category_index = r - 1
+        indices.append(category_index)
+    return indices
+
+
+def generate(n, seed=1):
+    """Montants log-uniformes de 1 à 2 M MAD, avec des bornes exactes, des hors-plage et des NaN."""
+    rng = np.random.default_rng(seed)
+    montants = np.round(10 ** rng.uniform(0, 6.3, n), 2)
+    exact = rng.random(n) < 0.05
+    montants[exact] = rng.choice([0, 100, 2000, 5000, 99999.99, 100000, 1000000], int(exact.sum()))
+    montants[rng.random(n) < 0.01] = -1.0
+    montants[rng.random(n) < 0.01] = np.nan
+    return montants
+
+
+def check(config, montants):
+    """Même classe que le parcours linéaire, sur les mêmes intervalles."""
+    index = IntervalIndex.from_config(config)
+    intervalles = config_intervals(config)
+    bins = index.lookup_many(montants)
+    for montant, bin_id in zip(montants.tolist(), bins.tolist()):
+        expected = old_get_interval(montant, intervalles)
+        assert index.label_of(montant) == expected, montant
+        assert index.label(bin_id) == expected, montant
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la classification des montants")
+    parser.add_argument("--montants", type=int, default=5000000, help="Montants classés par searchsorted")
+    parser.add_argument("--ancien", type=int, default=300000, help="Montants classés par les boucles d'origine")
+    parser.add_argument("--classes", type=int, default=25, help="Nombre de classes par percentiles")
+    args = parser.parse_args()
+
+    # Pas entiers : mêmes intervalles, donc mêmes libellés, que l'ancien charger_intervalles
+    assert config_intervals(DEFAULT_CONFIG) == old_intervals(DEFAULT_CONFIG)
+    check(DEFAULT_CONFIG, generate(50000, seed=2))
+    odd = np.concatenate([generate(20000, seed=3) / 25000, np.arange(0, 45, 0.05)])
+    check(ODD_CONFIG, odd)
+    print("✅ Mêmes intervalles que get_interval (configuration par défaut et blocs qui se chevauchent)")
+
+    montants = generate(args.montants)
+    sample = montants[:args.ancien]
+    sample_list = sample.tolist()
+    index = IntervalIndex.from_config(DEFAULT_CONFIG)
+    intervalles = old_intervals(DEFAULT_CONFIG)
+
+    old_s, old_labels = timed(lambda: [old_get_interval(m, intervalles) for m in sample_list])
+    bisect_s, bisect_bins = timed(lambda: [index.lookup(m) for m in sample_list])
+    column_s, column_bins = timed(lambda: index.lookup_many(montants))
+    assert [index.label(b) for b in bisect_bins] == old_labels
+    assert column_bins[:args.ancien].tolist() == bisect_bins
+    classified = int((column_bins != NO_BIN).sum())
+
+    amounts = np.round(10 ** np.random.default_rng(4).uniform(2, 6, args.ancien), 2).tolist()
+    old_pct_s, old_pct = timed(lambda: old_percentile_bins(amounts, args.classes))
+    pct_s, pct = timed(lambda: IntervalIndex.from_percentiles(amounts, args.classes).lookup_many(amounts))
+    assert pct.tolist() == old_pct
+    ties = [float(a) for a in np.random.default_rng(5).integers(0, 8, 5000)]  # seuils égaux
+    assert IntervalIndex.from_percentiles(ties, 10).lookup_many(ties).tolist() == old_percentile_bins(ties, 10)
+    print(f"✅ Mêmes classes par percentiles ({args.classes} classes) que categorize_with_diffrent_range.py")
+
+    print(f"\n=== intervals.json : {len(index)} intervalles ===")
+    print(f"{'get_interval (linéaire)':<26} {args.ancien:>9} montants {old_s:7.2f} s  {args.ancien / old_s:>13,.0f} montants/s")
+    print(f"{'lookup (bisect)':<26} {args.ancien:>9} montants {bisect_s:7.2f} s  "
+          f"{args.ancien / bisect_s:>13,.0f} montants/s  (x{old_s / bisect_s:.1f})")
+    print(f"{'lookup_many (searchsorted)':<26} {args.montants:>9} montants {column_s:7.2f} s  "
+          f"{args.montants / column_s:>13,.0f} montants/s  ({classified} classés)")
+    print(f"=== Percentiles : {args.classes} classes ===")
+    print(f"{'boucle sur les seuils':<26} {args.ancien:>9} montants {old_pct_s:7.2f} s  {args.ancien / old_pct_s:>13,.0f} montants/s")
+    print(f"{'from_percentiles + search':<26} {args.ancien:>9} montants {pct_s:7.2f} s  "
+          f"{args.ancien / pct_s:>13,.0f} montants/s  (x{old_pct_s / pct_s:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+
+from bench_parsers import load
+from parse_pool import ParsePool, cards_job, pipeline
+
+# Mesure le gain de l'étage d'analyse en processus séparés : des threads I/O
+# simulés (latence réseau fixe) alimentent ParsePool avec N workers, comparé à
+# l'analyse sous le GIL dans le processus principal (parse_workers=0).
+# Usage : python bench_parse_pool.py --pages 400 --io-workers 8 --latency 0.05
+
+
+def make_listing(cards_per_page=50):
+    listing = load("resultats_page.html")
+    head, _, tail = listing.partition("<!-- Carte attribuée complète -->")
+    cards, sep, end = tail.partition("</main>")
+    return head + cards * (cards_per_page // 6 + 1) + sep + end
+
+
+def run(html, pages, io_workers, parse_workers, parser_name, latency):
+    def fetch(page):
+        time.sleep(latency)
+        return html
+
+    with ParsePool(parse_workers, parser_name) as pool:
+        if parse_workers:
+            # Démarre les processus avant de chronométrer
+            pool.submit(cards_job, html).result()
+        start = time.perf_counter()
+        records = 0
+        for _, ok, cards in pipeline(range(pages), fetch, lambda body, page: pool.submit(cards_job, body), io_workers):
+            records += len(cards)
+        return time.perf_counter() - start, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pool de processus d'analyse")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--io-workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence réseau simulée (s)")
+    parser.add_argument("--parser", default="bs4")
+    args = parser.parse_args()
+
+    html = make_listing()
+    cpus = os.cpu_count() or 1
+    configs = sorted({0, 1, max(1, cpus // 2), cpus})
+    print(f"{cpus} cœurs, {args.pages} pages, {args.io_workers} threads I/O, parseur {args.parser}\n")
+
+    baseline = None
+    for parse_workers in configs:
+        elapsed, records = run(html, args.pages, args.io_workers, parse_workers, args.parser, args.latency)
+        baseline = baseline or elapsed
+        label = "sans processus (GIL)" if parse_workers == 0 else f"{parse_workers} processus"
+        print(f"{label:<22} {elapsed:7.2f} s | {args.pages / elapsed:7.1f} pages/s | "
+              f"x{baseline / elapsed:.2f} | {records} cartes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import time
+
+from html_parsers import PARSERS
+
+# Vérifie que tous les backends d'analyse produisent les mêmes dictionnaires
+# sur les fixtures, puis mesure leur débit en pages/s.
+# Usage : python bench_parsers.py --repeat 200
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LISTING_FIXTURES = ["resultats_page.html"]
+DETAIL_FIXTURES = ["detail_page.html", "detail_vide.html", "detail_incomplet.html"]
+
+
+def load(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def check_equivalence(listings, details):
+    reference = PARSERS["bs4"]
+    for name, parser in PARSERS.items():
+        for fixture, html in listings.items():
+            expected = reference.parse_listing(html)
+            got = parser.parse_listing(html)
+            assert got == expected, f"{name} diffère de bs4 sur {fixture}:\n{got}\n!=\n{expected}"
+        for fixture, html in details.items():
+            expected = reference.parse_detail(html, 1)
+            got = parser.parse_detail(html, 1)
+            assert got == expected, f"{name} diffère de bs4 sur {fixture}:\n{got}\n!=\n{expected}"
+    print(f"✅ {len(PARSERS)} backends équivalents sur {len(listings) + len(details)} fixtures")
+
+
+def bench(func, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    elapsed = time.perf_counter() - start
+    return repeat * len(pages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends d'analyse HTML")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    listings = {name: load(name) for name in LISTING_FIXTURES}
+    details = {name: load(name) for name in DETAIL_FIXTURES}
+    check_equivalence(listings, details)
+
+    # Page de liste réaliste : 50 cartes comme avec PAGE_SIZE = 50
+    listing = load("resultats_page.html")
+    head, _, tail = listing.partition("<!-- Carte attribuée complète -->")
+    cards, sep, end = tail.partition("</main>")
+    full_listing = head + cards * 9 + sep + end
+
+    print(f"\n{'backend':<8} {'liste pages/s':>14} {'détail pages/s':>15}")
+    results = {}
+    for name, html_parser in PARSERS.items():
+        listing_rate = bench(html_parser.parse_listing, [full_listing], args.repeat)
+        detail_rate = bench(lambda html: html_parser.parse_detail(html, 1), list(details.values()), args.repeat)
+        results[name] = (listing_rate, detail_rate)
+        print(f"{name:<8} {listing_rate:14.1f} {detail_rate:15.1f}")
+
+    base_listing, base_detail = results["bs4"]
+    for name, (listing_rate, detail_rate) in results.items():
+        if name != "bs4":
+            print(f"{name} vs bs4 : x{listing_rate / base_listing:.1f} (liste), x{detail_rate / base_detail:.1f} (détail)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import scraper
+import scraper_details
+from checkpoint import Checkpoint
+from consultation_index import output_files
+from http_client import HttpClient
+from metrics import metrics
+from mock_server import LISTING_PATH, MockServer
+from rate_limiter import AdaptiveRateLimiter
+from retry_queue import RetryQueue
+
+# Test de charge hors ligne : lance mock_server.MockServer, y branche
+# scraper.py (pages de résultats) puis scraper_details.py (pages de détail),
+# et mesure requêtes/s, pages/s, latences p50/p99 et réessais.
+# Usage : python bench_scrapers.py 01/07/2025 14/07/2025 --workers 8 --rate 50 --erreurs 0.05
+#         python bench_scrapers.py 01/07/2025 14/07/2025 --rafale-toutes 5 --rafale-duree 1
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def timed(client, latencies):
+    # Mesure côté client de chaque requête (réessais compris)
+    get = client.get
+
+    def timed_get(url, timeout=None):
+        start = time.perf_counter()
+        try:
+            return get(url, timeout=timeout)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    client.get = timed_get
+    return client
+
+
+def measure(label, server, run):
+    # Les métriques exportées (metrics_*.prom/json) ne couvrent que cette étape
+    metrics.reset()
+    latencies = []
+    before = server.stats()
+    start = time.perf_counter()
+    units = run(latencies)
+    elapsed = time.perf_counter() - start
+    after = server.stats()
+    statuses = {str(s): after.get(s, 0) - before.get(s, 0) for s in after if after.get(s, 0) - before.get(s, 0)}
+    requests_count = sum(statuses.values())
+    return {
+        "etape": label,
+        "secondes": round(elapsed, 2),
+        "requetes": requests_count,
+        "requetes_par_s": round(requests_count / elapsed, 2) if elapsed else 0.0,
+        "unites": units,
+        "unites_par_s": round(units / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "reessais": requests_count - statuses.get("200", 0),
+        "statuts": statuses,
+    }
+
+
+def run_listing(args, server, workdir, latencies):
+    scraper.SEARCH_URL = server.url + LISTING_PATH
+    scraper.window_search_url.cache_clear()
+    scraper.DAILY_DIR = workdir
+    scraper.MAX_WORKERS = args.workers
+    scraper.client = timed(HttpClient(pool_size=args.workers, headers=scraper.headers), latencies)
+    scraper.limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.max_rate)
+    scraper.retry_queue = RetryQueue(os.path.join(workdir, "dead_letter_scraper.jsonl"),
+                                     rounds=scraper.DEFERRED_ROUNDS, base_delay=args.deferred_delay)
+    with scraper.configure_parsing(args.parser, args.parse_workers), \
+            Checkpoint(os.path.join(workdir, "checkpoint_scraper.jsonl")) as checkpoint:
+        if args.window_days > 1:
+            requests_done, _ = scraper.loop_windows(args.start, args.end, checkpoint,
+                                                    window_days=args.window_days)
+        else:
+            requests_done, _ = scraper.loop_days(args.start, args.end, checkpoint)
+    # Pages de résultats téléchargées (hors réessais)
+    return requests_done
+
+
+def run_details(args, server, workdir, latencies):
+    ids = scraper_details.attributed_ids(workdir)[:args.max_ids]
+    scraper_details.BASE_URL = server.url + "/bdc/entreprise/consultation/show/"
+    scraper_details.DAILY_DIR = workdir
+    scraper_details.output_path = os.path.join(workdir, "consultations.ndjson")
+    scraper_details.consult_files = output_files(scraper_details.output_path)
+    scraper_details.checkpoint_path = os.path.join(workdir, "checkpoint_details.jsonl")
+    scraper_details.dead_letter_path = os.path.join(workdir, "dead_letter_details.jsonl")
+    scraper_details.consult_index_path = os.path.join(workdir, "consultations_index.sqlite")
+    scraper_details.MAX_WORKERS = args.workers
+    scraper_details.DEFERRED_DELAY = args.deferred_delay
+    scraper_details.client = timed(HttpClient(pool_size=args.workers, headers=scraper_details.HEADERS), latencies)
+    scraper_details.limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.max_rate)
+    scraper_details.main(ids, parser_name=args.parser, parse_workers=args.parse_workers,
+                         max_in_flight=4 * args.workers)
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des scrapers contre le faux site local")
+    parser.add_argument("start", nargs="?", default="01/07/2025", help="Date de début JJ/MM/AAAA")
+    parser.add_argument("end", nargs="?", default="07/07/2025", help="Date de fin JJ/MM/AAAA")
+    parser.add_argument("--workers", type=int, default=scraper.MAX_WORKERS, help="Threads I/O")
+    parser.add_argument("--rate", type=float, default=scraper.RATE_LIMIT, help="Débit initial (requêtes/s)")
+    parser.add_argument("--max-rate", type=float, default=20.0, help="Débit maximal du limiteur")
+    parser.add_argument("--parser", default="lxml", help="Backend d'analyse HTML")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Processus d'analyse HTML")
+    parser.add_argument("--window-days", type=int, default=1, help="Jours par recherche (voir scraper.py)")
+    parser.add_argument("--max-ids", type=int, default=500, help="IDs de détail à télécharger au maximum")
+    parser.add_argument("--deferred-delay", type=float, default=1.0,
+                        help="Délai avant le 1er tour de reprise différée (s)")
+    parser.add_argument("--latence", type=float, default=50, help="Latence moyenne du serveur (ms)")
+    parser.add_argument("--erreurs", type=float, default=0.0, help="Part de réponses 503 (0-1)")
+    parser.add_argument("--rafale-toutes", type=float, default=0.0, metavar="S",
+                        help="Une rafale de 429 toutes les S secondes")
+    parser.add_argument("--rafale-duree", type=float, default=0.0, metavar="S", help="Durée d'une rafale de 429")
+    parser.add_argument("--json", help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_scrapers_")
+    server = MockServer(latency=args.latence / 1000, error_rate=args.erreurs,
+                        burst_every=args.rafale_toutes, burst_duration=args.rafale_duree)
+    with server:
+        results = [
+            measure("resultats", server, lambda latencies: run_listing(args, server, workdir, latencies)),
+            measure("details", server, lambda latencies: run_details(args, server, workdir, latencies)),
+        ]
+
+    print(f"\n=== Test de charge ({server.url}, {args.workers} workers, débit initial {args.rate}/s) ===")
+    for r in results:
+        print(
+            f"{r['etape']:<10} {r['secondes']:7.1f} s | {r['requetes']:5d} req ({r['requetes_par_s']:6.1f}/s) | "
+            f"{r['unites']:5d} pages ({r['unites_par_s']:6.1f}/s) | p50 {r['p50_ms']:6.1f} ms | "
+            f"p99 {r['p99_ms']:6.1f} ms | {r['reessais']} réessais {r['statuts']}"
+        )
+    print(f"📁 Sorties : {workdir}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import random
+import re
+import time
+import unicodedata
+from string import punctuation
+
+from tokenizer import normalize, normalize_batch, tokenize, tokenize_batch
+
+# Vérifie que tokenizer.py donne exactement le même résultat que les anciens
+# normaliseurs (copiés ci-dessous tels qu'ils étaient dans
+# process_old_data_natures.py et predict_new_data.py), sur des textes
+# d'appels d'offres et sur des chaînes Unicode aléatoires, puis mesure le
+# débit en tokens/s : ancien code, appel par texte, API par lots.
+# Usage : python bench_tokenizer.py --textes 200000
+
+# Repli si nltk n'est pas installé : les deux côtés reçoivent le même ensemble
+FALLBACK_STOPWORDS = frozenset(
+    "au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me meme mes moi "
+    "mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une "
+    "vos votre vous est sont ete etre avoir".split()
+)
+
+WORDS = (
+    "fourniture matériel bureau travaux d'entretien réseau éclairage public achat produits nettoyage "
+    "location véhicules aménagement voirie CAFÉ élèves hôpital Œuvre façade la des pour de du et à "
+    "RABAT Casablanca n°12/2024 (lot 1) 12 345,00 - marché-cadre «étude» ÉCOLE à l’école".split()
+)
+ODD_CHARS = "àâçéèêëîïôûùüÿœæÀÉÈÇ ’;`KİΣ́ﬁ²½№€\\\t\n\x1c\x0b—–…日本😀"
+
+
+def old_normalize_text(text):
+    """process_old_data_natures.normalize_text d'origine."""
+    text = text.lower()
+    text = unicodedata.normalize('NFD', text)
+    text = text.encode('ascii', 'ignore').decode('utf-8')
+    text = re.sub(rf"[{punctuation}]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def old_clean_and_tokenize(text, stopwords):
+    """predict_new_data.clean_and_tokenize d'origine (STOPWORDS en paramètre)."""
+    text = text.lower()
+    text = unicodedata.normalize('NFD', text)
+    text = text.encode('ascii', 'ignore').decode('utf-8')
+    text = re.sub(rf"[{punctuation}]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    tokens = [t for t in text.strip().split() if t not in stopwords and len(t) > 2]
+    return set(tokens)
+
+
+def load_stopwords():
+    try:
+        from tokenizer import stopwords_fr
+        return stopwords_fr(), "nltk"
+    except (ImportError, LookupError):
+        return FALLBACK_STOPWORDS, "liste de repli"
+
+
+def generate(n, seed=1):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20)))
+        if rng.random() < 0.2:
+            text += "".join(rng.choice(ODD_CHARS) for _ in range(rng.randint(1, 5)))
+        texts.append(text)
+    return texts
+
+
+def random_unicode(n, seed=2):
+    """Chaînes de points de code quelconques (hors substituts) pour couvrir tous les replis NFD."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        chars = []
+        for _ in range(rng.randint(1, 30)):
+            code = rng.choice((rng.randint(0, 127), rng.randint(128, 0x2FFF), rng.randint(0, 0x10FFFF)))
+            if 0xD800 <= code <= 0xDFFF:
+                code = 0x20
+            chars.append(chr(code))
+        texts.append("".join(chars))
+    return texts
+
+
+def check(texts, stopwords):
+    for text in texts:
+        assert normalize(text) == old_normalize_text(text), repr(text)
+        assert set(tokenize(text, stopwords)) == old_clean_and_tokenize(text, stopwords), repr(text)
+    assert normalize_batch(texts) == [old_normalize_text(t) for t in texts]
+    assert [set(t) for t in tokenize_batch(texts, stopwords)] == [old_clean_and_tokenize(t, stopwords) for t in texts]
+
+
+def timed(func, repeat=3):
+    """Meilleur temps sur repeat exécutions."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Équivalence et débit du tokenizer partagé")
+    parser.add_argument("--textes", type=int, default=200000, help="Nombre de textes du benchmark")
+    args = parser.parse_args()
+
+    stopwords, source = load_stopwords()
+    print(f"📚 Mots vides : {source} ({len(stopwords)})")
+
+    check(generate(20000, seed=3), stopwords)
+    check(random_unicode(20000), stopwords)
+    check(["", "   ", "\\", ODD_CHARS, "a\x00b", "Σ ΣΑΣ ς"], stopwords)  # "\x00" : repli de normalize_batch
+    print("✅ Mêmes textes normalisés et mêmes tokens que les anciens normaliseurs")
+
+    texts = generate(args.textes)
+    old_s, old_tokens = timed(lambda: [old_clean_and_tokenize(t, stopwords) for t in texts])
+    new_s, new_tokens = timed(lambda: [tokenize(t, stopwords) for t in texts])
+    batch_s, batch_tokens = timed(lambda: tokenize_batch(texts, stopwords))
+    assert [set(t) for t in new_tokens] == [set(t) for t in batch_tokens] == old_tokens
+
+    words = sum(len(t.split()) for t in texts)
+    print(f"\n=== {len(texts)} textes, {words} mots en entrée ===")
+    print(f"{'ancien (re par appel)':<24} {old_s:6.2f} s  {words / old_s:>12,.0f} tokens/s")
+    print(f"{'tokenize()':<24} {new_s:6.2f} s  {words / new_s:>12,.0f} tokens/s  (x{old_s / new_s:.1f})")
+    print(f"{'tokenize_batch()':<24} {batch_s:6.2f} s  {words / batch_s:>12,.0f} tokens/s  (x{old_s / batch_s:.1f})")
+
+
+if __name__ == "__main__":
+    main()
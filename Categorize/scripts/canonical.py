@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+from functools import lru_cache
+
+from consultation_index import record_key
+from tokenizer import normalize, tokens_of
+
+# Normalisation faite une seule fois, à l'ingestion, au lieu d'être refaite
+# par chaque étape sur les chaînes brutes :
+#   - canonical_attributed() : montant en float ("montant_valeur"), date de
+#     publication ISO ("date"), clé de jointure nettoyée ("cle"), texte
+#     "objet acheteur" normalisé ("texte_normalise") et ses tokens ("tokens",
+#     tokenizer.py) ; écrit par ce script dans
+#     data_daily/canonical/canonical_<jour>.jsonl ;
+#   - canonical_merged() : enregistrement fusionné avec, en plus,
+#     montant_valeur, date, texte_normalise et tokens. La jointure ne
+#     retokenise pas la carte : elle ajoute les tokens du lieu et de la
+#     catégorie, calculés une fois par valeur distincte.
+# fusionner.py lit les fichiers canoniques ; process_old_data_natures.py et
+# predict_new_data.py lisent montant_valeur et tokens quand ils existent.
+# Usage : python canonical.py [--reconstruire]
+
+# --- Configuration ---
+DAILY_DIR = "data_daily"
+CANONICAL_DIR = os.path.join(DAILY_DIR, "canonical")
+CANONICAL_FORMAT = 2  # fichiers canoniques d'un autre format : tous réécrits
+# Champs ajoutés à la carte d'origine par canonical_attributed()
+CANONICAL_FIELDS = ("montant_valeur", "date", "cle", "texte_normalise", "tokens")
+
+
+def montant_value(value):
+    """'12 345,00 MAD' -> 12345.0 ; None si absent ou illisible."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = "".join(value.replace("MAD", "").split()).replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def iso_date(value):
+    """'01/07/2025' -> '2025-07-01' ; None si le format n'est pas JJ/MM/AAAA."""
+    parts = (value or "").strip().split("/")
+    if len(parts) != 3 or not all(p.isdigit() for p in parts):
+        return None
+    day, month, year = parts
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def canonical_attributed(attr):
+    normalized = normalize(f"{attr.get('objet')} {attr.get('acheteur')}")
+    return {
+        **attr,
+        "montant_valeur": montant_value(attr.get("montant")),
+        "date": iso_date(attr.get("date_publication")),
+        "cle": list(record_key(attr)),
+        "texte_normalise": normalized,
+        "tokens": tokens_of(normalized),
+    }
+
+
+def raw_card(record):
+    """Carte d'origine d'un enregistrement canonique (mêmes clés, même ordre)."""
+    return {k: v for k, v in record.items() if k not in CANONICAL_FIELDS}
+
+
+@lru_cache(maxsize=None)
+def join_text(lieu, categorie):
+    """(texte normalisé, tokens) du lieu et de la catégorie d'une consultation."""
+    normalized = normalize(f"{lieu} {categorie}")
+    return normalized, tokens_of(normalized)
+
+
+def canonical_merged(attr, match):
+    """Sortie fusionnée (reference, text, nature, montant) et ses champs canoniques."""
+    if "tokens" not in attr:
+        attr = canonical_attributed(attr)
+    lieu, categorie = match.get("lieu", ""), match.get("catégorie", "")
+    text = f"{attr['objet']} {attr['acheteur']} {lieu} {categorie}".strip()
+    # normalize() et tokens_of() traitent chaque mot isolément : même résultat
+    # que sur text, sans repasser sur l'objet et l'acheteur
+    normalized, tokens = join_text(lieu, categorie)
+    return {
+        "reference": attr["reference"],
+        "text": text,
+        "nature": match.get("nature", ""),
+        "montant": attr.get("montant", ""),
+        "montant_valeur": attr["montant_valeur"],
+        "date": attr["date"],
+        "texte_normalise": f"{attr['texte_normalise']} {normalized}".strip(),
+        "tokens": list(dict.fromkeys(attr["tokens"] + tokens)),
+    }
+
+
+def canonical_path(canonical_dir, day):
+    return os.path.join(canonical_dir, f"canonical_{day}.jsonl")
+
+
+def canonical_files(canonical_dir=CANONICAL_DIR):
+    return sorted(f for f in os.listdir(canonical_dir) if f.startswith("canonical_") and f.endswith(".jsonl"))
+
+
+def update_canonical(daily_dir=DAILY_DIR, canonical_dir=CANONICAL_DIR, rebuild=False):
+    """Écrit la version canonique des attributed_*.json nouveaux ou modifiés ; renvoie leur nombre."""
+    os.makedirs(canonical_dir, exist_ok=True)
+    manifest_path = os.path.join(canonical_dir, "_sources.json")
+    manifest = {}
+    if os.path.exists(manifest_path) and not rebuild:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        # Ancien manifeste (fichier -> source, sans format) : tout est réécrit
+        if saved.get("format") == CANONICAL_FORMAT:
+            manifest = saved["fichiers"]
+
+    written = 0
+    files = sorted(f for f in os.listdir(daily_dir) if f.startswith("attributed_") and f.endswith(".json"))
+    for filename in files:
+        path = os.path.join(daily_dir, filename)
+        stat = os.stat(path)
+        source = [stat.st_mtime, stat.st_size]
+        if manifest.get(filename) == source:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[❌] Erreur lecture {filename} : {e}")
+            continue
+        day = filename.replace("attributed_", "").replace(".json", "")
+        output_path = canonical_path(canonical_dir, day)
+        with open(output_path + ".tmp", "w", encoding="utf-8") as out:
+            for attr in data:
+                if attr:
+                    out.write(json.dumps(canonical_attributed(attr), ensure_ascii=False) + "\n")
+        os.replace(output_path + ".tmp", output_path)
+        manifest[filename] = source
+        written += 1
+    for name in canonical_files(canonical_dir):
+        # attributed_*.json supprimé (même avant une réécriture) : sa version canonique aussi
+        day = name.replace("canonical_", "").replace(".jsonl", "")
+        if f"attributed_{day}.json" not in files:
+            os.remove(os.path.join(canonical_dir, name))
+    for filename in set(manifest) - set(files):
+        del manifest[filename]
+
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"fichiers": manifest, "format": CANONICAL_FORMAT}, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Normalisation canonique des attributed_*.json")
+    parser.add_argument("--reconstruire", action="store_true", help="Tout réécrire")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    written = update_canonical(rebuild=args.reconstruire)
+    print(f"✅ {written} fichiers canoniques écrits dans {CANONICAL_DIR}")
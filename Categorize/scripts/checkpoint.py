@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Statuts enregistrés dans le journal
+STATUS_OK = "ok"            # travail terminé
+STATUS_EMPTY = "vide"       # page sans contenu exploitable : inutile de la refaire
+STATUS_PARTIAL = "partiel"  # jour sauvegardé mais certaines pages ont échoué
+STATUS_FAILED = "echec"     # à refaire au prochain run
+# Rafraîchissement d'un jour déjà terminé (type "rafraichissement")
+STATUS_UNCHANGED = "inchange"  # empreinte identique : pages non re-téléchargées
+STATUS_CHANGED = "modifie"     # empreinte différente : jour re-scrapé
+
+DONE_STATUSES = {STATUS_OK, STATUS_EMPTY}
+
+# Types d'unité à clé entière dont seul le statut est gardé en mémoire :
+# un octet par ID (code du statut, 0 = jamais vu) au lieu d'une entrée complète
+COMPACT_KINDS = ("id",)
+
+
+class Checkpoint:
+    """
+    Journal de reprise en append-only (une ligne JSON par résultat).
+    Chaque ligne contient le type d'unité ("jour", "id"), sa clé, son statut
+    et l'identifiant du run ; au rechargement, la dernière ligne d'une clé
+    l'emporte. Un crash ne peut donc perdre au pire que la dernière ligne.
+    Les IDs ne coûtent qu'un octet chacun en mémoire (COMPACT_KINDS), et le
+    journal est compacté au chargement (une ligne par clé).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.entries = {}
+        self.codes = {kind: bytearray() for kind in COMPACT_KINDS}
+        self.status_names = []  # code - 1 -> statut
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            self._load()
+        self.file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _int_key(kind, key):
+        if kind not in COMPACT_KINDS:
+            return None
+        try:
+            number = int(key)
+        except (TypeError, ValueError):
+            return None
+        return number if number >= 0 and str(number) == str(key) else None
+
+    def _status_code(self, status):
+        if status not in self.status_names:
+            self.status_names.append(status)
+        return self.status_names.index(status) + 1
+
+    def _set(self, entry):
+        kind, key = entry["type"], entry["cle"]
+        number = self._int_key(kind, key)
+        if number is None:
+            self.entries[(kind, str(key))] = entry
+            return
+        codes = self.codes[kind]
+        if number >= len(codes):
+            codes.extend(bytes(number + 1 - len(codes)))
+        codes[number] = self._status_code(entry["statut"])
+
+    def _load(self):
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # dernière ligne tronquée par un crash
+                self._set(entry)
+        if lines > len(self.entries) + sum(len(codes) - codes.count(0) for codes in self.codes.values()):
+            self._compact()
+
+    def _compact(self):
+        """Réécrit le journal avec la dernière ligne de chaque clé (remplacement atomique)."""
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            for kind, codes in self.codes.items():
+                for number, code in enumerate(codes):
+                    if code:
+                        entry = {"type": kind, "cle": number, "statut": self.status_names[code - 1]}
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+
+    def get(self, kind, key):
+        number = self._int_key(kind, key)
+        if number is None:
+            return self.entries.get((kind, str(key)))
+        codes = self.codes[kind]
+        code = codes[number] if number < len(codes) else 0
+        return {"type": kind, "cle": key, "statut": self.status_names[code - 1]} if code else None
+
+    def is_done(self, kind, key):
+        number = self._int_key(kind, key)
+        if number is not None:
+            codes = self.codes[kind]
+            code = codes[number] if number < len(codes) else 0
+            return code > 0 and self.status_names[code - 1] in DONE_STATUSES
+        entry = self.entries.get((kind, str(key)))
+        return entry is not None and entry["statut"] in DONE_STATUSES
+
+    def record(self, kind, key, status, **details):
+        entry = {"type": kind, "cle": key, "statut": status, "run": self.run_id, **details}
+        with self.lock:
+            self._set(entry)
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def summary(self, kind):
+        counts = {}
+        for (k, _), entry in self.entries.items():
+            if k == kind:
+                counts[entry["statut"]] = counts.get(entry["statut"], 0) + 1
+        for code, status in enumerate(self.status_names, start=1):
+            n = self.codes[kind].count(code) if kind in self.codes else 0
+            if n:
+                counts[status] = counts.get(status, 0) + n
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,391 @@
+import argparse
+import json
+import os
+import shutil
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from canonical import canonical_attributed, canonical_merged, montant_value
+from consultation_index import CONSULT_FILES, INDEX_FILE, ConsultationIndex, record_key
+
+# Stockage en colonnes des attributed_*.json, partitionné par mois et par
+# nature (répertoires mois=AAAA-MM/nature=<nature>/, à la Hive ; une
+# partition par jour donnerait des milliers de fichiers de quelques lignes).
+# Un lecteur ne décode que les colonnes demandées ; les filtres sur la date
+# et la nature écartent les partitions avant toute lecture, puis la colonne
+# "date" (AAAA-MM-JJ) affine au jour près.
+# Avec pyarrow, chaque partition est un fichier Parquet ; sinon un .npz
+# numpy (une entrée par colonne, décompressée seulement si elle est lue).
+# La nature, le lieu et la catégorie viennent de l'index de jointure de
+# consultation_index.py ; sans consultation, la nature vaut NO_NATURE et
+# "apparie" est faux (une consultation trouvée peut avoir une nature vide).
+# La carte est aussi gardée sous sa forme canonique ("carte", JSON de
+# canonical.canonical_attributed, tokens compris) avec sa position dans le
+# fichier du jour ("rang") : merge.py et fusionner.py en reconstruisent
+# exactement les lignes du mode fichiers, dans le même ordre.
+# Le manifeste garde la version de l'index lue au dernier passage : un mois est
+# réécrit dès qu'une de ses clés est ajoutée à l'index ou y change de jointure.
+# Usage : python columnar_store.py [--reconstruire]
+
+# --- Configuration ---
+DAILY_DIR = "data_daily"
+STORE_DIR = os.path.join(DAILY_DIR, "store")
+NO_NATURE = "__aucune__"
+STORE_FORMAT = 3  # un stockage d'un autre format est entièrement réécrit
+
+# Colonne -> encodage. "dictionnaire" : valeurs distinctes + codes entiers
+COLUMNS = {
+    "date": "dictionnaire",
+    "reference": "texte",
+    "objet": "texte",
+    "acheteur": "dictionnaire",
+    "date_publication": "dictionnaire",
+    "nombre_devis": "entier",
+    "attribue": "booleen",
+    "entreprise_attributaire": "dictionnaire",
+    "montant": "reel",
+    "id_consultation": "entier",
+    "lieu": "dictionnaire",
+    "catégorie": "dictionnaire",
+    "apparie": "booleen",
+    "rang": "entier",
+    "carte": "texte",
+}
+PARTITION_COLUMNS = ("nature",)
+MISSING_INT = -1
+# Colonnes typées des cartes des attributed_*.json (sans la jointure ni le jour)
+CARD_COLUMNS = tuple(c for c in COLUMNS if c not in ("date", "lieu", "catégorie", "apparie", "rang", "carte"))
+# Colonnes d'un enregistrement fusionné (canonical.canonical_merged)
+MERGED_COLUMNS = ("carte", "apparie", "lieu", "catégorie", "nature")
+
+
+def parse_montant(value):
+    """Montant en float ; NaN si absent ou illisible."""
+    number = montant_value(value)
+    return float("nan") if number is None else number
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return MISSING_INT
+
+
+def backend():
+    return "parquet" if pq is not None else "npz"
+
+
+def day_of(filename):
+    return filename.replace("attributed_", "").replace(".json", "")
+
+
+def nature_dir(nature):
+    return f"nature={quote(nature or NO_NATURE, safe='')}"
+
+
+def to_columns(records):
+    """Enregistrements joints -> colonnes numpy typées selon COLUMNS."""
+    columns = {}
+    for name, kind in COLUMNS.items():
+        values = [r.get(name) for r in records]
+        if kind == "reel":
+            columns[name] = np.array([parse_montant(v) for v in values], dtype=np.float64)
+        elif kind == "entier":
+            columns[name] = np.array([parse_int(v) for v in values], dtype=np.int64)
+        elif kind == "booleen":
+            columns[name] = np.array([bool(v) for v in values], dtype=np.bool_)
+        else:
+            columns[name] = np.array(["" if v is None else str(v) for v in values], dtype=np.str_)
+    return columns
+
+
+def write_partition(path, columns):
+    os.makedirs(path, exist_ok=True)
+    if pq is not None:
+        arrays = {}
+        for name, values in columns.items():
+            array = pa.array(values)
+            arrays[name] = array.dictionary_encode() if COLUMNS[name] == "dictionnaire" else array
+        pq.write_table(pa.table(arrays), os.path.join(path, "part.parquet"), compression="zstd")
+        return
+    arrays = {}
+    for name, values in columns.items():
+        if COLUMNS[name] == "dictionnaire":
+            uniques, codes = np.unique(values, return_inverse=True)
+            arrays[f"{name}.valeurs"] = uniques
+            arrays[f"{name}.codes"] = codes.astype(np.int32)
+        else:
+            arrays[name] = values
+    np.savez_compressed(os.path.join(path, "part.npz"), **arrays)
+
+
+def read_partition(path, columns):
+    """Colonnes demandées d'une partition, en tableaux numpy décodés."""
+    parquet_path = os.path.join(path, "part.parquet")
+    if os.path.exists(parquet_path):
+        if pq is None:
+            raise ValueError("Le module pyarrow n'est pas installé (partition Parquet).")
+        table = pq.read_table(parquet_path, columns=list(columns))
+        result = {}
+        for name in columns:
+            array = table.column(name).combine_chunks()
+            if pa.types.is_dictionary(array.type):
+                values = array.dictionary.to_numpy(zero_copy_only=False)
+                result[name] = values[array.indices.to_numpy(zero_copy_only=False)].astype(np.str_)
+            else:
+                result[name] = array.to_numpy(zero_copy_only=False)
+        return result
+    with np.load(os.path.join(path, "part.npz"), allow_pickle=False) as npz:
+        result = {}
+        for name in columns:
+            if COLUMNS[name] == "dictionnaire":
+                result[name] = npz[f"{name}.valeurs"][npz[f"{name}.codes"]]
+            else:
+                result[name] = npz[name]
+        return result
+
+
+def partitions(root, date_from=None, date_to=None, natures=None):
+    """(mois, nature, chemin) des partitions retenues par les filtres, par mois."""
+    if not os.path.isdir(root):
+        return []
+    wanted = None if natures is None else {n or NO_NATURE for n in natures}
+    selected = []
+    for month_dir in sorted(os.listdir(root)):
+        if not month_dir.startswith("mois=") or month_dir.endswith(".tmp"):
+            continue
+        month = month_dir[len("mois="):]
+        if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+            continue
+        for entry in sorted(os.listdir(os.path.join(root, month_dir))):
+            if not entry.startswith("nature="):
+                continue
+            nature = unquote(entry[len("nature="):])
+            if wanted is not None and nature not in wanted:
+                continue
+            selected.append((month, nature, os.path.join(root, month_dir, entry)))
+    return selected
+
+
+def read_columns(root=STORE_DIR, columns=None, date_from=None, date_to=None, natures=None):
+    """
+    Lit les colonnes demandées (toutes par défaut, plus "nature") des
+    partitions retenues ; dates AAAA-MM-JJ incluses. Renvoie {colonne: tableau}.
+    """
+    columns = list(columns or [*COLUMNS, *PARTITION_COLUMNS])
+    stored = [c for c in columns if c not in PARTITION_COLUMNS]
+    # La colonne date sert au filtre au jour près, et donne la taille de la partition
+    needed = stored if "date" in stored else stored + ["date"]
+    chunks = {c: [] for c in columns}
+    for month, nature, path in partitions(root, date_from, date_to, natures):
+        part = read_partition(path, needed)
+        days = part["date"]
+        mask = None
+        if date_from and date_from > f"{month}-01":
+            mask = days >= date_from
+        if date_to and date_to < f"{month}-31":
+            mask = days <= date_to if mask is None else mask & (days <= date_to)
+        size = len(days) if mask is None else int(mask.sum())
+        for c in stored:
+            chunks[c].append(part[c] if mask is None else part[c][mask])
+        if "nature" in chunks:
+            chunks["nature"].append(np.full(size, nature))
+    return {c: np.concatenate(arrays) if arrays else np.array([]) for c, arrays in chunks.items()}
+
+
+def iter_records(root=STORE_DIR, columns=None, date_from=None, date_to=None, natures=None):
+    """
+    Mêmes filtres que read_columns, enregistrement par enregistrement (dicts) ;
+    montant NaN et entiers MISSING_INT redeviennent None.
+    """
+    data = read_columns(root, columns, date_from, date_to, natures)
+    names = list(data)
+    for row in zip(*(data[c].tolist() for c in names)):
+        record = dict(zip(names, row))
+        for name, value in record.items():
+            kind = COLUMNS.get(name)
+            if (kind == "reel" and value != value) or (kind == "entier" and value == MISSING_INT):
+                record[name] = None
+        yield record
+
+
+def ordered_records(root=STORE_DIR, columns=None, date_from=None, date_to=None, natures=None):
+    """
+    Comme iter_records, un mois en mémoire à la fois, dans l'ordre des
+    attributed_*.json (jour, puis rang dans le fichier).
+    """
+    columns = list(columns or [*COLUMNS, *PARTITION_COLUMNS])
+    needed = columns + [c for c in ("date", "rang") if c not in columns]
+    for month in store_months(root):
+        if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+            continue
+        start = max(date_from or "", f"{month}-01")
+        end = min(date_to or f"{month}-31", f"{month}-31")
+        records = sorted(iter_records(root, needed, start, end, natures), key=lambda r: (r["date"], r["rang"]))
+        for record in records:
+            yield record
+
+
+def join_of(record):
+    """Colonnes de jointure d'un enregistrement apparié, comme ConsultationIndex.get."""
+    nature = record["nature"]
+    return {"lieu": record["lieu"], "catégorie": record["catégorie"],
+            "nature": "" if nature == NO_NATURE else nature}
+
+
+def store_months(root=STORE_DIR):
+    """Mois AAAA-MM présents dans le stockage, dans l'ordre."""
+    return sorted({month for month, _, _ in partitions(root)})
+
+
+def store_natures(root=STORE_DIR):
+    """Natures présentes dans le stockage, hors NO_NATURE."""
+    return sorted({nature for _, nature, _ in partitions(root)} - {NO_NATURE})
+
+
+def merged_records(root=STORE_DIR, date_from=None, date_to=None, natures=None, excluded=frozenset()):
+    """
+    Enregistrements appariés sous la forme de canonical_merged, identiques
+    aux sorties de fusionner.py et dans le même ordre, sans ceux dont la clé
+    nettoyée est dans excluded (duplicate_index.load_excluded_keys) ; seules
+    les colonnes MERGED_COLUMNS sont lues.
+    """
+    for record in ordered_records(root, MERGED_COLUMNS, date_from, date_to, natures):
+        if not record["apparie"]:
+            continue
+        attr = json.loads(record["carte"])
+        if tuple(attr["cle"]) not in excluded:
+            yield canonical_merged(attr, join_of(record))
+
+
+def write_month(root, month, records):
+    """(Ré)écrit toutes les partitions d'un mois ; renvoie le nombre de partitions."""
+    by_nature = {}
+    for r in records:
+        by_nature.setdefault(r.get("nature") or NO_NATURE, []).append(r)
+    month_dir = os.path.join(root, f"mois={month}")
+    tmp_dir = month_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for nature, group in by_nature.items():
+        write_partition(os.path.join(tmp_dir, nature_dir(nature)), to_columns(group))
+    # Remplacement du mois entier : un lecteur ne voit jamais de mois à moitié écrit
+    shutil.rmtree(month_dir, ignore_errors=True)
+    os.replace(tmp_dir, month_dir)
+    return len(by_nature)
+
+
+def load_day(path, day, index):
+    """Enregistrements d'un attributed_<jour>.json, joints aux consultations."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    records = []
+    for rank, attr in enumerate(data):
+        if not attr:
+            continue
+        match = index.get(record_key(attr))
+        records.append({**attr, **(match or {}), "date": day, "apparie": match is not None,
+                        "rang": rank, "carte": json.dumps(canonical_attributed(attr), ensure_ascii=False)})
+    return records
+
+
+def changed_months(root, changed, skip=()):
+    """Mois (hors skip) dont un enregistrement a sa clé nettoyée dans changed."""
+    months = set()
+    if not changed:
+        return months
+    for month, _, path in partitions(root):
+        if month in skip or month in months:
+            continue
+        # Projection : seules les 3 colonnes de la clé sont lues
+        keys = read_partition(path, ["reference", "objet", "acheteur"])
+        for reference, objet, acheteur in zip(keys["reference"], keys["objet"], keys["acheteur"]):
+            if record_key({"reference": reference, "objet": objet, "acheteur": acheteur}) in changed:
+                months.add(month)
+                break
+    return months
+
+
+def update_store(daily_dir=DAILY_DIR, root=STORE_DIR, consult_index=INDEX_FILE,
+                 consult_files=CONSULT_FILES, rebuild=False):
+    """
+    Réécrit les mois dont un attributed_*.json est nouveau, modifié ou
+    supprimé, et ceux dont une clé a été ajoutée à l'index des consultations
+    ou y a changé (lieu, catégorie, nature) ; renvoie le nombre de mois écrits.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, "_sources.json")
+    manifest = {"fichiers": {}, "version": 0, "format": STORE_FORMAT}
+    if os.path.exists(manifest_path) and not rebuild:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        rebuild = manifest.get("format") != STORE_FORMAT
+        if rebuild:
+            manifest = {"fichiers": {}, "version": 0, "format": STORE_FORMAT}
+    known = manifest["fichiers"]
+
+    files = sorted(f for f in os.listdir(daily_dir) if f.startswith("attributed_") and f.endswith(".json"))
+    sources = {}
+    for filename in files:
+        stat = os.stat(os.path.join(daily_dir, filename))
+        sources[filename] = [stat.st_mtime, stat.st_size]
+    changed = {f for f in sources if known.get(f) != sources[f]} | (set(known) - set(sources))
+    months = {day_of(f)[:7] for f in changed}
+    if rebuild:
+        for entry in os.listdir(root):
+            if entry.startswith("mois="):
+                shutil.rmtree(os.path.join(root, entry))
+
+    with ConsultationIndex(consult_index) as index:
+        index.update(consult_files)
+        version = index.version
+        # Premier passage, ancien manifeste ou index reconstruit : tous les mois
+        changed = index.changed_since(manifest["version"]) if manifest.get("version") else None
+        if changed is None:
+            months |= {day_of(f)[:7] for f in files}
+        else:
+            months |= changed_months(root, set(changed), months)
+        for month in sorted(months):
+            records = []
+            for filename in files:
+                day = day_of(filename)
+                if not day.startswith(month):
+                    continue
+                try:
+                    records += load_day(os.path.join(daily_dir, filename), day, index)
+                except Exception as e:
+                    print(f"[❌] Erreur lecture {filename} : {e}")
+                    sources.pop(filename)  # sera retenté au prochain passage
+            if records:
+                n_partitions = write_month(root, month, records)
+            else:
+                shutil.rmtree(os.path.join(root, f"mois={month}"), ignore_errors=True)
+                n_partitions = 0
+            print(f"🧊 {month} : {len(records)} enregistrements, {n_partitions} natures")
+
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"fichiers": sources, "version": version, "format": STORE_FORMAT}, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return len(months)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Conversion des attributed_*.json en stockage en colonnes")
+    parser.add_argument("--store", default=STORE_DIR, help="Dossier du stockage en colonnes")
+    parser.add_argument("--reconstruire", action="store_true",
+                        help="Tout réécrire depuis les attributed_*.json")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    written = update_store(DAILY_DIR, args.store, rebuild=args.reconstruire)
+    print(f"✅ {written} mois écrits dans {args.store} ({backend()})")
@@ -0,0 +1,269 @@
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from ndjson_writer import COMPRESSION_SUFFIXES
+
+# Index sur disque des consultations détaillées pour la jointure de
+# fusionner.py : clé nettoyée (référence, objet, acheteur) -> lieu, catégorie,
+# nature. Les articles et le reste de la consultation ne sont pas stockés.
+# Pour chaque fichier source on retient la position déjà indexée : une mise à
+# jour ne lit que les lignes ajoutées depuis par scraper_details.py.
+# La liste des fichiers n'est définie qu'ici (CONSULT_FILES) : leur ordre fixe
+# la priorité d'une clé présente dans plusieurs fichiers, et un fichier retiré
+# de la liste (ou supprimé) voit ses consultations sortir de l'index.
+# Chaque update() prend un numéro de version, noté sur les clés ajoutées ou
+# dont la jointure change : changed_since() donne aux lecteurs (stockage en
+# colonnes) les clés modifiées depuis leur dernier passage.
+
+
+def output_files(path):
+    """Sorties possibles de scraper_details.py : path, path.gz, path.zst (--compression)."""
+    return [path + suffix for suffix in COMPRESSION_SUFFIXES.values()]
+
+
+# --- Configuration ---
+CONSULT_OUTPUT = os.path.join("data_daily", "consultations.ndjson")  # écrit par scraper_details.py
+CONSULT_FILES = [
+    "C:/Users/pc/Desktop/newNew/scraper/old_data/data/consultations.ndjson",
+    *output_files(CONSULT_OUTPUT),
+]
+INDEX_FILE = os.path.join("data_daily", "consultations_index.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS consultations (
+    reference TEXT NOT NULL,
+    objet TEXT NOT NULL,
+    acheteur TEXT NOT NULL,
+    lieu TEXT,
+    categorie TEXT,
+    nature TEXT,
+    rang INTEGER NOT NULL,
+    ligne INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (reference, objet, acheteur)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS consultations_version ON consultations (version);
+CREATE TABLE IF NOT EXISTS sources (
+    chemin TEXT PRIMARY KEY,
+    rang INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    lignes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS etat (
+    nom TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+"""
+
+# Comme l'ancien dict (« écrasement autorisé ») : la dernière consultation
+# l'emporte, dans l'ordre des fichiers (rang) puis des lignes. La version
+# d'une clé n'avance que si ses colonnes de jointure changent.
+UPSERT = """
+INSERT INTO consultations (reference, objet, acheteur, lieu, categorie, nature, rang, ligne, version)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (reference, objet, acheteur) DO UPDATE SET
+    lieu = excluded.lieu, categorie = excluded.categorie, nature = excluded.nature,
+    rang = excluded.rang, ligne = excluded.ligne,
+    version = CASE
+        WHEN lieu IS excluded.lieu AND categorie IS excluded.categorie AND nature IS excluded.nature
+        THEN version ELSE excluded.version
+    END
+WHERE excluded.rang > consultations.rang
+   OR (excluded.rang = consultations.rang AND excluded.ligne >= consultations.ligne)
+"""
+
+BATCH_SIZE = 5000
+JOIN_FIELDS = ("lieu", "catégorie", "nature")
+
+CLEAN_RE = re.compile(r"^[\s#:]+|[\s#:]+$")
+
+
+def clean(text):
+    if not isinstance(text, str):
+        return ""
+    # Supprimer espaces, # et : en bordure, puis normaliser la casse
+    return CLEAN_RE.sub("", text).strip().upper()
+
+
+def record_key(record, reference_field="reference"):
+    """Clé de jointure/dédoublonnage (reference, objet, acheteur) nettoyée."""
+    return (
+        clean(record.get(reference_field, "")),
+        clean(record.get("objet", "")),
+        clean(record.get("acheteur", "")),
+    )
+
+
+def open_lines(path):
+    """Lecteur binaire ligne à ligne, compressé (.gz / .zst) ou non."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("Le module zstandard n'est pas installé.")
+        raw = open(path, "rb")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True))
+    return open(path, "rb")
+
+
+class ConsultationIndex:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        for table, column in (("sources", "rang"), ("consultations", "version")):
+            columns = [row[1] for row in self.db.execute(f"PRAGMA table_info({table})")]
+            if columns and column not in columns:
+                # Index d'un format antérieur : reconstruit au prochain update()
+                self.db.executescript("DROP TABLE IF EXISTS sources; DROP TABLE IF EXISTS consultations;")
+                break
+        self.db.executescript(SCHEMA)
+        self.version = self._state("version")
+
+    def _state(self, name):
+        row = self.db.execute("SELECT valeur FROM etat WHERE nom = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_state(self, name, value):
+        self.db.execute("INSERT OR REPLACE INTO etat (nom, valeur) VALUES (?, ?)", (name, value))
+
+    def _next_version(self):
+        with self.db:
+            self.version = self._state("version") + 1
+            self._set_state("version", self.version)
+        return self.version
+
+    def _reset(self):
+        # Les clés disparues n'ont plus de version : la reconstruction est notée à part
+        reset_version = self._next_version()
+        with self.db:
+            self.db.execute("DELETE FROM consultations")
+            self.db.execute("DELETE FROM sources")
+            self._set_state("reconstruction", reset_version)
+
+    def _index_source(self, rank, path):
+        stat = os.stat(path)
+        known = self.db.execute(
+            "SELECT inode, position, lignes FROM sources WHERE chemin = ?", (path,)
+        ).fetchone()
+        compressed = path.endswith((".gz", ".zst"))
+        position, line_no = 0, 0
+        if known:
+            inode, position, line_no = known
+            if inode != stat.st_ino or stat.st_size < position:
+                return None  # fichier remplacé ou tronqué : reconstruction complète
+            if not compressed and stat.st_size == position:
+                return 0
+
+        added = 0
+        batch = []
+        with open_lines(path) as f:
+            if compressed:
+                # Pas d'accès direct dans un flux compressé : on saute les lignes déjà vues
+                for _ in range(line_no):
+                    f.readline()
+            else:
+                f.seek(position)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # ligne en cours d'écriture : reprise au prochain passage
+                line_no += 1
+                position += len(raw)
+                if not raw.strip():
+                    continue
+                try:
+                    c = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    print(f"[⚠️] Ligne {line_no} illisible dans {path} : {e}")
+                    continue
+                batch.append((*record_key(c, "référence"), *(c.get(field, "") for field in JOIN_FIELDS),
+                              rank, line_no, self.version))
+                if len(batch) >= BATCH_SIZE:
+                    self.db.executemany(UPSERT, batch)
+                    added += len(batch)
+                    batch.clear()
+        self.db.executemany(UPSERT, batch)
+        added += len(batch)
+        if compressed:
+            position = stat.st_size
+        self.db.execute(
+            "INSERT OR REPLACE INTO sources (chemin, rang, inode, position, lignes) VALUES (?, ?, ?, ?, ?)",
+            (path, rank, stat.st_ino, position, line_no),
+        )
+        return added
+
+    def update(self, consult_files):
+        """
+        Indexe les consultations ajoutées aux fichiers depuis la dernière mise à
+        jour ; l'ordre des fichiers fixe la priorité en cas de clé répétée.
+        Les sources absentes de la liste, supprimées ou changées de rang sont
+        retirées en reconstruisant l'index. Renvoie le nombre de lignes lues.
+        """
+        listed = {path: rank for rank, path in enumerate(consult_files) if os.path.exists(path)}
+        stale = [path for path, rank in self.db.execute("SELECT chemin, rang FROM sources")
+                 if listed.get(path) != rank]
+        if stale:
+            print(f"[⚠️] Sources retirées ou déplacées ({', '.join(stale)}) : reconstruction de l'index")
+            self._reset()
+        if not listed:
+            print(f"[⚠️] Aucun fichier de consultations trouvé parmi : {', '.join(consult_files)}")
+        self._next_version()
+        total = 0
+        for rank, consult_file in enumerate(consult_files):
+            if consult_file not in listed:
+                continue  # variante compressée jamais écrite, ou fichier introuvable
+            with self.db:
+                added = self._index_source(rank, consult_file)
+            if added is None:
+                print(f"[⚠️] {consult_file} a été remplacé ou tronqué : reconstruction de l'index")
+                self._reset()
+                return self.update(consult_files)
+            total += added
+        return total
+
+    def changed_since(self, version):
+        """
+        Clés ajoutées ou dont la jointure a changé depuis la version donnée
+        (self.version après un update()) ; None si l'index a été reconstruit
+        depuis : des clés ont pu disparaître, tout est à revoir.
+        """
+        if self._state("reconstruction") > version:
+            return None
+        return self.db.execute(
+            "SELECT reference, objet, acheteur FROM consultations WHERE version > ?", (version,)
+        )
+
+    def get(self, key):
+        """Colonnes de jointure {lieu, catégorie, nature} de la clé, ou None."""
+        row = self.db.execute(
+            "SELECT lieu, categorie, nature FROM consultations "
+            "WHERE reference = ? AND objet = ? AND acheteur = ?",
+            key,
+        ).fetchone()
+        return dict(zip(JOIN_FIELDS, row)) if row else None
+
+    def keys(self):
+        """Itère sur les clés nettoyées (reference, objet, acheteur) indexées."""
+        return self.db.execute("SELECT reference, objet, acheteur FROM consultations")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM consultations").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
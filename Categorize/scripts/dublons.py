@@ -1,46 +1,35 @@
-import json
+import argparse
 import os
-from collections import defaultdict
+
+from duplicate_index import DuplicateIndex
 
 # --- Configuration ---
 DAILY_DIR = "data_daily"
 OUTPUT_FILE = "doublons.jsonl"
+# Index persistant clé -> premier jour vu, occurrences : seuls les jours
+# nouveaux ou modifiés sont relus à chaque exécution
+INDEX_FILE = os.path.join(DAILY_DIR, "doublons_index.sqlite")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Détection des doublons (reference, objet, acheteur)")
+    parser.add_argument("--sans-rapport", action="store_true",
+                        help="Mettre l'index à jour sans réécrire doublons.jsonl")
+    parser.add_argument("--reindexer", action="store_true",
+                        help="Reconstruire l'index depuis zéro")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.reindexer and os.path.exists(INDEX_FILE):
+        os.remove(INDEX_FILE)
+
+    with DuplicateIndex(INDEX_FILE) as index:
+        ingested = index.ingest_dir(DAILY_DIR)
+        print(f"🗂️  {ingested} fichiers indexés, {index.duplicate_count()} groupes de doublons connus ({INDEX_FILE})")
 
-# --- Chargement des fichiers JSON quotidiens ---
-files = [f for f in os.listdir(DAILY_DIR) if f.startswith("attributed_") and f.endswith(".json")]
-
-# --- Indexation des enregistrements ---
-seen = defaultdict(list)
-
-for filename in files:
-    full_path = os.path.join(DAILY_DIR, filename)
-    with open(full_path, 'r', encoding='utf-8') as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"[⚠️] Erreur de lecture JSON dans {filename} : {e}")
-            continue
-
-        for record in data:
-            if not record:
-                continue
-            try:
-                key = (
-                    record["reference"].strip().lower(),
-                    record["objet"].strip().lower(),
-                    record["acheteur"].strip().lower()
-                )
-                seen[key].append(record)
-            except Exception as e:
-                print(f"[⚠️] Erreur sur un enregistrement de {filename} : {e}")
-
-# --- Sauvegarde des doublons ---
-with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
-    doublons_count = 0
-    for group in seen.values():
-        if len(group) > 1:
-            for item in group:
-                out.write(json.dumps(item, ensure_ascii=False) + "\n")
-            doublons_count += 1
-
-print(f"✅ {doublons_count} groupes de doublons écrits dans '{OUTPUT_FILE}'")
+        # --- Sauvegarde des doublons ---
+        if not args.sans_rapport:
+            doublons_count = index.write_report(DAILY_DIR, OUTPUT_FILE)
+            print(f"✅ {doublons_count} groupes de doublons écrits dans '{OUTPUT_FILE}'")
@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+from collections import Counter
+
+from consultation_index import record_key
+
+# Index persistant des clés (reference, objet, acheteur) des fichiers
+# attributed_*.json : clé -> premier jour vu + nombre d'occurrences, et
+# occurrences par jour. Ingérer un nouveau jour ne lit que ce jour ; le
+# rapport des doublons ne relit que les jours qui en contiennent.
+#
+# Définition d'un doublon, partagée par dublons.py, fusionner.py, etl.py et
+# les lecteurs du stockage en colonnes (process_old_data_natures.py,
+# predict_new_data.py) :
+#   - les enregistrements sont groupés sur duplicate_key() (strip + minuscules) ;
+#     un groupe de plus d'un enregistrement est un groupe de doublons ;
+#   - la jointure écarte ensuite tout enregistrement dont la clé nettoyée
+#     (consultation_index.record_key) est celle d'un membre d'un groupe,
+#     voir excluded_keys().
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cles (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL,
+    objet TEXT NOT NULL,
+    acheteur TEXT NOT NULL,
+    premier_jour TEXT NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (reference, objet, acheteur)
+);
+CREATE TABLE IF NOT EXISTS occurrences (
+    cle_id INTEGER NOT NULL REFERENCES cles(id),
+    jour TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (cle_id, jour)
+);
+CREATE INDEX IF NOT EXISTS occurrences_jour ON occurrences(jour);
+CREATE INDEX IF NOT EXISTS cles_doublons ON cles(occurrences) WHERE occurrences > 1;
+CREATE TABLE IF NOT EXISTS jours (
+    jour TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    taille INTEGER NOT NULL,
+    enregistrements INTEGER NOT NULL
+);
+"""
+
+
+def duplicate_key(record):
+    """Clé de regroupement des doublons ; lève une exception si un champ manque ou n'est pas une chaîne."""
+    return (
+        record["reference"].strip().lower(),
+        record["objet"].strip().lower(),
+        record["acheteur"].strip().lower()
+    )
+
+
+def excluded_keys(duplicates):
+    """Clés nettoyées (record_key) à écarter de la jointure, d'après les enregistrements des groupes."""
+    return {record_key(record) for record in duplicates}
+
+
+def load_excluded_keys(path):
+    """excluded_keys() des groupes d'un doublons.jsonl ; ensemble vide s'il n'existe pas."""
+    if not os.path.exists(path):
+        print(f"[⚠️] {path} introuvable : aucun doublon écarté")
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return excluded_keys(json.loads(line) for line in f if line.strip())
+
+
+def day_of(filename):
+    return filename.replace("attributed_", "").replace(".json", "")
+
+
+def read_day(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class DuplicateIndex:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def _forget_day(self, day):
+        # Fichier du jour modifié ou supprimé : on retire ses anciennes occurrences
+        self.db.execute(
+            "UPDATE cles SET occurrences = occurrences - "
+            "(SELECT n FROM occurrences WHERE cle_id = cles.id AND jour = ?) "
+            "WHERE id IN (SELECT cle_id FROM occurrences WHERE jour = ?)",
+            (day, day),
+        )
+        affected = [row[0] for row in self.db.execute("SELECT cle_id FROM occurrences WHERE jour = ?", (day,))]
+        self.db.execute("DELETE FROM occurrences WHERE jour = ?", (day,))
+        self.db.execute("DELETE FROM cles WHERE occurrences <= 0")
+        self.db.executemany(
+            "UPDATE cles SET premier_jour = (SELECT MIN(jour) FROM occurrences WHERE cle_id = cles.id) WHERE id = ?",
+            [(cle_id,) for cle_id in affected],
+        )
+
+    def ingest_day(self, path):
+        """
+        Ajoute un fichier attributed_<jour>.json à l'index. Renvoie False s'il
+        était déjà indexé dans cette version (même taille et date de modification).
+        """
+        day = day_of(os.path.basename(path))
+        stat = os.stat(path)
+        known = self.db.execute("SELECT mtime, taille FROM jours WHERE jour = ?", (day,)).fetchone()
+        if known == (stat.st_mtime, stat.st_size):
+            return False
+
+        counts = Counter()
+        for record in read_day(path):
+            if not record:
+                continue
+            try:
+                counts[duplicate_key(record)] += 1
+            except Exception as e:
+                print(f"[⚠️] Erreur sur un enregistrement de {os.path.basename(path)} : {e}")
+
+        with self.db:
+            if known:
+                self._forget_day(day)
+            self.db.executemany(
+                "INSERT OR IGNORE INTO cles (reference, objet, acheteur, premier_jour) VALUES (?, ?, ?, ?)",
+                [(*key, day) for key in counts],
+            )
+            self.db.executemany(
+                "UPDATE cles SET occurrences = occurrences + ?, premier_jour = MIN(premier_jour, ?) "
+                "WHERE reference = ? AND objet = ? AND acheteur = ?",
+                [(n, day, *key) for key, n in counts.items()],
+            )
+            self.db.executemany(
+                "INSERT INTO occurrences (cle_id, jour, n) "
+                "SELECT id, ?, ? FROM cles WHERE reference = ? AND objet = ? AND acheteur = ?",
+                [(day, n, *key) for key, n in counts.items()],
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO jours (jour, mtime, taille, enregistrements) VALUES (?, ?, ?, ?)",
+                (day, stat.st_mtime, stat.st_size, sum(counts.values())),
+            )
+        return True
+
+    def ingest_dir(self, daily_dir):
+        """
+        Indexe les fichiers attributed_*.json nouveaux ou modifiés et oublie
+        les jours dont le fichier a été supprimé ; renvoie le nombre de jours
+        indexés ou oubliés.
+        """
+        files = sorted(f for f in os.listdir(daily_dir) if f.startswith("attributed_") and f.endswith(".json"))
+        on_disk = {day_of(f) for f in files}
+        ingested = 0
+        for (day,) in self.db.execute("SELECT jour FROM jours").fetchall():
+            if day not in on_disk:
+                with self.db:
+                    self._forget_day(day)
+                    self.db.execute("DELETE FROM jours WHERE jour = ?", (day,))
+                ingested += 1
+        for filename in files:
+            try:
+                if self.ingest_day(os.path.join(daily_dir, filename)):
+                    ingested += 1
+            except json.JSONDecodeError as e:
+                print(f"[⚠️] Erreur de lecture JSON dans {filename} : {e}")
+        return ingested
+
+    def duplicate_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM cles WHERE occurrences > 1").fetchone()[0]
+
+    def duplicate_groups(self):
+        """Clés vues plus d'une fois -> [(clé, premier jour, occurrences)], par premier jour."""
+        return [
+            ((reference, objet, acheteur), premier_jour, occurrences)
+            for reference, objet, acheteur, premier_jour, occurrences in self.db.execute(
+                "SELECT reference, objet, acheteur, premier_jour, occurrences FROM cles "
+                "WHERE occurrences > 1 ORDER BY premier_jour, reference, objet, acheteur"
+            )
+        ]
+
+    def write_report(self, daily_dir, output_file):
+        """
+        Écrit les enregistrements complets de chaque groupe de doublons (format
+        historique de doublons.jsonl). Seuls les jours contenant un doublon sont relus.
+        """
+        groups = {key: [] for key, _, _ in self.duplicate_groups()}
+        days = [row[0] for row in self.db.execute(
+            "SELECT DISTINCT o.jour FROM occurrences o JOIN cles c ON c.id = o.cle_id "
+            "WHERE c.occurrences > 1 ORDER BY o.jour"
+        )]
+        for day in days:
+            for record in read_day(os.path.join(daily_dir, f"attributed_{day}.json")):
+                if not record:
+                    continue
+                try:
+                    key = duplicate_key(record)
+                except Exception:
+                    continue
+                if key in groups:
+                    groups[key].append(record)
+
+        with open(output_file, "w", encoding="utf-8") as out:
+            for group in groups.values():
+                for item in group:
+                    out.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return len(groups)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,146 @@
+import json
+import os
+
+from canonical import canonical_attributed, canonical_merged
+from consultation_index import CONSULT_FILES, INDEX_FILE, ConsultationIndex
+from duplicate_index import duplicate_key
+
+# Chaîne merge.py + dublons.py + fusionner.py en une seule passe : chaque
+# attributed_*.json n'est lu qu'une fois, et dans la même boucle on écrit
+# merged_attributed.jsonl, on indexe la clé (reference, objet, acheteur) et
+# on fait la jointure avec les consultations détaillées.
+#
+# Les doublons ne sont connus qu'à la fin (une clé peut réapparaître des jours
+# plus tard) : l'index garde donc, par clé de doublon (duplicate_key) puis
+# par clé de jointure nettoyée, la position de chaque occurrence (offset dans
+# merged_attributed.jsonl, ligne dans le fichier de sortie du jour). Comme
+# l'ancienne chaîne dublons.py + fusionner.py, les groupes sont formés sur
+# duplicate_key et les sorties perdent toute occurrence dont la clé nettoyée
+# est celle d'un membre d'un groupe (voir duplicate_index.py). La mémoire dépend du nombre de clés, pas de la taille des
+# enregistrements. En fin de passe, seuls les fichiers de sortie des jours
+# concernés par un doublon sont réécrits, et doublons.jsonl est produit en
+# relisant les lignes voulues de merged_attributed.jsonl. La jointure
+# interroge l'index sur disque de consultation_index.py.
+
+# --- Configuration ---
+DAILY_DIR = "data_daily"
+MERGED_FILE = "merged_attributed.jsonl"
+DOUBLONS_FILE = "doublons.jsonl"
+OUTPUT_DIR = "merged_outputs"
+
+
+def attributed_files(daily_dir=DAILY_DIR):
+    return sorted(
+        f for f in os.listdir(daily_dir)
+        if f.startswith("attributed_") and f.endswith(".json")
+    )
+
+
+def day_outputs(output_dir, date_suffix):
+    return (
+        os.path.join(output_dir, f"merged_output_strict_montant_{date_suffix}.jsonl"),
+        os.path.join(output_dir, f"unmatched_output_strict_montant_{date_suffix}.jsonl"),
+    )
+
+
+def drop_lines(path, line_numbers):
+    with open(path, "r", encoding="utf-8") as f:
+        kept = [line for i, line in enumerate(f) if i not in line_numbers]
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+
+
+def run(daily_dir=DAILY_DIR, consult_files=CONSULT_FILES, output_dir=OUTPUT_DIR,
+        merged_file=MERGED_FILE, doublons_file=DOUBLONS_FILE, consult_index=INDEX_FILE):
+    os.makedirs(output_dir, exist_ok=True)
+    with ConsultationIndex(consult_index) as consultation_index:
+        added = consultation_index.update(consult_files)
+        print(f"📚 {added} consultations ajoutées à l'index, {len(consultation_index)} clés ({consult_index})")
+        return _run(daily_dir, consultation_index, output_dir, merged_file, doublons_file)
+
+
+def _run(daily_dir, consultation_index, output_dir, merged_file, doublons_file):
+    # clé de doublon -> clé nettoyée -> occurrences [(offset dans merged_file, fichier de sortie, n° de ligne)]
+    key_index = {}
+    total_records = 0
+    day_counts = {}
+
+    with open(merged_file, "wb") as merged_out:
+        for filename in attributed_files(daily_dir):
+            try:
+                with open(os.path.join(daily_dir, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"[❌] Erreur lecture {filename} : {e}")
+                continue
+
+            date_suffix = filename.replace("attributed_", "").replace(".json", "")
+            merged_path, unmatched_path = day_outputs(output_dir, date_suffix)
+            counts = {merged_path: 0, unmatched_path: 0}
+            with open(merged_path, "w", encoding="utf-8") as merged_day, \
+                    open(unmatched_path, "w", encoding="utf-8") as unmatched_day:
+                for attr in data:
+                    if not attr:
+                        continue
+                    offset = merged_out.tell()
+                    merged_out.write((json.dumps(attr, ensure_ascii=False) + "\n").encode("utf-8"))
+                    total_records += 1
+
+                    canonical = canonical_attributed(attr)
+                    key = tuple(canonical["cle"])
+                    match = consultation_index.get(key)
+                    if match:
+                        merged_day.write(json.dumps(canonical_merged(canonical, match), ensure_ascii=False) + "\n")
+                        path = merged_path
+                    else:
+                        unmatched_day.write(json.dumps(canonical, ensure_ascii=False) + "\n")
+                        path = unmatched_path
+                    try:
+                        group = duplicate_key(attr)
+                    except Exception as e:
+                        # Comme dublons.py : hors de tout groupe, mais toujours soumis à l'exclusion
+                        print(f"[⚠️] Erreur sur un enregistrement de {filename} : {e}")
+                        group = None
+                    key_index.setdefault(group, {}).setdefault(key, []).append((offset, path, counts[path]))
+                    counts[path] += 1
+            day_counts[date_suffix] = counts[merged_path], counts[unmatched_path]
+
+    print(f"✅ Fusion terminée : {total_records} enregistrements écrits dans {merged_file}")
+
+    # --- Doublons : groupes de clés vues plus d'une fois ---
+    duplicates = [
+        by_key for group, by_key in key_index.items()
+        if group is not None and sum(len(occ) for occ in by_key.values()) > 1
+    ]
+    with open(merged_file, "rb") as merged_in, open(doublons_file, "w", encoding="utf-8") as out:
+        for by_key in duplicates:
+            for offset in sorted(o for occ in by_key.values() for o, _, _ in occ):
+                merged_in.seek(offset)
+                out.write(merged_in.readline().decode("utf-8"))
+    print(f"✅ {len(duplicates)} groupes de doublons écrits dans '{doublons_file}'")
+
+    # --- Retrait des doublons des sorties du jour (seuls les fichiers concernés sont réécrits) ---
+    excluded = {key for by_key in duplicates for key in by_key}
+    to_drop = {}
+    for by_key in key_index.values():
+        for key, occurrences in by_key.items():
+            if key in excluded:
+                for _, path, line_no in occurrences:
+                    to_drop.setdefault(path, set()).add(line_no)
+    for path, line_numbers in to_drop.items():
+        drop_lines(path, line_numbers)
+
+    total_merged = 0
+    for date_suffix, (merged_count, unmatched_count) in day_counts.items():
+        merged_path, unmatched_path = day_outputs(output_dir, date_suffix)
+        merged_count -= len(to_drop.get(merged_path, ()))
+        unmatched_count -= len(to_drop.get(unmatched_path, ()))
+        print(f"✅ {merged_count} fusionnés | ❗ {unmatched_count} non trouvés → {date_suffix}")
+        total_merged += merged_count
+
+    print(f"\n🎉 Fusion terminée pour tous les jours : {total_merged} éléments fusionnés.")
+    return total_merged
+
+
+if __name__ == "__main__":
+    run()
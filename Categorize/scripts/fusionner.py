@@ -1,99 +1,87 @@
 import os
 import json
-import re
-
-# --- Fonctions utilitaires ---
-def clean(text):
-    if not isinstance(text, str):
-        return ""
-    # Supprimer espaces, # et :
-    text = re.sub(r"^[\s#:]+|[\s#:]+$", "", text)
-    # Normaliser la casse (majuscules ou minuscules selon ce que tu préfères)
-    return text.strip().upper()
 
+from canonical import CANONICAL_DIR, canonical_files, canonical_merged, update_canonical
+from columnar_store import join_of, ordered_records, update_store
+from consultation_index import CONSULT_FILES, INDEX_FILE, ConsultationIndex
+from duplicate_index import excluded_keys
 
+# --- Fonctions utilitaires ---
 def load_jsonl(path):
     with open(path, 'r', encoding='utf-8') as f:
         return [json.loads(line) for line in f if line.strip()]
 
 # --- Fichiers sources ---
 DAILY_DIR = "data_daily"
-CONSULT_FILES = [
-    "C:/Users/pc/Desktop/newNew/scraper/old_data/data/consultations.ndjson",
-    "data_daily/consultations.ndjson"
-]
+# Stockage en colonnes (columnar_store.py), ex. os.path.join(DAILY_DIR, "store") :
+# lu mois par mois, jointure déjà faite ; None : fichiers canoniques + index
+STORE_DIR = None
 DOUBLONS_FILE = "doublons.jsonl"
 OUTPUT_DIR = "merged_outputs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # --- Chargement des doublons ---
 doublons_data = load_jsonl(DOUBLONS_FILE)
-doublons_keys = {
-    (
-        clean(d.get("reference", "")),
-        clean(d.get("objet", "")),
-        clean(d.get("acheteur", ""))
-    )
-    for d in doublons_data
-}
-print(clean(" 17/2025"))
-# --- Chargement des consultations détaillées des deux fichiers ---
-consultation_index = {}
-for consult_file in CONSULT_FILES:
-    consultations_data = load_jsonl(consult_file)
-    for c in consultations_data:
-        key = (
-            clean(c.get("référence", "")),
-            clean(c.get("objet", "")),
-            clean(c.get("acheteur", ""))
-        )
-        consultation_index[key] = c  # écrasement autorisé
-
-# --- Traitement des fichiers attributed_*.json ---
-attributed_files = sorted([
-    f for f in os.listdir(DAILY_DIR)
-    if f.startswith("attributed_") and f.endswith(".json")
-])
-
-total_merged = 0
-
-for filename in attributed_files:
-    input_path = os.path.join(DAILY_DIR, filename)
-    with open(input_path, 'r', encoding='utf-8') as f:
-        try:
-            attributed_data = json.load(f)
-        except Exception as e:
-            print(f"[❌] Erreur lecture {filename} : {e}")
-            continue
-
-    merged_data = []
-    non_matched_data = []
-
-    for attr in attributed_data:
-        key = (
-            clean(attr.get("reference", "")),
-            clean(attr.get("objet", "")),
-            clean(attr.get("acheteur", ""))
-        )
-
-        if key in doublons_keys:
+doublons_keys = excluded_keys(doublons_data)
+# --- Index des consultations détaillées (CONSULT_FILES de consultation_index.py) ---
+# Index sur disque clé -> (lieu, catégorie, nature) : seules les lignes
+# ajoutées aux fichiers depuis le dernier passage sont lues
+consultation_index = ConsultationIndex(INDEX_FILE)
+added = consultation_index.update(CONSULT_FILES)
+print(f"📚 {added} consultations ajoutées à l'index, {len(consultation_index)} clés ({INDEX_FILE})")
+
+def canonical_days():
+    """(jour, fusionnés, non trouvés) depuis les fichiers canoniques (montant, date et clé déjà calculés)."""
+    converted = update_canonical(DAILY_DIR, CANONICAL_DIR)
+    print(f"🧾 {converted} fichiers attributed_*.json normalisés dans {CANONICAL_DIR}")
+    for filename in canonical_files(CANONICAL_DIR):
+        merged_data = []
+        non_matched_data = []
+
+        with open(os.path.join(CANONICAL_DIR, filename), 'r', encoding='utf-8') as f:
+            for line in f:
+                attr = json.loads(line)
+                key = tuple(attr["cle"])
+
+                if key in doublons_keys:
+                    continue  # Ignorer les doublons
+
+                consultation_match = consultation_index.get(key)
+                if consultation_match:
+                    merged_data.append(canonical_merged(attr, consultation_match))
+                else:
+                    non_matched_data.append(attr)
+
+        yield filename.replace("canonical_", "").replace(".jsonl", ""), merged_data, non_matched_data
+
+
+def store_days():
+    """(jour, fusionnés, non trouvés) depuis le stockage en colonnes, un mois en mémoire à la fois."""
+    months = update_store(DAILY_DIR, STORE_DIR)
+    print(f"🧊 {months} mois mis à jour dans {STORE_DIR}")
+    columns = ["date", "rang", "carte", "apparie", "lieu", "catégorie", "nature"]
+    day, merged_data, non_matched_data = None, [], []
+    for record in ordered_records(STORE_DIR, columns):
+        if record["date"] != day:
+            if day is not None:
+                yield day, merged_data, non_matched_data
+            day, merged_data, non_matched_data = record["date"], [], []
+        # Carte canonique : la même que dans les fichiers canoniques
+        attr = json.loads(record["carte"])
+        if tuple(attr["cle"]) in doublons_keys:
             continue  # Ignorer les doublons
-
-        consultation_match = consultation_index.get(key)
-        if consultation_match:
-            merged_item = {
-                "reference": attr["reference"],
-                "text": f"{attr['objet']} {attr['acheteur']} {consultation_match.get('lieu', '')} {consultation_match.get('catégorie', '')}".strip(),
-                "nature": consultation_match.get("nature", ""),
-                "montant": attr.get("montant", "")
-            }
-            merged_data.append(merged_item)
+        if record["apparie"]:
+            merged_data.append(canonical_merged(attr, join_of(record)))
         else:
             non_matched_data.append(attr)
+    if day is not None:
+        yield day, merged_data, non_matched_data
 
-    # Écriture du fichier fusionné
-    date_suffix = filename.replace("attributed_", "").replace(".json", "")
 
+total_merged = 0
+
+for date_suffix, merged_data, non_matched_data in (store_days() if STORE_DIR else canonical_days()):
+    # Écriture du fichier fusionné
     output_path = os.path.join(OUTPUT_DIR, f"merged_output_strict_montant_{date_suffix}.jsonl")
     with open(output_path, 'w', encoding='utf-8') as out:
         for item in merged_data:
@@ -108,4 +96,5 @@ for filename in attributed_files:
     print(f"✅ {len(merged_data)} fusionnés | ❗ {len(non_matched_data)} non trouvés → {date_suffix}")
     total_merged += len(merged_data)
 
+consultation_index.close()
 print(f"\n🎉 Fusion terminée pour tous les jours : {total_merged} éléments fusionnés.")
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from canonical import canonical_merged
+from consultation_index import CONSULT_FILES, INDEX_FILE, ConsultationIndex
+
+# Second passage, optionnel, sur les unmatched_output_strict_montant_*.jsonl :
+# les clés qui diffèrent d'une consultation par des espaces, de la
+# ponctuation, des accents ou quelques caractères de l'objet.
+# Comparer chaque enregistrement à toutes les consultations serait en
+# O(n·m). On cherche d'abord la clé compacte (sans accents, casse, espaces
+# ni ponctuation) ; sinon on ne compare qu'aux candidats de ses blocs :
+#   - même référence (chiffres et lettres seulement) ;
+#   - même bande MinHash (LSH) sur les trigrammes de caractères de l'objet.
+# Seuls les TOP_CANDIDATES candidats qui partagent le plus de blocs sont notés,
+# par similarité de Jaccard des trigrammes. Deux références non vides et
+# différentes désignent deux consultations différentes : le candidat est écarté
+# quel que soit son score (objet + acheteur atteignent à eux seuls THRESHOLD).
+# Usage : python fuzzy_join.py --mois 2025-07
+
+# --- Configuration ---
+OUTPUT_DIR = "merged_outputs"
+THRESHOLD = 0.8  # score minimal pour accepter un candidat
+NGRAM = 3
+NUM_PERM = 32  # permutations MinHash
+BANDS = 8  # bandes LSH de NUM_PERM // BANDS valeurs : seuil implicite ~0.6
+TOP_CANDIDATES = 20  # candidats notés au plus par enregistrement
+# Poids du score : objet, acheteur, référence
+WEIGHTS = (0.5, 0.3, 0.2)
+
+MERSENNE = (1 << 61) - 1
+_rng = np.random.RandomState(42)
+PERM_A = _rng.randint(1, 1 << 31, NUM_PERM).astype(np.uint64)
+PERM_B = _rng.randint(0, 1 << 31, NUM_PERM).astype(np.uint64)
+
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def loose(text):
+    """Minuscules, sans accents, toute ponctuation ramenée à un espace."""
+    text = unicodedata.normalize("NFD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    return NON_ALNUM_RE.sub(" ", text).strip()
+
+
+def compact(parts):
+    return "|".join(part.replace(" ", "") for part in parts)
+
+
+def shingles(text):
+    if len(text) <= NGRAM:
+        return {text} if text else set()
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(grams):
+    # Hachages 32 bits : (a*h + b) reste < 2^63, pas de débordement en uint64
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    return ((PERM_A[:, None] * hashes + PERM_B[:, None]) % MERSENNE).min(axis=1)
+
+
+def band_keys(grams):
+    if not grams:
+        return []
+    signature = minhash(grams)
+    rows = NUM_PERM // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+
+class BlockingIndex:
+    """Blocs référence / LSH sur les clés des consultations (chaînes seulement)."""
+
+    def __init__(self, keys):
+        self.keys = []
+        self.loose = []
+        self.by_compact = {}
+        self.by_reference = {}
+        self.by_band = {}
+        for key in keys:
+            i = len(self.keys)
+            parts = tuple(loose(part) for part in key)
+            reference, objet, acheteur = parts
+            self.keys.append(tuple(key))
+            self.loose.append(parts)
+            self.by_compact.setdefault(compact(parts), i)
+            if reference:
+                # Sans référence, pas de bloc : tous les "" formeraient un seul bloc géant
+                self.by_reference.setdefault(reference.replace(" ", ""), []).append(i)
+            for band in band_keys(shingles(objet)):
+                self.by_band.setdefault(band, []).append(i)
+
+    def candidates(self, reference, objet_grams):
+        # Une voix par bande LSH partagée, BANDS voix pour la même référence
+        votes = Counter()
+        if reference:
+            votes.update(dict.fromkeys(self.by_reference.get(reference.replace(" ", ""), ()), BANDS))
+        for band in band_keys(objet_grams):
+            votes.update(self.by_band.get(band, ()))
+        return [i for i, _ in votes.most_common(TOP_CANDIDATES)]
+
+    def best_match(self, record):
+        """(clé de la consultation, score, nb de candidats notés) du meilleur candidat."""
+        parts = tuple(loose(record.get(field, "")) for field in ("reference", "objet", "acheteur"))
+        exact = self.by_compact.get(compact(parts))
+        if exact is not None:
+            return self.keys[exact], 1.0, 0
+        reference = parts[0]
+        objet_grams = shingles(parts[1])
+        acheteur_grams = shingles(parts[2])
+        best, best_score = None, 0.0
+        candidates = self.candidates(reference, objet_grams)
+        for i in candidates:
+            c_reference, c_objet, c_acheteur = self.loose[i]
+            if reference and c_reference and reference.replace(" ", "") != c_reference.replace(" ", ""):
+                continue
+            score = (
+                WEIGHTS[0] * jaccard(objet_grams, shingles(c_objet))
+                + WEIGHTS[1] * jaccard(acheteur_grams, shingles(c_acheteur))
+                # Deux références vides ne sont pas une concordance
+                + WEIGHTS[2] * bool(reference and reference.replace(" ", "") == c_reference.replace(" ", ""))
+            )
+            if score > best_score:
+                best, best_score = self.keys[i], score
+        return best, best_score, len(candidates)
+
+
+def unmatched_files(output_dir, month=None):
+    prefix = "unmatched_output_strict_montant_"
+    return sorted(
+        f for f in os.listdir(output_dir)
+        if f.startswith(prefix) and f.endswith(".jsonl")
+        and (month is None or f[len(prefix):].startswith(month))
+    )
+
+
+def run(output_dir=OUTPUT_DIR, month=None, threshold=THRESHOLD, consult_index=INDEX_FILE,
+        consult_files=CONSULT_FILES):
+    with ConsultationIndex(consult_index) as index:
+        index.update(consult_files)
+        start = time.perf_counter()
+        blocking = BlockingIndex(index.keys())
+        build_s = time.perf_counter() - start
+        print(f"🧱 {len(blocking.keys)} consultations, {len(blocking.by_reference)} blocs référence, "
+              f"{len(blocking.by_band)} blocs LSH ({build_s:.2f} s)")
+
+        total = matched = compared = 0
+        start = time.perf_counter()
+        for filename in unmatched_files(output_dir, month):
+            date_suffix = filename.replace("unmatched_output_strict_montant_", "").replace(".jsonl", "")
+            merged_path = os.path.join(output_dir, f"merged_output_flou_montant_{date_suffix}.jsonl")
+            unmatched_path = os.path.join(output_dir, f"unmatched_output_flou_montant_{date_suffix}.jsonl")
+            day_matched = day_total = 0
+            with open(os.path.join(output_dir, filename), "r", encoding="utf-8") as f, \
+                    open(merged_path, "w", encoding="utf-8") as merged_out, \
+                    open(unmatched_path, "w", encoding="utf-8") as unmatched_out:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    attr = json.loads(line)
+                    day_total += 1
+                    key, score, n_candidates = blocking.best_match(attr)
+                    compared += n_candidates
+                    if key is not None and score >= threshold:
+                        item = canonical_merged(attr, index.get(key))
+                        item["score_flou"] = round(score, 3)
+                        merged_out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                        day_matched += 1
+                    else:
+                        unmatched_out.write(line if line.endswith("\n") else line + "\n")
+            print(f"🔎 {day_matched}/{day_total} appariés → {date_suffix}")
+            total += day_total
+            matched += day_matched
+        elapsed = time.perf_counter() - start
+
+    report = {
+        "mois": month,
+        "seuil": threshold,
+        "non_apparies_lus": total,
+        "apparies": matched,
+        "taux_appariement": round(matched / total, 4) if total else 0.0,
+        "candidats_moyens": round(compared / total, 2) if total else 0.0,
+        "secondes": round(elapsed, 2),
+        "enregistrements_par_s": round(total / elapsed, 1) if elapsed else 0.0,
+        "construction_blocs_s": round(build_s, 2),
+    }
+    print(
+        f"\n🎯 {matched}/{total} appariés ({report['taux_appariement']:.1%}) | "
+        f"{report['candidats_moyens']} candidats/enregistrement | "
+        f"{report['enregistrements_par_s']} enregistrements/s"
+    )
+    report_path = os.path.join(output_dir, f"rapport_flou_{month or 'tout'}.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📝 Rapport : {report_path}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Appariement approché des enregistrements non fusionnés")
+    parser.add_argument("--mois", help="Limiter aux jours d'un mois (AAAA-MM)")
+    parser.add_argument("--seuil", type=float, default=THRESHOLD, help="Score minimal (0-1)")
+    parser.add_argument("--sorties", default=OUTPUT_DIR, help="Dossier des sorties de fusionner.py")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.sorties, args.mois, args.seuil)
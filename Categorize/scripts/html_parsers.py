@@ -0,0 +1,333 @@
+import re
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from metrics import metrics
+
+# Deux implémentations interchangeables de l'extraction HTML, qui doivent
+# produire exactement les mêmes dictionnaires :
+# - "bs4"  : l'implémentation historique (BeautifulSoup)
+# - "lxml" : arbre lxml interrogé en XPath, nettement plus rapide
+# bench_parsers.py vérifie l'équivalence sur les fixtures et mesure le débit.
+# Les métriques distinguent la construction de l'arbre ("analyse") de la
+# lecture des champs ("extraction").
+
+RESULT_COUNT_RE = re.compile(r'Nombre de résultats\s*:\s*(\d+)')
+# Le lien d'une carte pointe vers sa page de détail : .../consultation/show/<id>
+DETAIL_ID_RE = re.compile(r'/consultation/show/(\d+)')
+
+DETAIL_EMPTY = "Page sans contenu structuré."
+DETAIL_INCOMPLETE = "Détails incomplets."
+
+
+# --- Backend BeautifulSoup ---
+
+def extract_card_data(card):
+    try:
+        ref = card.select_one('.font-bold.table__links')
+        objet = card.select_one('[data-bs-toggle="tooltip"]')
+        buyer = card.find('span', string=lambda s: s and "Acheteur" in s)
+        pub_date = card.find('span', string=lambda s: s and "Date de publication" in s)
+
+        reference = ref.text.strip().replace('Référence :', '') if ref else None
+        obj = objet.text.strip().replace('Objet :', '') if objet else None
+        acheteur = buyer.parent.text.replace('Acheteur :', '').strip() if buyer else None
+        date_pub = pub_date.parent.text.replace('Date de publication du résultat :', '').strip() if pub_date else None
+        link = card.find('a', href=DETAIL_ID_RE)
+        id_consultation = int(DETAIL_ID_RE.search(link['href']).group(1)) if link else None
+
+        right = card.select_one('.entreprise__rightSubCard--top')
+        if right:
+            devis = right.find(string=lambda s: "Nombre de devis reçus" in s)
+            nombre_devis = right.select_one("span span.font-bold").text.strip() if devis else None
+
+            spans = right.find_all('span', recursive=False)
+            attribue = False
+            entreprise = montant = None
+
+            if len(spans) >= 3:
+                entreprise = spans[1].find('span', class_='font-bold')
+                montant = spans[2].find('span', class_='font-bold')
+                entreprise = entreprise.text.strip() if entreprise else None
+                montant = montant.text.strip() if montant else None
+                attribue = entreprise is not None
+
+            return {
+                "reference": reference,
+                "objet": obj,
+                "acheteur": acheteur,
+                "date_publication": date_pub,
+                "nombre_devis": nombre_devis,
+                "attribue": attribue,
+                "entreprise_attributaire": entreprise if attribue else None,
+                "montant": montant if attribue else None,
+                "id_consultation": id_consultation
+            }
+    except Exception as e:
+        print(f"[extract_card_data] Erreur: {e}")
+    return None
+
+
+class SoupParser:
+    name = "bs4"
+
+    def _count(self, soup):
+        div = soup.find('div', class_='content__resultat')
+        if div:
+            match = RESULT_COUNT_RE.search(div.get_text(strip=True))
+            if match:
+                return int(match.group(1))
+        return None
+
+    def _cards(self, soup):
+        cards = soup.select('.entreprise__card')
+        return [extract_card_data(card) for card in cards if card]
+
+    def parse_listing(self, html):
+        """Page de résultats -> (nombre total de résultats ou None, cartes)."""
+        with metrics.span("analyse"):
+            soup = BeautifulSoup(html, 'lxml')
+        with metrics.span("extraction"):
+            return self._count(soup), self._cards(soup)
+
+    def parse_cards(self, html):
+        with metrics.span("analyse"):
+            soup = BeautifulSoup(html, 'lxml')
+        with metrics.span("extraction"):
+            return self._cards(soup)
+
+    def parse_detail(self, html, id_):
+        """Page de détail -> (consultation, None) ou (None, raison du rejet)."""
+        with metrics.span("analyse"):
+            soup = BeautifulSoup(html, "html.parser")
+        with metrics.span("extraction"):
+            return self._detail(soup, id_)
+
+    def _detail(self, soup, id_):
+        h4 = soup.find("h4")
+        objet_tag = soup.find("span", class_="text-black")
+        if not h4 or not objet_tag:
+            return None, DETAIL_EMPTY
+
+        reference = h4.text.strip()
+        objet = objet_tag.text.strip()
+
+        details = soup.find_all("div", class_="d-flex flex-column")
+        if len(details) < 6:
+            return None, DETAIL_INCOMPLETE
+
+        acheteur = details[0].find_all("span")[1].text.strip()
+        date_mise_en_ligne = details[1].find_all("span")[1].text.strip()
+        date_limite = details[2].find_all("span")[1].text.strip()
+        lieu = details[3].find_all("span")[1].text.strip()
+        categorie = details[4].find_all("span")[1].text.strip()
+        nature = details[5].find_all("span")[1].text.strip()
+
+        articles = []
+        accordion_items = soup.find_all("div", class_="accordion-item")
+        for item in accordion_items:
+            titre = item.find("button", class_="accordion-button").get_text(strip=True)
+            sous_cartes = item.find_all("div", class_="content__article--subMiniCard")
+            quantite = sous_cartes[1].text.strip() if len(sous_cartes) > 1 else "N/A"
+            articles.append({
+                "titre": titre,
+                "quantité": quantite
+            })
+
+        return {
+            "id": id_,
+            "référence": reference,
+            "objet": objet,
+            "acheteur": acheteur,
+            "date_mise_en_ligne": date_mise_en_ligne,
+            "date_limite": date_limite,
+            "lieu": lieu,
+            "catégorie": categorie,
+            "nature": nature,
+            "articles": articles
+        }, None
+
+
+# --- Backend lxml / XPath ---
+
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def text_of(node):
+    # Équivalent de Tag.text de BeautifulSoup
+    return str(node.text_content())
+
+
+def stripped_text_of(node):
+    # Équivalent de Tag.get_text(strip=True)
+    return "".join(s.strip() for s in node.itertext())
+
+
+def first(nodes):
+    return nodes[0] if nodes else None
+
+
+def string_span(keyword):
+    # Équivalent de find('span', string=lambda s: s and keyword in s) : le span
+    # ne doit avoir qu'un seul nœud enfant (sinon .string vaut None)
+    return f".//span[count(node()) = 1 and contains(string(.), '{keyword}')]"
+
+
+XP_CARDS = etree.XPath(f"//*[{has_class('entreprise__card')}]")
+XP_COUNT_DIV = etree.XPath(f"//div[{has_class('content__resultat')}]")
+XP_REF = etree.XPath(f".//*[{has_class('font-bold')} and {has_class('table__links')}]")
+XP_OBJET = etree.XPath(".//*[@data-bs-toggle='tooltip']")
+XP_BUYER = etree.XPath(string_span("Acheteur"))
+XP_PUB_DATE = etree.XPath(string_span("Date de publication"))
+XP_HREFS = etree.XPath(".//a/@href")
+XP_RIGHT = etree.XPath(f".//*[{has_class('entreprise__rightSubCard--top')}]")
+XP_DEVIS = etree.XPath(".//text()[contains(., 'Nombre de devis reçus')]")
+XP_DEVIS_VALUE = etree.XPath(f".//span[{has_class('font-bold')} and ancestor::span]")
+XP_CHILD_SPANS = etree.XPath("./span")
+XP_BOLD_SPAN = etree.XPath(f".//span[{has_class('font-bold')}]")
+
+XP_H4 = etree.XPath("//h4")
+XP_OBJET_TAG = etree.XPath(f"//span[{has_class('text-black')}]")
+XP_DETAILS = etree.XPath("//div[normalize-space(@class) = 'd-flex flex-column']")
+XP_SPANS = etree.XPath(".//span")
+XP_ACCORDION_ITEMS = etree.XPath(f"//div[{has_class('accordion-item')}]")
+XP_ACCORDION_BUTTON = etree.XPath(f".//button[{has_class('accordion-button')}]")
+XP_SUB_CARDS = etree.XPath(f".//div[{has_class('content__article--subMiniCard')}]")
+
+
+def extract_card_data_lxml(card):
+    try:
+        ref = first(XP_REF(card))
+        objet = first(XP_OBJET(card))
+        buyer = first(XP_BUYER(card))
+        pub_date = first(XP_PUB_DATE(card))
+
+        reference = text_of(ref).strip().replace('Référence :', '') if ref is not None else None
+        obj = text_of(objet).strip().replace('Objet :', '') if objet is not None else None
+        acheteur = text_of(buyer.getparent()).replace('Acheteur :', '').strip() if buyer is not None else None
+        date_pub = text_of(pub_date.getparent()).replace('Date de publication du résultat :', '').strip() if pub_date is not None else None
+        match = first([m for m in map(DETAIL_ID_RE.search, XP_HREFS(card)) if m])
+        id_consultation = int(match.group(1)) if match else None
+
+        right = first(XP_RIGHT(card))
+        if right is not None:
+            nombre_devis = text_of(XP_DEVIS_VALUE(right)[0]).strip() if XP_DEVIS(right) else None
+
+            spans = XP_CHILD_SPANS(right)
+            attribue = False
+            entreprise = montant = None
+
+            if len(spans) >= 3:
+                entreprise = first(XP_BOLD_SPAN(spans[1]))
+                montant = first(XP_BOLD_SPAN(spans[2]))
+                entreprise = text_of(entreprise).strip() if entreprise is not None else None
+                montant = text_of(montant).strip() if montant is not None else None
+                attribue = entreprise is not None
+
+            return {
+                "reference": reference,
+                "objet": obj,
+                "acheteur": acheteur,
+                "date_publication": date_pub,
+                "nombre_devis": nombre_devis,
+                "attribue": attribue,
+                "entreprise_attributaire": entreprise if attribue else None,
+                "montant": montant if attribue else None,
+                "id_consultation": id_consultation
+            }
+    except Exception as e:
+        print(f"[extract_card_data] Erreur: {e}")
+    return None
+
+
+class LxmlParser:
+    name = "lxml"
+
+    def _tree(self, html):
+        # document_fromstring refuse un document vide, BeautifulSoup non
+        return lxml.html.document_fromstring(html if html.strip() else "<html></html>")
+
+    def _count(self, tree):
+        div = first(XP_COUNT_DIV(tree))
+        if div is not None:
+            match = RESULT_COUNT_RE.search(stripped_text_of(div))
+            if match:
+                return int(match.group(1))
+        return None
+
+    def _cards(self, tree):
+        return [extract_card_data_lxml(card) for card in XP_CARDS(tree)]
+
+    def parse_listing(self, html):
+        with metrics.span("analyse"):
+            tree = self._tree(html)
+        with metrics.span("extraction"):
+            return self._count(tree), self._cards(tree)
+
+    def parse_cards(self, html):
+        with metrics.span("analyse"):
+            tree = self._tree(html)
+        with metrics.span("extraction"):
+            return self._cards(tree)
+
+    def parse_detail(self, html, id_):
+        with metrics.span("analyse"):
+            tree = self._tree(html)
+        with metrics.span("extraction"):
+            return self._detail(tree, id_)
+
+    def _detail(self, tree, id_):
+        h4 = first(XP_H4(tree))
+        objet_tag = first(XP_OBJET_TAG(tree))
+        if h4 is None or objet_tag is None:
+            return None, DETAIL_EMPTY
+
+        reference = text_of(h4).strip()
+        objet = text_of(objet_tag).strip()
+
+        details = XP_DETAILS(tree)
+        if len(details) < 6:
+            return None, DETAIL_INCOMPLETE
+
+        acheteur, date_mise_en_ligne, date_limite, lieu, categorie, nature = (
+            text_of(XP_SPANS(detail)[1]).strip() for detail in details[:6]
+        )
+
+        articles = []
+        for item in XP_ACCORDION_ITEMS(tree):
+            titre = stripped_text_of(XP_ACCORDION_BUTTON(item)[0])
+            sous_cartes = XP_SUB_CARDS(item)
+            quantite = text_of(sous_cartes[1]).strip() if len(sous_cartes) > 1 else "N/A"
+            articles.append({
+                "titre": titre,
+                "quantité": quantite
+            })
+
+        return {
+            "id": id_,
+            "référence": reference,
+            "objet": objet,
+            "acheteur": acheteur,
+            "date_mise_en_ligne": date_mise_en_ligne,
+            "date_limite": date_limite,
+            "lieu": lieu,
+            "catégorie": categorie,
+            "nature": nature,
+            "articles": articles
+        }, None
+
+
+PARSERS = {
+    SoupParser.name: SoupParser(),
+    LxmlParser.name: LxmlParser(),
+}
+
+
+def get_parser(name):
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Parseur inconnu : {name} (disponibles : {', '.join(PARSERS)})")
@@ -0,0 +1,116 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import brotli  # noqa: F401  (urllib3 décode "br" dès que le module est présent)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
+# Exceptions réseau/HTTP à intercepter par les scrapers, quel que soit le backend
+HTTP_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter dont les connexions signalent chaque ouverture de socket."""
+
+    def __init__(self, on_connect, **kwargs):
+        self.on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_connect = self.on_connect
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                on_connect()
+                super().connect()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                on_connect()
+                super().connect()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CountingHTTPConnectionPool", (HTTPConnectionPool,),
+                         {"ConnectionCls": CountingHTTPConnection}),
+            "https": type("CountingHTTPSConnectionPool", (HTTPSConnectionPool,),
+                          {"ConnectionCls": CountingHTTPSConnection}),
+        }
+
+
+class HttpClient:
+    """
+    Client HTTP partagé par les scrapers : connexions keep-alive réutilisées,
+    un pool par hôte dimensionné sur le nombre de workers, compression
+    gzip/brotli et HTTP/2 optionnel (httpx + h2). Compte les requêtes et les
+    connexions ouvertes pour mesurer le taux de réutilisation.
+    """
+
+    def __init__(self, pool_size=10, headers=None, http2=False):
+        self.lock = threading.Lock()
+        self.requests_count = 0
+        self.connections_count = 0
+        base_headers = {"Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+
+        if http2 and httpx is None:
+            print("[http_client] httpx/h2 non installés : repli sur HTTP/1.1 (requests).")
+        self.http2 = bool(http2 and httpx)
+
+        if self.http2:
+            self.session = httpx.Client(
+                http2=True,
+                headers=base_headers,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        else:
+            self.session = requests.Session()
+            self.session.headers.update(base_headers)
+            # pool_block : au-delà de pool_size, on attend une connexion libre
+            # au lieu d'en ouvrir une jetable
+            adapter = CountingAdapter(
+                self._on_connect, pool_connections=4, pool_maxsize=pool_size, pool_block=True
+            )
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def _on_connect(self):
+        with self.lock:
+            self.connections_count += 1
+
+    def _trace(self, event_name, info):
+        # Événements httpcore : une connexion TCP effectivement ouverte
+        if event_name == "connection.connect_tcp.complete":
+            self._on_connect()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.requests_count += 1
+        if self.http2:
+            return self.session.get(url, timeout=timeout, extensions={"trace": self._trace})
+        return self.session.get(url, timeout=timeout)
+
+    def stats(self):
+        connections = self.connections_count
+        reused = max(0, self.requests_count - connections)
+        return {
+            "requetes": self.requests_count,
+            "connexions": connections,
+            "reutilisations": reused,
+            "taux_reutilisation": round(reused / self.requests_count, 3) if self.requests_count else 0.0,
+            "http2": self.http2,
+        }
+
+    def close(self):
+        self.session.close()
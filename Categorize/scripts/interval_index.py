@@ -0,0 +1,108 @@
+import json
+import sys
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# Index d'intervalles de montants, construit une fois : bornes triées,
+# bisect pour un montant, numpy.searchsorted pour une colonne entière.
+# Les classes sont des entiers (position dans la liste d'intervalles, -1 si
+# aucun ne contient le montant) ; les libellés "min-max" sont calculés et
+# internés à la construction, pas à chaque recherche.
+# Deux constructions :
+#   - from_file / from_config : intervals.json ([{"min", "max", "step"}]),
+#     intervalles [min, max) ; à bornes qui se chevauchent, le premier de la
+#     liste l'emporte, comme l'ancien parcours linéaire de get_interval ;
+#   - from_percentiles : classes par percentiles de
+#     HiData/categorize_with_diffrent_range.py, intervalles ]seuil, seuil].
+# Usage : python interval_index.py ../intervals.json 12345.5 250000
+
+# --- Configuration ---
+INTERVALS_FILE = "../intervals.json"
+NO_BIN = -1
+
+
+def config_intervals(config):
+    """[{"min", "max", "step"}] -> [(bas, haut)] ; bornes min + k * step, sans cumul d'erreurs flottantes."""
+    intervals = []
+    for bloc in config:
+        min_, max_, step = bloc["min"], bloc["max"], bloc["step"]
+        k = 0
+        while min_ + k * step < max_:
+            intervals.append((min_ + k * step, min_ + (k + 1) * step))
+            k += 1
+    return intervals
+
+
+class IntervalIndex:
+    def __init__(self, bounds, segment_bins, labels, closed="left", intervals=None):
+        # segment_bins[p] : classe des montants placés en position p parmi les bornes
+        # (bisect_right si les intervalles sont fermés à gauche, bisect_left sinon)
+        self.bounds = list(bounds)
+        self.segment_bins = list(segment_bins)
+        self.labels = [sys.intern(label) for label in labels]
+        self.closed = closed
+        self.intervals = intervals or []
+        self._bounds_array = np.array(self.bounds, dtype=np.float64)
+        self._bins_array = np.array(self.segment_bins, dtype=np.int64)
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        """Intervalles [bas, haut), par ordre de priorité."""
+        bounds = sorted({b for interval in intervals for b in interval})
+        segment_bins = [NO_BIN] * (len(bounds) + 1)
+        # Parcours à rebours : un intervalle plus haut dans la liste écrase les suivants
+        for bin_id in range(len(intervals) - 1, -1, -1):
+            low, high = intervals[bin_id]
+            for p in range(bisect_left(bounds, low) + 1, bisect_left(bounds, high) + 1):
+                segment_bins[p] = bin_id
+        labels = [f"{low}-{high}" for low, high in intervals]
+        return cls(bounds, segment_bins, labels, "left", intervals)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls.from_intervals(config_intervals(config))
+
+    @classmethod
+    def from_file(cls, path=INTERVALS_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_config(json.load(f))
+
+    @classmethod
+    def from_percentiles(cls, amounts, n_bins):
+        """n_bins classes de même effectif : categorie_01 (<= 1er seuil) ... categorie_<n_bins> (au-delà)."""
+        thresholds = np.percentile(amounts, [100 / n_bins * i for i in range(1, n_bins)])
+        labels = [f"categorie_{i + 1:02d}" for i in range(n_bins)]
+        return cls(thresholds.tolist(), range(n_bins), labels, "right")
+
+    def __len__(self):
+        return len(self.labels)
+
+    def lookup(self, montant):
+        """Classe d'un montant ; NO_BIN hors des intervalles (ou montant NaN)."""
+        if montant != montant:
+            # NaN : placé après toutes les bornes, comme numpy.searchsorted
+            return self.segment_bins[-1]
+        if self.closed == "left":
+            return self.segment_bins[bisect_right(self.bounds, montant)]
+        return self.segment_bins[bisect_left(self.bounds, montant)]
+
+    def lookup_many(self, montants):
+        """Classes d'une colonne de montants (tableau numpy int64)."""
+        side = "right" if self.closed == "left" else "left"
+        positions = np.searchsorted(self._bounds_array, np.asarray(montants, dtype=np.float64), side=side)
+        return self._bins_array[positions]
+
+    def label(self, bin_id):
+        return None if bin_id == NO_BIN else self.labels[bin_id]
+
+    def label_of(self, montant):
+        return self.label(self.lookup(montant))
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else INTERVALS_FILE
+    index = IntervalIndex.from_file(path)
+    print(f"{len(index)} intervalles chargés depuis {path}.")
+    for value in sys.argv[2:]:
+        print(f"{value} -> {index.label_of(float(value))}")
@@ -1,29 +1,46 @@
 import os
 import json
 
+from canonical import raw_card
+from columnar_store import ordered_records, update_store
+
 # --- Configuration ---
 DAILY_DIR = "data_daily"
 OUTPUT_FILE = "merged_attributed.jsonl"
-
-# --- Filtrage des fichiers à fusionner ---
-files = sorted([
-    f for f in os.listdir(DAILY_DIR)
-    if f.startswith("attributed_") and f.endswith(".json")
-])
+# Stockage en colonnes (columnar_store.py), ex. os.path.join(DAILY_DIR, "store") :
+# seule la colonne "carte" est lue, sur [DATE_DEBUT, DATE_FIN] (AAAA-MM-JJ) ;
+# la sortie est la même qu'en lisant les fichiers.
+STORE_DIR = None
+DATE_DEBUT = DATE_FIN = None
 
 total_records = 0
 
-# --- Fusion des fichiers ---
-with open(OUTPUT_FILE, "w", encoding="utf-8") as outfile:
-    for file in files:
-        full_path = os.path.join(DAILY_DIR, file)
-        try:
-            with open(full_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for record in data:
-                    outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
-                    total_records += 1
-        except Exception as e:
-            print(f"❌ Erreur dans le fichier {file} : {e}")
+if STORE_DIR:
+    # --- Lecture du stockage en colonnes ---
+    update_store(DAILY_DIR, STORE_DIR)
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as outfile:
+        for record in ordered_records(STORE_DIR, ["carte"], DATE_DEBUT, DATE_FIN):
+            card = raw_card(json.loads(record["carte"]))
+            outfile.write(json.dumps(card, ensure_ascii=False) + "\n")
+            total_records += 1
+else:
+    # --- Filtrage des fichiers à fusionner ---
+    files = sorted([
+        f for f in os.listdir(DAILY_DIR)
+        if f.startswith("attributed_") and f.endswith(".json")
+    ])
+
+    # --- Fusion des fichiers ---
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as outfile:
+        for file in files:
+            full_path = os.path.join(DAILY_DIR, file)
+            try:
+                with open(full_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    for record in data:
+                        outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        total_records += 1
+            except Exception as e:
+                print(f"❌ Erreur dans le fichier {file} : {e}")
 
 print(f"✅ Fusion terminée : {total_records} enregistrements écrits dans {OUTPUT_FILE}")
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Instrumentation des scrapers : durée, nombre d'appels, erreurs et
+# parallélisme de chaque étape (requete, analyse, extraction, ecriture).
+# Un registre global `metrics` est partagé par les modules ; en fin de run,
+# export() écrit un fichier texte Prometheus (.prom, pour le textfile
+# collector de node_exporter) et un résumé JSON.
+
+# Bornes des histogrammes, en secondes
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # dernière case : +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimation par la borne haute du bucket qui contient le quantile q."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self._clear()
+
+    def reset_after_fork(self):
+        """
+        Dans un processus forké : registre vide et nouveau verrou. Le verrou
+        hérité n'est pas pris, il a pu être copié pendant qu'un thread du
+        parent le tenait.
+        """
+        self.lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.histograms = {}
+        self.errors = {}
+        self.counters = {}
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.started = time.time()
+
+    def start(self, stage):
+        """Entrée dans une étape ; renvoie l'instant de départ à passer à stop()."""
+        with self.lock:
+            self.in_flight[stage] = self.in_flight.get(stage, 0) + 1
+            self.max_in_flight[stage] = max(self.max_in_flight.get(stage, 0), self.in_flight[stage])
+        return time.perf_counter()
+
+    def stop(self, stage, started, failed=False):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.in_flight[stage] -= 1
+            self.histograms.setdefault(stage, Histogram()).observe(elapsed)
+            if failed:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    @contextmanager
+    def span(self, stage):
+        """Chronomètre un passage dans l'étape stage (les exceptions comptent comme erreurs)."""
+        started = self.start(stage)
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.stop(stage, started, failed)
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def drain(self):
+        """
+        Renvoie puis remet à zéro les mesures accumulées : utilisé dans les
+        processus d'analyse pour renvoyer leurs mesures au processus principal.
+        """
+        with self.lock:
+            snapshot = (self.histograms, self.errors, self.counters)
+            self.histograms, self.errors, self.counters = {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        histograms, errors, counters = snapshot
+        with self.lock:
+            for stage, histogram in histograms.items():
+                self.histograms.setdefault(stage, Histogram()).merge(histogram)
+            for stage, n in errors.items():
+                self.errors[stage] = self.errors.get(stage, 0) + n
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        with self.lock:
+            stages = {}
+            for stage, h in sorted(self.histograms.items()):
+                stages[stage] = {
+                    "appels": h.count,
+                    "erreurs": self.errors.get(stage, 0),
+                    "total_s": round(h.sum, 3),
+                    "moyenne_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                    "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                    "max_ms": round(h.max * 1000, 2),
+                    "en_cours_max": self.max_in_flight.get(stage, 0),
+                }
+            return {
+                "debut": self.started,
+                "duree_s": round(time.time() - self.started, 3),
+                "etapes": stages,
+                "compteurs": dict(sorted(self.counters.items())),
+            }
+
+    def prometheus(self, job):
+        lines = []
+        with self.lock:
+            lines += [
+                "# HELP bdc_etape_duree_secondes Durée des étapes du scraping",
+                "# TYPE bdc_etape_duree_secondes histogram",
+            ]
+            for stage, h in sorted(self.histograms.items()):
+                labels = f'job="{job}",etape="{stage}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'bdc_etape_duree_secondes_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'bdc_etape_duree_secondes_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"bdc_etape_duree_secondes_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"bdc_etape_duree_secondes_count{{{labels}}} {h.count}")
+            lines += [
+                "# HELP bdc_etape_erreurs_total Passages d'étape terminés par une exception",
+                "# TYPE bdc_etape_erreurs_total counter",
+            ]
+            for stage in sorted(self.histograms):
+                lines.append(f'bdc_etape_erreurs_total{{job="{job}",etape="{stage}"}} {self.errors.get(stage, 0)}')
+            lines += [
+                "# HELP bdc_etape_en_cours Passages d'étape en cours",
+                "# TYPE bdc_etape_en_cours gauge",
+            ]
+            for stage in sorted(self.in_flight):
+                lines.append(f'bdc_etape_en_cours{{job="{job}",etape="{stage}"}} {self.in_flight[stage]}')
+            lines += [
+                "# HELP bdc_etape_en_cours_max Maximum de passages simultanés pendant le run",
+                "# TYPE bdc_etape_en_cours_max gauge",
+            ]
+            for stage in sorted(self.max_in_flight):
+                lines.append(f'bdc_etape_en_cours_max{{job="{job}",etape="{stage}"}} {self.max_in_flight[stage]}')
+            for name in sorted(self.counters):
+                lines.append(f"# TYPE bdc_{name}_total counter")
+                lines.append(f'bdc_{name}_total{{job="{job}"}} {self.counters[name]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory, job):
+        """Écrit <directory>/metrics_<job>.prom et metrics_<job>.json ; renvoie le résumé."""
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, f"metrics_{job}.prom")
+        json_path = os.path.join(directory, f"metrics_{job}.json")
+        # Renommage atomique : le collector ne lit jamais un fichier à moitié écrit
+        with open(prom_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus(job))
+        os.replace(prom_path + ".tmp", prom_path)
+        summary = self.summary()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        for stage, s in summary["etapes"].items():
+            print(
+                f"⏱️  {stage:<12} {s['appels']:6d} appels | {s['total_s']:8.2f} s | "
+                f"p50 {s['p50_ms']:.1f} ms | p99 {s['p99_ms']:.1f} ms | "
+                f"{s['erreurs']} erreurs | {s['en_cours_max']} en parallèle max"
+            )
+        print(f"📈 Métriques : {prom_path}, {json_path}")
+        return summary
+
+
+metrics = Metrics()
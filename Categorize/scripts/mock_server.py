@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Faux marchespublics.gov.ma pour mesurer les scrapers hors ligne, à partir
+# des fixtures enregistrées :
+# - /bdc/entreprise/consultation/resultat : pages de résultats générées en
+#   recopiant les cartes de fixtures/resultats_page.html (ID et date adaptés)
+# - /bdc/entreprise/consultation/show/<id> : fixtures/detail_page.html (ou
+#   detail_vide.html pour une part des IDs)
+# Latence, taux d'erreurs 503 et rafales de 429 (avec Retry-After) sont
+# configurables. Usage : python mock_server.py --port 8765 --latence 50 --erreurs 0.05
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LISTING_PATH = "/bdc/entreprise/consultation/resultat"
+DETAIL_RE = re.compile(r"/bdc/entreprise/consultation/show/(\d+)")
+CARD_RE = re.compile(r'  <div class="entreprise__card">.*?\n  </div>\n', re.S)
+DATE_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
+COUNT_RE = re.compile(r'(Nombre de résultats : <span class="font-bold">)\d+')
+PARAM = "search_consultation_resultats[{}]"
+BASE_ID = 200000
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class MockSite:
+    """Contenu du faux site : nombre de résultats par jour, pages et détails."""
+
+    def __init__(self, weekday_results=(20, 180), weekend_results=(0, 3), empty_detail_rate=0.05, seed=0):
+        listing = read_fixture("resultats_page.html")
+        cards = CARD_RE.findall(listing)
+        # Seules les cartes datées servent de modèle : une carte sans date ne
+        # peut pas être rattachée à un jour dans une recherche sur une fenêtre
+        self.card_templates = [c for c in cards if DATE_RE.search(c)]
+        self.header = COUNT_RE.sub(r"\g<1>{total}", listing[:listing.index(cards[0])])
+        self.footer = listing[listing.index(cards[-1]) + len(cards[-1]):]
+        self.detail = read_fixture("detail_page.html").encode("utf-8")
+        self.detail_empty = read_fixture("detail_vide.html").encode("utf-8")
+        self.weekday_results = weekday_results
+        self.weekend_results = weekend_results
+        self.empty_detail_rate = empty_detail_rate
+        self.seed = seed
+
+    def day_count(self, day):
+        # Déterministe : le même jour a toujours le même nombre de résultats
+        rng = random.Random(f"{self.seed}-{day.isoformat()}")
+        low, high = self.weekend_results if day.weekday() >= 5 else self.weekday_results
+        return rng.randint(low, high)
+
+    def day_id(self, day, index):
+        return BASE_ID + (day - datetime(2020, 1, 1).date()).days * 1000 + index
+
+    def card(self, day, index):
+        template = self.card_templates[index % len(self.card_templates)]
+        card = DETAIL_RE.sub(f"/bdc/entreprise/consultation/show/{self.day_id(day, index)}", template)
+        return DATE_RE.sub(day.strftime("%d/%m/%Y"), card)
+
+    def listing(self, start, end, page, page_size):
+        days = []
+        day = start
+        while day <= end:
+            days.append((day, self.day_count(day)))
+            day += timedelta(days=1)
+        total = sum(count for _, count in days)
+        first, last = (page - 1) * page_size, page * page_size
+        cards, position = [], 0
+        for day, count in days:
+            for index in range(count):
+                if first <= position < last:
+                    cards.append(self.card(day, index))
+                position += 1
+        return (self.header.replace("{total}", str(total)) + "".join(cards) + self.footer).encode("utf-8")
+
+    def detail_page(self, id_):
+        rng = random.Random(f"{self.seed}-detail-{id_}")
+        return self.detail_empty if rng.random() < self.empty_detail_rate else self.detail
+
+
+class MockServer:
+    """
+    Serveur HTTP local dans un thread. latency en secondes (± jitter),
+    error_rate : part de réponses 503, burst_every/burst_duration : toutes les
+    burst_every secondes, toutes les requêtes reçoivent un 429 pendant
+    burst_duration secondes.
+    """
+
+    def __init__(self, site=None, host="127.0.0.1", port=0, latency=0.05, jitter=0.5,
+                 error_rate=0.0, burst_every=0.0, burst_duration=0.0, retry_after=1):
+        self.site = site or MockSite()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.started = time.monotonic()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, status):
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+
+    def _in_burst(self):
+        if not self.burst_every or not self.burst_duration:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_duration
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_body(self, status, body=b"", extra_headers=()):
+                server._count(status)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in extra_headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency * random.uniform(1 - server.jitter, 1 + server.jitter))
+                if server._in_burst():
+                    return self.send_body(429, extra_headers=[("Retry-After", str(server.retry_after))])
+                if random.random() < server.error_rate:
+                    return self.send_body(503)
+                parts = urlsplit(self.path)
+                match = DETAIL_RE.fullmatch(parts.path)
+                if match:
+                    return self.send_body(200, server.site.detail_page(int(match.group(1))))
+                if parts.path != LISTING_PATH:
+                    return self.send_body(404)
+                query = parse_qs(parts.query, keep_blank_values=True)
+                try:
+                    start = datetime.strptime(query[PARAM.format("dateLimitePublicationStart")][0], "%Y-%m-%d").date()
+                    end = datetime.strptime(query[PARAM.format("dateLimitePublicationEnd")][0], "%Y-%m-%d").date()
+                    page_size = int(query.get(PARAM.format("pageSize"), ["10"])[0])
+                    page = int(query.get("page", ["1"])[0])
+                except (KeyError, ValueError):
+                    return self.send_body(400)
+                self.send_body(200, server.site.listing(start, end, page, page_size))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux marchespublics.gov.ma à partir des fixtures")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latence", type=float, default=50, help="Latence moyenne en ms")
+    parser.add_argument("--erreurs", type=float, default=0.0, help="Part de réponses 503 (0-1)")
+    parser.add_argument("--rafale-toutes", type=float, default=0.0, metavar="S",
+                        help="Une rafale de 429 toutes les S secondes")
+    parser.add_argument("--rafale-duree", type=float, default=0.0, metavar="S", help="Durée d'une rafale de 429")
+    args = parser.parse_args()
+
+    server = MockServer(port=args.port, latency=args.latence / 1000, error_rate=args.erreurs,
+                        burst_every=args.rafale_toutes, burst_duration=args.rafale_duree)
+    print(f"🧪 Faux site sur {server.url}{LISTING_PATH} (Ctrl+C pour arrêter)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Réponses servies : {json.dumps(server.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from metrics import metrics
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+_STOP = object()
+
+
+class NdjsonWriter:
+    """
+    Écriture NDJSON dans un thread dédié. Les workers déposent leurs lignes
+    dans une file bornée ; le thread les regroupe et écrit par lots (tous les
+    batch_size enregistrements ou toutes les flush_interval secondes), puis
+    fait un fsync au plus toutes les fsync_interval secondes.
+
+    Le callback on_durable passé à write() n'est appelé qu'une fois la ligne
+    fsyncée : c'est là qu'il faut marquer l'enregistrement comme terminé dans
+    le checkpoint, pour ne jamais déclarer "ok" une ligne perdue par un crash.
+    """
+
+    def __init__(self, path, compression=None, batch_size=500, flush_interval=1.0,
+                 fsync_interval=5.0, max_queue=10000):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Compression inconnue : {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Le module zstandard n'est pas installé.")
+        self.path = path + COMPRESSION_SUFFIXES[compression]
+        self.compression = compression
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+        self.lines_written = 0
+        self.batches_written = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.raw = open(self.path, "ab")
+        if compression == "gzip":
+            # En append, chaque run ajoute un membre gzip : le fichier reste lisible
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode="ab")
+        elif compression == "zstd":
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+
+        self.thread = threading.Thread(target=self._run, name="ndjson-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, record, on_durable=None):
+        if self.error:
+            raise self.error
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self.queue.put((line, on_durable))
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        with metrics.span("ecriture"):
+            self.stream.write("".join(batch).encode("utf-8"))
+            if self.compression == "zstd":
+                self.stream.flush(zstandard.FLUSH_BLOCK)
+            else:
+                self.stream.flush()
+            self.raw.flush()
+        self.lines_written += len(batch)
+        self.batches_written += 1
+        batch.clear()
+
+    def _sync(self, callbacks):
+        os.fsync(self.raw.fileno())
+        for callback in callbacks:
+            callback()
+        callbacks.clear()
+
+    def _run(self):
+        batch, callbacks = [], []
+        last_flush = last_sync = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    line, on_durable = item
+                    batch.append(line)
+                    if on_durable:
+                        callbacks.append(on_durable)
+
+                now = time.monotonic()
+                if len(batch) >= self.batch_size or (batch and now - last_flush >= self.flush_interval):
+                    self._flush(batch)
+                    last_flush = now
+                if callbacks and not batch and now - last_sync >= self.fsync_interval:
+                    self._sync(callbacks)
+                    last_sync = now
+            self._flush(batch)
+            self._sync(callbacks)
+        except Exception as e:
+            self.error = e
+            # Vide la file pour ne pas bloquer les producteurs
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.stream.close()
+        if not self.raw.closed:
+            self.raw.close()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
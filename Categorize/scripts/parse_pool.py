@@ -0,0 +1,137 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from html_parsers import get_parser
+from metrics import metrics
+
+# Étage d'analyse HTML hors GIL : les threads I/O ne font que télécharger et
+# confient les pages brutes à des processus dédiés. Les fonctions *_job sont
+# au niveau module pour rester picklables (spawn sous Windows).
+
+_parser = None
+_EXHAUSTED = object()
+
+
+def _load_parser(parser_name):
+    global _parser
+    _parser = get_parser(parser_name)
+
+
+def _init_worker(parser_name):
+    _load_parser(parser_name)
+    # Un processus forké hérite des mesures du parent : on repart de zéro
+    # pour ne pas les renvoyer en double, sans toucher au verrou hérité
+    metrics.reset_after_fork()
+
+
+def listing_job(html):
+    return _parser.parse_listing(html)
+
+
+def cards_job(html):
+    return _parser.parse_cards(html)
+
+
+def detail_job(html, id_):
+    return _parser.parse_detail(html, id_)
+
+
+def _measured_job(job, *args):
+    # Dans un processus d'analyse : les mesures du job repartent avec son
+    # résultat pour être fusionnées dans le registre du processus principal
+    return job(*args), metrics.drain()
+
+
+def _unwrap(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+        return
+    result, snapshot = source.result()
+    metrics.merge(snapshot)
+    target.set_result(result)
+
+
+class ParsePool:
+    """
+    Pool de processus d'analyse. Avec workers=0, l'analyse se fait dans le
+    thread appelant (comportement historique, utile pour déboguer).
+    """
+
+    def __init__(self, workers, parser_name):
+        self.workers = workers
+        self.parser_name = parser_name
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(parser_name,)
+            )
+        else:
+            self.executor = None
+            # Analyse dans ce processus : ses mesures ne doivent pas être effacées
+            _load_parser(parser_name)
+
+    def submit(self, job, *args):
+        if self.executor is not None:
+            # "file_analyse" : du dépôt au résultat, attente du pool comprise
+            started = metrics.start("file_analyse")
+            future = Future()
+
+            def done(source):
+                metrics.stop("file_analyse", started, source.exception() is not None)
+                _unwrap(source, future)
+
+            self.executor.submit(_measured_job, job, *args).add_done_callback(done)
+            return future
+        future = Future()
+        try:
+            future.set_result(job(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pipeline(items, fetch, submit_parse, io_workers, max_in_flight=None):
+    """
+    Pipeline à deux étages : fetch(item) tourne dans io_workers threads et
+    renvoie le corps brut (ou None en cas d'échec), submit_parse(body, item)
+    renvoie un Future d'analyse. Génère (item, ok, résultat) au fil de l'eau,
+    dans l'ordre de complétion.
+
+    items est consommé paresseusement : au plus max_in_flight éléments
+    (téléchargement ou analyse en cours) existent à un instant donné, si bien
+    que la mémoire ne dépend pas de la taille de l'intervalle.
+    """
+    window = max_in_flight or io_workers * 4
+    items = iter(items)
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=io_workers) as executor:
+        def refill():
+            while len(pending) < window:
+                item = next(items, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    return
+                pending[executor.submit(fetch, item)] = ("fetch", item)
+
+        refill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item = pending.pop(future)
+                if stage == "parse":
+                    yield item, True, future.result()
+                    continue
+                body = future.result()
+                if body is None:
+                    yield item, False, None
+                else:
+                    pending[submit_parse(body, item)] = ("parse", item)
+            refill()
@@ -1,38 +1,35 @@
 import json
 import os
-import re
-import unicodedata
 from collections import defaultdict
 from pathlib import Path
-from string import punctuation
-from nltk.corpus import stopwords
+
+from canonical import montant_value
+from columnar_store import merged_records, store_months
+from duplicate_index import load_excluded_keys
+from tokenizer import tokenize
 
 # === Configuration ===
 data_dir = "C:/Users/pc/Desktop/NewData/data/natures_new"
 lemmes_dir = "C:/Users/pc/Desktop/NewData/data/resultats_par_nature"
 output_dir = "C:/Users/pc/Desktop/NewData/data/prediction/prediction_results/new_data"
+# Stockage en colonnes (columnar_store.py) à lire mois par mois au lieu de
+# data_dir, ex. "data_daily/store" ; seules les colonnes utiles sont décodées
+store_dir = None
+doublons_file = "doublons.jsonl"  # écartés comme dans fusionner.py, avec store_dir
 os.makedirs(output_dir, exist_ok=True)
 
-# === Stopwords ===
-STOPWORDS = set(stopwords.words("french"))
-
 # === Nettoyage et normalisation du texte ===
-def clean_and_tokenize(text):
-    text = text.lower()
-    text = unicodedata.normalize('NFD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(rf"[{punctuation}]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    tokens = [t for t in text.strip().split() if t not in STOPWORDS and len(t) > 2]
-    return set(tokens)
+# Les enregistrements canoniques (canonical.py) portent déjà leurs tokens
+def clean_and_tokenize(item):
+    if "tokens" in item:
+        return set(item["tokens"])
+    return set(tokenize(item.get("text", "")))
 
 # === Parse montant ===
-def parse_montant(montant_str):
-    montant_str = montant_str.replace("MAD", "").replace(",", ".").replace(" ", "")
-    try:
-        return float(montant_str)
-    except:
-        return None
+def parse_montant(item):
+    if "montant_valeur" in item:
+        return item["montant_valeur"]
+    return montant_value(item.get("montant", ""))
 
 # === Fonction pour nom fichier nature ===
 def normaliser_nom_fichier_nature(nature):
@@ -40,21 +37,14 @@ def normaliser_nom_fichier_nature(nature):
     return nom
 
 # === Prédiction ===
-for filename in os.listdir(data_dir):
-    if not filename.endswith(".jsonl"):
-        continue
-
-    filepath = os.path.join(data_dir, filename)
-    with open(filepath, "r", encoding="utf-8") as f:
-        entries = [json.loads(line) for line in f if line.strip()]
-
+def predire(entries, date_part, source):
     detailed_results = []
     stats_by_nature = defaultdict(lambda: {"total": 0, "correct": 0})
 
     for item in entries:
         nature = item.get("nature")
         text = item.get("text", "")
-        montant_real = parse_montant(item.get("montant", ""))
+        montant_real = parse_montant(item)
         reference = item.get("reference", "")
 
         if not nature:
@@ -67,7 +57,7 @@ for filename in os.listdir(data_dir):
             print(f"⚠️  Fichier introuvable pour nature: {nature} → {lemme_file}")
             continue
 
-        racines = clean_and_tokenize(text)
+        racines = clean_and_tokenize(item)
 
         with open(lemme_file, "r", encoding="utf-8") as f:
             interv_dict = json.load(f)
@@ -103,7 +93,6 @@ for filename in os.listdir(data_dir):
         })
 
     # Sauvegarde des résultats
-    date_part = filename.replace("merged_output_strict_montant_", "").replace(".jsonl", "")
     result_path = os.path.join(output_dir, f"results_{date_part}.json")
     stats_path = os.path.join(output_dir, f"stats_{date_part}.json")
 
@@ -120,4 +109,22 @@ for filename in os.listdir(data_dir):
         }
         json.dump(stats_pct, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ {filename} → {len(detailed_results)} éléments prédits, stats enregistrées.")
+    print(f"✅ {source} → {len(detailed_results)} éléments prédits, stats enregistrées.")
+
+
+if store_dir:
+    doublons = load_excluded_keys(doublons_file)
+    for month in store_months(store_dir):
+        entries = list(merged_records(store_dir, f"{month}-01", f"{month}-31", excluded=doublons))
+        predire(entries, month, f"{store_dir} ({month})")
+else:
+    for filename in os.listdir(data_dir):
+        if not filename.endswith(".jsonl"):
+            continue
+
+        filepath = os.path.join(data_dir, filename)
+        with open(filepath, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+
+        date_part = filename.replace("merged_output_strict_montant_", "").replace(".jsonl", "")
+        predire(entries, date_part, filename)
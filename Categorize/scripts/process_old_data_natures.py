@@ -1,60 +1,55 @@
 import json
-import re
-import unicodedata
 from collections import defaultdict
 from pathlib import Path
-from string import punctuation
-from nltk.corpus import stopwords
+
+from canonical import montant_value
+from columnar_store import merged_records
+from duplicate_index import load_excluded_keys
+from interval_index import NO_BIN, IntervalIndex
+from tokenizer import tokenize
 
 # === PARAMÈTRES ===
 FICHIER_INTERVALS = "C:/Users/pc/Desktop/NewData/data/intervals.json"
 DOSSIER_DATA = "C:/Users/pc/Desktop/NewData/data/natures"  # contient les fichiers data_nature_xx.jsonl
 DOSSIER_SORTIE = "C:/Users/pc/Desktop/NewData/data/resultats_par_nature"
 FICHIER_INTERVALS_OUT = "intervalles.json"
-
-# === STOPWORDS FRANÇAIS ===
-STOPWORDS = set(stopwords.words('french'))
-
-
-def normalize_text(text):
-    text = text.lower()
-    text = unicodedata.normalize('NFD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(rf"[{punctuation}]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-
-def convertir_montant(montant_str):
-    montant_str = montant_str.replace("MAD", "").replace(",", ".").replace(" ", "").strip()
-    try:
-        return float(montant_str)
-    except ValueError:
-        return None
+# Stockage en colonnes (columnar_store.py) à lire au lieu de DOSSIER_DATA, ex.
+# "data_daily/store" ; seules les colonnes utiles sont décodées. None : fichiers
+STORE_DIR = None
+DATE_DEBUT = DATE_FIN = None  # AAAA-MM-JJ, avec STORE_DIR uniquement
+FICHIER_DOUBLONS = "doublons.jsonl"  # écartés comme dans fusionner.py, avec STORE_DIR
 
 
 def charger_intervalles(fichier):
     print(f"Chargement des intervalles depuis {fichier}...")
-    with open(fichier, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    index = IntervalIndex.from_file(fichier)
+    print(f"{len(index)} intervalles chargés.")
+    return index
 
-    intervalles = []
-    for bloc in config:
-        min_, max_, step = bloc["min"], bloc["max"], bloc["step"]
-        val = min_
-        while val < max_:
-            intervalles.append((val, val + step))
-            val += step
 
-    print(f"{len(intervalles)} intervalles chargés.")
-    return intervalles
+def traiter_enregistrement(data, intervalles, regroupement):
+    """Ajoute les tokens d'un enregistrement fusionné à sa nature et son intervalle ; False s'il est écarté."""
+    # Enregistrements canoniques (canonical.py) : montant et tokens déjà calculés
+    if "montant_valeur" in data:
+        montant = data["montant_valeur"]
+    else:
+        montant = montant_value(data.get("montant", ""))
+    nature = data.get("nature", "").strip()
+    texte = data.get("text", "")
 
+    if montant is None or not nature or not texte:
+        return False
 
-def get_interval(montant, intervalles):
-    for interval in intervalles:
-        if interval[0] <= montant < interval[1]:
-            return f"{interval[0]}-{interval[1]}"
-    return None
+    interval = intervalles.lookup(montant)
+    if interval == NO_BIN:
+        return False
+
+    if "tokens" in data:
+        tokens = data["tokens"]
+    else:
+        tokens = tokenize(texte)
+    regroupement[nature][interval].append(tokens)
+    return True
 
 
 def traiter_fichier(fichier_path, intervalles, regroupement):
@@ -66,31 +61,27 @@ def traiter_fichier(fichier_path, intervalles, regroupement):
             lignes += 1
             try:
                 data = json.loads(line)
-                montant = convertir_montant(data.get("montant", ""))
-                nature = data.get("nature", "").strip()
-                texte = data.get("text", "")
-
-                if montant is None or not nature or not texte:
-                    continue
-
-                interval = get_interval(montant, intervalles)
-                if not interval:
-                    continue
-
-                regroupement[nature][interval].append(texte)
-                valides += 1
             except json.JSONDecodeError:
                 continue
+            valides += traiter_enregistrement(data, intervalles, regroupement)
+    print(f"  -> {valides}/{lignes} enregistrements valides ajoutés.")
+
+
+def traiter_store(store_dir, intervalles, regroupement):
+    print(f"Lecture du stockage en colonnes : {store_dir}")
+    lignes = 0
+    valides = 0
+    doublons = load_excluded_keys(FICHIER_DOUBLONS)
+    for data in merged_records(store_dir, DATE_DEBUT, DATE_FIN, excluded=doublons):
+        lignes += 1
+        valides += traiter_enregistrement(data, intervalles, regroupement)
     print(f"  -> {valides}/{lignes} enregistrements valides ajoutés.")
 
 
-def extraire_mots_uniques(textes):
+def extraire_mots_uniques(listes_tokens):
     mots = set()
-    for texte in textes:
-        texte = normalize_text(texte)
-        for mot in texte.split():
-            if mot not in STOPWORDS and len(mot) > 2:
-                mots.add(mot)
+    for tokens in listes_tokens:
+        mots.update(tokens)
     return sorted(mots)
 
 
@@ -103,27 +94,30 @@ def main():
 
     # Sauvegarder intervalles pour vérification
     with open(FICHIER_INTERVALS_OUT, "w", encoding="utf-8") as f_out:
-        json.dump([{"min": i[0], "max": i[1]} for i in intervalles], f_out, indent=2)
+        json.dump([{"min": i[0], "max": i[1]} for i in intervalles.intervals], f_out, indent=2)
 
     regroupement = defaultdict(lambda: defaultdict(list))
 
-    # Traiter tous les fichiers
-    fichiers = list(Path(DOSSIER_DATA).glob("data_nature_*.jsonl"))
-    if not fichiers:
-        print("Aucun fichier trouvé dans", DOSSIER_DATA)
-        return
+    if STORE_DIR:
+        traiter_store(STORE_DIR, intervalles, regroupement)
+    else:
+        # Traiter tous les fichiers
+        fichiers = list(Path(DOSSIER_DATA).glob("data_nature_*.jsonl"))
+        if not fichiers:
+            print("Aucun fichier trouvé dans", DOSSIER_DATA)
+            return
 
-    for fichier in fichiers:
-        traiter_fichier(fichier, intervalles, regroupement)
+        for fichier in fichiers:
+            traiter_fichier(fichier, intervalles, regroupement)
 
     # Pour chaque nature, stocker séparément les résultats
     for nature, interv_data in regroupement.items():
         print(f"Traitement de la nature : {nature}")
         resultats = {}
-        for interval, textes in interv_data.items():
-            mots_uniques = extraire_mots_uniques(textes)
+        for interval, listes_tokens in interv_data.items():
+            mots_uniques = extraire_mots_uniques(listes_tokens)
             if mots_uniques:  # Ne rien écrire si vide
-                resultats[interval] = mots_uniques
+                resultats[intervalles.label(interval)] = mots_uniques
 
         if resultats:
             nom_fichier = f"{nature.replace(' ', '_').replace('/', '_')}.json"
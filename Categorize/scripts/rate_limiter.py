@@ -0,0 +1,105 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Valeur de l'en-tête Retry-After (secondes ou date HTTP) -> secondes, ou None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def failure_signal(exc):
+    """
+    Extrait (code HTTP, Retry-After) d'une exception requests ou aiohttp.
+    Le code vaut None pour les erreurs réseau (timeout, connexion refusée...).
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+    return status, parse_retry_after(headers.get("Retry-After"))
+
+
+def is_throttle(status):
+    # 429, 5xx et erreurs réseau indiquent que le serveur sature
+    return status is None or status == 429 or status >= 500
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket partagé dont le débit suit un schéma AIMD : +increase req/s
+    à chaque réponse saine, x decrease sur 429/5xx/timeout (au plus une fois
+    par cooldown, pour qu'une rafale d'erreurs simultanées ne compte qu'une
+    fois). Un Retry-After suspend toutes les requêtes jusqu'à son échéance.
+    """
+
+    def __init__(self, initial_rate=4.0, min_rate=0.5, max_rate=20.0, increase=0.1,
+                 decrease=0.5, burst=1.0, cooldown=1.0, backoff_base=0.5, backoff_max=60.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.cooldown = cooldown
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_cut = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        # Réserve un jeton et renvoie l'attente nécessaire (le solde peut être négatif)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_failure(self, status=None, retry_after=None):
+        if not is_throttle(status):
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_cut >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.last_cut = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def retry_delay(self, attempt, retry_after=None):
+        # Backoff exponentiel avec "full jitter", jamais inférieur au Retry-After
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
@@ -0,0 +1,226 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Cache disque des réponses HTTP, pour ré-analyser hors ligne après une
+# correction des parseurs :
+#   <dossier>/cles/<sha256 de l'URL normalisée>.json -> {"url", "contenu", "date"}
+#   <dossier>/objets/<2 car.>/<sha256 du corps>.zst|.gz -> corps compressé
+# Les corps sont adressés par leur contenu : deux URLs qui renvoient la même
+# page (jours sans résultat, par exemple) ne la stockent qu'une fois.
+
+SUFFIX = ".zst" if zstandard else ".gz"
+
+
+def normalize_url(url):
+    """Clé stable d'une URL : schéma/hôte en minuscules, paramètres triés, sans fragment."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def compress(data):
+    if zstandard:
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def decompress(data, path):
+    if path.endswith(".zst"):
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def write_atomic(path, data):
+    # Écriture dans un fichier temporaire puis renommage : un lecteur (ou un
+    # crash) ne voit jamais de fichier à moitié écrit
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ResponseCache:
+    """
+    Cache des corps de réponse, par URL normalisée.
+
+    - directory=None : cache désactivé (get renvoie toujours None)
+    - ttl : durée de validité en secondes (None : pas d'expiration)
+    - replay=True : les scrapers ne lisent que le cache, sans aucune requête ;
+      le TTL est alors ignoré
+    - max_bytes : taille maximale des corps stockés, appliquée par evict()
+    - write_only=True : le cache n'est jamais lu, seulement alimenté (passe de
+      rafraîchissement, qui doit voir l'état actuel du site)
+    """
+
+    def __init__(self, directory=None, ttl=None, replay=False, max_bytes=None, write_only=False):
+        if replay and directory is None:
+            raise ValueError("Le mode replay nécessite un dossier de cache.")
+        self.directory = directory
+        self.ttl = ttl
+        self.replay = replay
+        self.max_bytes = max_bytes
+        self.write_only = write_only
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.stored = 0
+        if directory:
+            os.makedirs(os.path.join(directory, "cles"), exist_ok=True)
+            os.makedirs(os.path.join(directory, "objets"), exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def _key_path(self, url):
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "cles", f"{key}.json")
+
+    def _object_path(self, digest, suffix=SUFFIX):
+        return os.path.join(self.directory, "objets", digest[:2], digest + suffix)
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, url):
+        """Corps en cache pour cette URL, ou None (absent, expiré ou illisible)."""
+        if not self.enabled or self.write_only:
+            return None
+        try:
+            with open(self._key_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if not self.replay and self.ttl is not None and time.time() - entry["date"] > self.ttl:
+                raise LookupError("expiré")
+            path = os.path.join(self.directory, entry["contenu"])
+            with open(path, "rb") as f:
+                body = decompress(f.read(), path).decode("utf-8")
+        except (OSError, ValueError, KeyError, LookupError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return body
+
+    def put(self, url, body):
+        if not self.enabled or self.replay:
+            return
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, compress(data))
+        entry = {
+            "url": normalize_url(url),
+            "contenu": os.path.relpath(path, self.directory),
+            "date": time.time(),
+        }
+        write_atomic(self._key_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        self._count("stored")
+
+    def _entries(self):
+        keys_dir = os.path.join(self.directory, "cles")
+        for name in os.listdir(keys_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(keys_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    yield path, json.load(f)
+            except (OSError, ValueError):
+                yield path, None
+
+    def evict(self, max_age=None, max_bytes=None):
+        """
+        Supprime les clés plus vieilles que max_age secondes (défaut : le TTL),
+        puis les plus anciennes jusqu'à repasser sous max_bytes (défaut :
+        self.max_bytes), et enfin les corps qui ne sont plus référencés.
+        Renvoie le nombre de clés supprimées.
+        """
+        if not self.enabled:
+            return 0
+        max_age = self.ttl if max_age is None else max_age
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        removed = 0
+        kept = []
+        for path, entry in self._entries():
+            if entry is None or (max_age is not None and now - entry["date"] > max_age):
+                os.remove(path)
+                removed += 1
+            else:
+                kept.append((entry["date"], path, entry["contenu"]))
+
+        sizes = {}
+        for content in {c for _, _, c in kept}:
+            try:
+                sizes[content] = os.path.getsize(os.path.join(self.directory, content))
+            except OSError:
+                sizes[content] = 0
+        if max_bytes is not None:
+            kept.sort()
+            refs = {}
+            for _, _, content in kept:
+                refs[content] = refs.get(content, 0) + 1
+            total = sum(sizes.values())
+            evicted = 0
+            for _, path, content in kept:
+                if total <= max_bytes:
+                    break
+                os.remove(path)
+                evicted += 1
+                refs[content] -= 1
+                if refs[content] == 0:
+                    total -= sizes[content]
+            removed += evicted
+            kept = kept[evicted:]
+
+        referenced = {content for _, _, content in kept}
+        objects_dir = os.path.join(self.directory, "objets")
+        for root, _, files in os.walk(objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, self.directory) not in referenced:
+                    os.remove(path)
+        return removed
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stockes": self.stored, "replay": self.replay}
+
+    def close(self):
+        if self.enabled and not self.replay and self.max_bytes is not None:
+            self.evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_cache_args(parser):
+    parser.add_argument("--cache", metavar="DOSSIER", help="Cache disque des réponses HTTP")
+    parser.add_argument("--cache-ttl", type=float, metavar="HEURES",
+                        help="Durée de validité des réponses en cache (défaut : illimitée)")
+    parser.add_argument("--cache-max-mo", type=float, metavar="MO",
+                        help="Taille maximale du cache, les entrées les plus anciennes sont évincées en fin de run")
+    parser.add_argument("--replay", action="store_true",
+                        help="Ne lire que le cache, sans aucune requête (ré-analyse hors ligne)")
+
+
+def cache_from_args(args):
+    return ResponseCache(
+        args.cache,
+        ttl=args.cache_ttl * 3600 if args.cache_ttl is not None else None,
+        replay=args.replay,
+        max_bytes=int(args.cache_max_mo * 1024 * 1024) if args.cache_max_mo is not None else None,
+        write_only=getattr(args, "refresh", False),
+    )
@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class RetryQueue:
+    """
+    File de reprise différée. Pendant la passe principale, les workers ne font
+    que quelques tentatives puis déposent ici ce qui a échoué (pages, IDs) au
+    lieu de bloquer leur slot. drain() reprend ces éléments après la passe,
+    en plusieurs tours espacés d'un backoff exponentiel ; ce qui échoue encore
+    au dernier tour est écrit dans le fichier dead-letter.
+
+    Les éléments sont des dictionnaires JSON ({"type": "page", ...}).
+    """
+
+    def __init__(self, dead_letter_path, rounds=3, base_delay=10.0, max_delay=300.0):
+        self.dead_letter_path = dead_letter_path
+        self.rounds = rounds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.items = []
+        self.lock = threading.Lock()
+
+    def push(self, item):
+        with self.lock:
+            self.items.append(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def drain(self, retry_batch):
+        """
+        retry_batch(items) relance un tour complet ; les éléments qui échouent
+        de nouveau doivent être re-déposés avec push(). Renvoie les éléments
+        abandonnés (écrits dans le dead-letter).
+        """
+        for round_ in range(1, self.rounds + 1):
+            with self.lock:
+                items, self.items = self.items, []
+            if not items:
+                break
+            delay = min(self.max_delay, self.base_delay * 2 ** (round_ - 1))
+            print(f"⏳ Reprise différée {round_}/{self.rounds} : {len(items)} éléments dans {delay:.0f}s")
+            time.sleep(delay)
+            retry_batch(items)
+
+        with self.lock:
+            dead, self.items = self.items, []
+        if dead:
+            self.write_dead_letter(dead)
+        return dead
+
+    def write_dead_letter(self, items):
+        os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+        run = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps({**item, "run": run, "tours": self.rounds}, ensure_ascii=False) + "\n")
+        print(f"☠️  {len(items)} éléments abandonnés, listés dans {self.dead_letter_path}")
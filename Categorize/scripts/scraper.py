@@ -1,19 +1,36 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import time
-import random
 import os
 import json
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 from tqdm import tqdm
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from checkpoint import (
+    Checkpoint, DONE_STATUSES, STATUS_CHANGED, STATUS_FAILED, STATUS_OK, STATUS_PARTIAL, STATUS_UNCHANGED
+)
+from html_parsers import PARSERS
+from http_client import HTTP_ERRORS, HttpClient
+from metrics import metrics
+from parse_pool import ParsePool, cards_job, listing_job, pipeline
+from rate_limiter import AdaptiveRateLimiter, failure_signal
+from response_cache import ResponseCache, add_cache_args, cache_from_args
+from retry_queue import RetryQueue
 
 # --- Configuration ---
 MAX_WORKERS = 8
-RETRIES = 10
+RETRIES = 3  # tentatives par passe ; les échecs partent ensuite dans la file différée
+DEFERRED_ROUNDS = 3  # tours de reprise différée après la passe principale
+DEFERRED_DELAY = 10.0  # secondes avant le 1er tour, doublées à chaque tour
 TIMEOUT = 50
 PAGE_SIZE = 50
+RATE_LIMIT = 4.0  # requêtes/s au démarrage, ajusté ensuite selon les réponses
+HTTP2 = False
+PARSER = "bs4"  # ou "lxml" (XPath, plus rapide, mêmes résultats)
+PARSE_WORKERS = 4  # processus d'analyse HTML, indépendants des MAX_WORKERS threads I/O
+WINDOW_DAYS = 1  # jours interrogés en une seule recherche (1 : un jour par recherche)
+WINDOW_MAX_PAGES = 4  # au-delà, la fenêtre est coupée en deux
 
 BASE_URL = "https://www.marchespublics.gov.ma"
 SEARCH_URL = BASE_URL + "/bdc/entreprise/consultation/resultat"
@@ -37,145 +54,456 @@ FIXED_URL_PART_3 = (
 
 DAILY_DIR = "data_daily"
 os.makedirs(DAILY_DIR, exist_ok=True)
+CHECKPOINT_FILE = os.path.join(DAILY_DIR, "checkpoint_scraper.jsonl")
+DEAD_LETTER_FILE = os.path.join(DAILY_DIR, "dead_letter_scraper.jsonl")
 
 headers = {"User-Agent": "Mozilla/5.0"}
-session = requests.Session()
-session.headers.update(headers)
+client = HttpClient(pool_size=MAX_WORKERS, headers=headers, http2=HTTP2)
+limiter = AdaptiveRateLimiter(initial_rate=RATE_LIMIT)
+# Analyse dans le thread appelant tant que configure_parsing() n'a pas lancé
+# les processus (jamais au chargement du module, pour le spawn Windows)
+parse_pool = ParsePool(0, PARSER)
+# Désactivé par défaut, voir --cache / --replay
+cache = ResponseCache()
+# Pages et jours en échec, repris après la passe principale (drain_retry_queue)
+retry_queue = RetryQueue(DEAD_LETTER_FILE, rounds=DEFERRED_ROUNDS, base_delay=DEFERRED_DELAY)
 
 
-def get_max_page(date_str):
-    date_obj = datetime.strptime(date_str, "%d/%m/%Y")
-    date_formattee = date_obj.strftime("%Y-%m-%d")
+@lru_cache(maxsize=None)
+def window_search_url(start_str, end_str):
+    # Le formulaire accepte un intervalle quelconque : un jour = start == end
+    start = datetime.strptime(start_str, "%d/%m/%Y").strftime("%Y-%m-%d")
+    end = datetime.strptime(end_str, "%d/%m/%Y").strftime("%Y-%m-%d")
     query = (
         f"{FIXED_URL_PART_1}"
-        f"&search_consultation_resultats%5BdateLimitePublicationStart%5D={date_formattee}&"
-        f"search_consultation_resultats%5BdateLimitePublicationEnd%5D={date_formattee}"
+        f"&search_consultation_resultats%5BdateLimitePublicationStart%5D={start}&"
+        f"search_consultation_resultats%5BdateLimitePublicationEnd%5D={end}"
         f"{FIXED_URL_PART_2}"
         f"&search_consultation_resultats%5BnaturePrestation%5D="
         f"{FIXED_URL_PART_3}"
     )
-    url = f"{SEARCH_URL}?{query}"
-    print(url)
-    try:
-        res = session.get(url, timeout=TIMEOUT)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'lxml')
-        div = soup.find('div', class_='content__resultat')
-        if div:
-            match = re.search(r'Nombre de résultats\s*:\s*(\d+)', div.get_text(strip=True))
-            if match:
-                total = int(match.group(1))
-                pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-                return pages, total
-    except Exception as e:
-        print(f"[get_max_page] Erreur: {e}")
-    return 1, 0
-
-def extract_card_data(card):
-    try:
-        ref = card.select_one('.font-bold.table__links')
-        objet = card.select_one('[data-bs-toggle="tooltip"]')
-        buyer = card.find('span', string=lambda s: s and "Acheteur" in s)
-        pub_date = card.find('span', string=lambda s: s and "Date de publication" in s)
-
-        reference = ref.text.strip().replace('Référence :', '') if ref else None
-        obj = objet.text.strip().replace('Objet :', '') if objet else None
-        acheteur = buyer.parent.text.replace('Acheteur :', '').strip() if buyer else None
-        date_pub = pub_date.parent.text.replace('Date de publication du résultat :', '').strip() if pub_date else None
-
-        right = card.select_one('.entreprise__rightSubCard--top')
-        if right:
-            devis = right.find(string=lambda s: "Nombre de devis reçus" in s)
-            nombre_devis = right.select_one("span span.font-bold").text.strip() if devis else None
-
-            spans = right.find_all('span', recursive=False)
-            attribue = False
-            entreprise = montant = None
-
-            if len(spans) >= 3:
-                entreprise = spans[1].find('span', class_='font-bold')
-                montant = spans[2].find('span', class_='font-bold')
-                entreprise = entreprise.text.strip() if entreprise else None
-                montant = montant.text.strip() if montant else None
-                attribue = entreprise is not None
-
-            return {
-                "reference": reference,
-                "objet": obj,
-                "acheteur": acheteur,
-                "date_publication": date_pub,
-                "nombre_devis": nombre_devis,
-                "attribue": attribue,
-                "entreprise_attributaire": entreprise if attribue else None,
-                "montant": montant if attribue else None
-            }
-    except Exception as e:
-        print(f"[extract_card_data] Erreur: {e}")
-    return None
+    return f"{SEARCH_URL}?{query}"
 
-def fetch_page(page, date_str):
-    date_obj = datetime.strptime(date_str, "%d/%m/%Y")
-    date_formattee = date_obj.strftime("%Y-%m-%d")
-    query = (
-        f"{FIXED_URL_PART_1}"
-        f"&search_consultation_resultats%5BdateLimitePublicationStart%5D={date_formattee}&"
-        f"search_consultation_resultats%5BdateLimitePublicationEnd%5D={date_formattee}"
-        f"{FIXED_URL_PART_2}"
-        f"&search_consultation_resultats%5BnaturePrestation%5D="
-        f"{FIXED_URL_PART_3}"
-        f"&page={page}"
-    )
-    url = f"{SEARCH_URL}?{query}"
+
+def day_search_url(date_str):
+    return window_search_url(date_str, date_str)
+
+
+def build_search_url(date_str, page=None, end_str=None):
+    # L'URL de base du jour (ou de la fenêtre) n'est construite qu'une fois (cache)
+    base = window_search_url(date_str, end_str or date_str)
+    if page is None:
+        return base
+    return f"{base}&page={page}"
+
+
+def configure_parsing(parser_name=PARSER, workers=PARSE_WORKERS):
+    global parse_pool
+    parse_pool.close()
+    parse_pool = ParsePool(workers, parser_name)
+    return parse_pool
+
+
+def pages_from_listing(listing):
+    total, cards = listing
+    if total is None:
+        return 1, 0, cards
+    return (total + PAGE_SIZE - 1) // PAGE_SIZE, total, cards
+
+
+def parse_probe(html):
+    # Une seule analyse de la page 1 : nombre de résultats + cartes
+    return pages_from_listing(parse_pool.submit(listing_job, html).result())
+
+
+def fetch_html(url, page):
+    cached = cache.get(url)
+    if cached is not None:
+        return cached
+    if cache.replay:
+        print(f"[fetch_page] Page {page} absente du cache (replay) : {url}")
+        return None
     for attempt in range(RETRIES):
+        limiter.acquire()
         try:
-            time.sleep(random.uniform(0.25, 0.35))
-            res = session.get(url, timeout=TIMEOUT)
-            res.raise_for_status()
-            soup = BeautifulSoup(res.text, 'lxml')
-            cards = soup.select('.entreprise__card')
-            return [extract_card_data(card) for card in cards if card]
-        except requests.RequestException as e:
+            with metrics.span("requete"):
+                res = client.get(url, timeout=TIMEOUT)
+                res.raise_for_status()
+            limiter.on_success()
+            cache.put(url, res.text)
+            return res.text
+        except HTTP_ERRORS as e:
             print(f"[fetch_page] Tentative {attempt+1}/{RETRIES} - Erreur page {page}: {e}")
-            time.sleep(0.3)
-    return []
+            metrics.inc("reessais")
+            status, retry_after = failure_signal(e)
+            limiter.on_failure(status, retry_after)
+            time.sleep(limiter.retry_delay(attempt, retry_after))
+    return None
+
+def probe_day(date_str):
+    html = fetch_html(build_search_url(date_str, 1), 1)
+    if html is None:
+        return 1, 0, None
+    return parse_probe(html)
+
+def fetch_page(page, date_str):
+    # Étage I/O uniquement : l'analyse est confiée à parse_pool
+    return fetch_html(build_search_url(date_str, page), page)
+
+def results_path(date_str):
+    date_obj = datetime.strptime(date_str, "%d/%m/%Y")
+    file_date = date_obj.strftime("%Y-%m-%d")
+    return os.path.join(DAILY_DIR, f"attributed_{file_date}.json")
+
+def load_results(date_str):
+    path = results_path(date_str)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def save_results(data, date_str):
     attribues = [d for d in data if d and d['attribue']]
     if not attribues:
         print(f"❌ Aucune donnée attribuée trouvée pour {date_str}")
         return
-    date_obj = datetime.strptime(date_str, "%d/%m/%Y")
-    file_date = date_obj.strftime("%Y-%m-%d")
-    raw_path = os.path.join(DAILY_DIR, f"attributed_{file_date}.json")
-    with open(raw_path, 'w', encoding='utf-8') as f:
+    raw_path = results_path(date_str)
+    with metrics.span("ecriture"), open(raw_path, 'w', encoding='utf-8') as f:
         json.dump(attribues, f, ensure_ascii=False, indent=2)
     print(f"✅ {len(attribues)} consultations attribuées sauvegardées dans {raw_path}")
-    
-def scrape_day(date_str):
-    max_pages, total_results = get_max_page(date_str)
-    print(f"🔍 {total_results} résultats trouvés sur {max_pages} pages.")
-    all_data = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {
-            executor.submit(fetch_page, page, date_str): page
-            for page in range(1, max_pages + 1)
-        }
-        for future in tqdm(as_completed(futures), total=len(futures), desc="📄 Pages"):
-            result = future.result()
-            if result:
-                all_data.extend(result)
+
+def day_resume_plan(date_str, checkpoint=None, force=False):
+    """
+    Travail restant pour un jour d'après le checkpoint :
+    - None : jour déjà terminé, rien à faire
+    - [] : jour à scraper entièrement
+    - [p1, p2, ...] : seules ces pages avaient échoué au run précédent
+    """
+    if force:
+        return []
+    entry = checkpoint.get("jour", date_str) if checkpoint else None
+    if entry is None:
+        # Fichiers produits avant l'introduction du checkpoint
+        return None if os.path.exists(results_path(date_str)) else []
+    if entry["statut"] in DONE_STATUSES:
+        return None
+    if entry["statut"] == STATUS_PARTIAL:
+        return entry["pages_echec"]
+    return []
+
+def day_fingerprint(total_results, cards):
+    """
+    Empreinte d'un jour : nombre de résultats annoncé + hash des cartes de la
+    page 1. On hache les cartes extraites plutôt que le HTML brut, qui peut
+    varier d'une requête à l'autre (jetons, horodatages) sans que rien n'ait changé.
+    """
+    digest = hashlib.sha256(json.dumps(cards, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return {"resultats": total_results, "page1": digest.hexdigest()}
+
+def record_day(checkpoint, date_str, max_pages, all_data, failed_pages, fingerprint=None):
+    if checkpoint is None:
+        return
+    status = STATUS_PARTIAL if failed_pages else STATUS_OK
+    details = {"empreinte": fingerprint} if fingerprint else {}
+    checkpoint.record(
+        "jour", date_str, status,
+        pages=max_pages, enregistrements=len(all_data), pages_echec=sorted(failed_pages), **details
+    )
+
+def scrape_day(date_str, checkpoint=None, force=False, probe=None):
+    """
+    probe : résultat de probe_day déjà obtenu (rafraîchissement), pour ne pas
+    re-télécharger la page 1.
+    """
+    plan = day_resume_plan(date_str, checkpoint, force)
+    if plan is None:
+        print(f"⏭️  {date_str} déjà terminé, ignoré.")
+        return 0, 0
+    if plan:
+        # Reprise : seules les pages en échec sont refaites, le reste est relu sur disque
+        entry = checkpoint.get("jour", date_str)
+        max_pages, fingerprint = entry["pages"], entry.get("empreinte")
+        pages, all_data, requests_done = plan, load_results(date_str), 0
+        print(f"🔁 Reprise de {len(pages)} pages en échec sur {max_pages}.")
+    else:
+        requests_done = 0 if probe else 1
+        max_pages, total_results, all_data = probe or probe_day(date_str)
+        if all_data is None:
+            print(f"❌ Impossible de récupérer la première page pour {date_str}")
+            if checkpoint:
+                checkpoint.record("jour", date_str, STATUS_FAILED)
+            retry_queue.push({"type": "jour", "jour": date_str})
+            return 1, 0
+        print(f"🔍 {total_results} résultats trouvés sur {max_pages} pages.")
+        fingerprint = day_fingerprint(total_results, all_data)
+        # La page 1 est déjà analysée par probe_day : on ne répartit que 2..N
+        pages = range(2, max_pages + 1)
+    cards, failed_pages = fetch_day_pages(date_str, pages)
+    all_data.extend(cards)
     print(f'📊 Total des données extraites : {len(all_data)}')
     save_results(all_data, date_str)
+    record_day(checkpoint, date_str, max_pages, all_data, failed_pages, fingerprint)
+    defer_pages(date_str, failed_pages, max_pages)
+    return requests_done + len(pages), len(all_data)
 
-def loop_days(start_date_str, end_date_str):
+def fetch_day_pages(date_str, pages):
+    """Télécharge et analyse des pages d'un jour -> (cartes, pages en échec)."""
+    all_cards, failed_pages = [], []
+    stages = pipeline(
+        pages,
+        lambda page: fetch_page(page, date_str),
+        lambda html, page: parse_pool.submit(cards_job, html),
+        MAX_WORKERS,
+    )
+    for page, ok, cards in tqdm(stages, total=len(pages), desc="📄 Pages"):
+        if not ok:
+            failed_pages.append(page)
+        else:
+            all_cards.extend(cards)
+    return all_cards, failed_pages
+
+def defer_pages(date_str, pages, max_pages):
+    for page in pages:
+        retry_queue.push({"type": "page", "jour": date_str, "page": page, "pages": max_pages})
+
+def retry_failed_pages(date_str, pages, max_pages, checkpoint=None):
+    """Relance des pages en échec d'un jour déjà sauvegardé et fusionne leurs cartes dans son fichier."""
+    entry = checkpoint.get("jour", date_str) if checkpoint else None
+    cards, failed_pages = fetch_day_pages(date_str, pages)
+    all_data = load_results(date_str) + cards
+    save_results(all_data, date_str)
+    record_day(checkpoint, date_str, max_pages, all_data, failed_pages, entry and entry.get("empreinte"))
+    defer_pages(date_str, failed_pages, max_pages)
+
+def drain_retry_queue(checkpoint=None):
+    """Reprise différée des pages et jours en échec après la passe principale."""
+    def retry_batch(items):
+        pages_by_day = {}
+        for item in items:
+            if item["type"] == "jour":
+                print(f"\n📅 Reprise différée du jour : {item['jour']}")
+                scrape_day(item["jour"], checkpoint, force=True)
+            else:
+                pages_by_day.setdefault((item["jour"], item["pages"]), []).append(item["page"])
+        for (date_str, max_pages), pages in pages_by_day.items():
+            print(f"\n🔁 Reprise différée de {len(pages)} pages pour {date_str}")
+            retry_failed_pages(date_str, sorted(pages), max_pages, checkpoint)
+
+    if len(retry_queue):
+        retry_queue.drain(retry_batch)
+
+def refresh_day(date_str, checkpoint):
+    """
+    Re-vérifie un jour déjà terminé : une seule requête (page 1), puis toutes
+    les pages seulement si l'empreinte a changé. Les jours sans empreinte
+    (scrapés avant son introduction ou via une fenêtre) sont re-scrapés
+    entièrement une fois, ce qui enregistre leur empreinte.
+    """
+    entry = checkpoint.get("jour", date_str)
+    if entry is None or entry["statut"] not in DONE_STATUSES or not entry.get("empreinte"):
+        # Jour terminé sans empreinte : re-scrapé ; jour inachevé : reprise normale
+        done = entry is None or entry["statut"] in DONE_STATUSES
+        return scrape_day(date_str, checkpoint, force=done)
+    probe = probe_day(date_str)
+    max_pages, total_results, cards = probe
+    if cards is None:
+        print(f"❌ Impossible de récupérer la première page pour {date_str}, jour conservé tel quel.")
+        return 1, 0
+    if day_fingerprint(total_results, cards) == entry["empreinte"]:
+        print(f"⏭️  {date_str} inchangé ({total_results} résultats), pages non re-téléchargées.")
+        checkpoint.record("rafraichissement", date_str, STATUS_UNCHANGED, resultats=total_results)
+        return 1, 0
+    print(f"🔄 {date_str} modifié : {entry['empreinte']['resultats']} → {total_results} résultats.")
+    checkpoint.record("rafraichissement", date_str, STATUS_CHANGED, resultats=total_results)
+    requests_done, records = scrape_day(date_str, checkpoint, force=True, probe=probe)
+    return requests_done + 1, records
+
+def loop_refresh(start_date_str, end_date_str, checkpoint):
+    total_requests = total_records = 0
+    for date_str in iter_days(start_date_str, end_date_str):
+        print(f"\n📅 Rafraîchissement pour la date : {date_str}")
+        requests_done, records = refresh_day(date_str, checkpoint)
+        total_requests += requests_done
+        total_records += records
+    drain_retry_queue(checkpoint)
+    print(f"🗂️  Rafraîchissement : {checkpoint.summary('rafraichissement')}")
+    print(f"🔌 Connexions : {client.stats()}")
+    metrics.export(DAILY_DIR, "scraper")
+    return total_requests, total_records
+
+def iter_days(start_date_str, end_date_str):
     start_date = datetime.strptime(start_date_str, "%d/%m/%Y")
     end_date = datetime.strptime(end_date_str, "%d/%m/%Y")
     current_date = start_date
     while current_date <= end_date:
-        date_str = current_date.strftime('%d/%m/%Y')
-        print(f"\n📅 Scraping pour la date : {date_str}")
-        scrape_day(date_str)
+        yield current_date.strftime('%d/%m/%Y')
         current_date += timedelta(days=1)
 
+def loop_days(start_date_str, end_date_str, checkpoint=None, force=False):
+    total_pages = total_records = 0
+    for date_str in iter_days(start_date_str, end_date_str):
+        print(f"\n📅 Scraping pour la date : {date_str}")
+        pages, records = scrape_day(date_str, checkpoint, force)
+        total_pages += pages
+        total_records += records
+    drain_retry_queue(checkpoint)
+    if checkpoint:
+        print(f"🗂️  Checkpoint {checkpoint.path} : {checkpoint.summary('jour')}")
+    print(f"🔌 Connexions : {client.stats()}")
+    if cache.enabled:
+        print(f"🗄️  Cache : {cache.stats()}")
+    metrics.export(DAILY_DIR, "scraper")
+    return total_pages, total_records
+
+def card_day(card):
+    """Jour JJ/MM/AAAA d'une carte d'après sa date de publication du résultat, ou None."""
+    date_pub = card.get("date_publication")
+    if not date_pub:
+        return None
+    try:
+        return datetime.strptime(date_pub[:10], "%d/%m/%Y").strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+def split_by_day(cards, days):
+    """
+    Répartit les cartes attribuées d'une fenêtre entre ses jours. Renvoie None
+    si une carte attribuée ne se rattache à aucun jour de la fenêtre : on ne
+    peut alors pas produire les fichiers par jour à partir de cette recherche.
+    """
+    by_day = {day: [] for day in days}
+    for card in cards:
+        if not card or not card['attribue']:
+            continue
+        day = card_day(card)
+        if day not in by_day:
+            return None
+        by_day[day].append(card)
+    return by_day
+
+def scrape_window(days, checkpoint=None, force=False):
+    """
+    Scrape des jours consécutifs avec une seule recherche sur [premier, dernier].
+    Si la fenêtre dépasse WINDOW_MAX_PAGES pages (ou si une page échoue), elle
+    est coupée en deux et chaque moitié est traitée récursivement ; un jour
+    isolé passe par scrape_day. Si une carte ne peut être rattachée à un jour,
+    une recherche plus étroite n'y changerait rien : chaque jour est alors
+    scrapé directement. Renvoie (requêtes, enregistrements) comme scrape_day.
+    """
+    if len(days) == 1:
+        print(f"\n📅 Scraping pour la date : {days[0]}")
+        return scrape_day(days[0], checkpoint, force)
+    start, end = days[0], days[-1]
+    print(f"\n🪟 Fenêtre {start} → {end} ({len(days)} jours)")
+    requests_done = 1
+    html = fetch_html(build_search_url(start, 1, end), 1)
+    if html is not None:
+        max_pages, total_results, all_data = parse_probe(html)
+        print(f"🔍 {total_results} résultats trouvés sur {max_pages} pages.")
+        if max_pages <= WINDOW_MAX_PAGES:
+            pages = range(2, max_pages + 1)
+            failed = False
+            stages = pipeline(
+                pages,
+                lambda page: fetch_html(build_search_url(start, page, end), page),
+                lambda html, page: parse_pool.submit(cards_job, html),
+                MAX_WORKERS,
+            )
+            for page, ok, cards in stages:
+                if ok:
+                    all_data.extend(cards)
+                else:
+                    failed = True
+            requests_done += len(pages)
+            by_day = None if failed else split_by_day(all_data, days)
+            if not failed and by_day is None:
+                print(f"📆 Cartes non rattachables à un jour de {start} → {end} : scraping jour par jour.")
+                total_records = 0
+                for day in days:
+                    print(f"\n📅 Scraping pour la date : {day}")
+                    day_requests, day_records = scrape_day(day, checkpoint, force)
+                    requests_done += day_requests
+                    total_records += day_records
+                return requests_done, total_records
+            if by_day is not None:
+                for day in days:
+                    save_results(by_day[day], day)
+                    if checkpoint:
+                        checkpoint.record(
+                            "jour", day, STATUS_OK,
+                            enregistrements=len(by_day[day]), fenetre=f"{start}-{end}"
+                        )
+                return requests_done, len(all_data)
+    middle = len(days) // 2
+    print(f"✂️  Fenêtre {start} → {end} découpée en deux.")
+    left_requests, left_records = scrape_window(days[:middle], checkpoint, force)
+    right_requests, right_records = scrape_window(days[middle:], checkpoint, force)
+    return requests_done + left_requests + right_requests, left_records + right_records
+
+def plan_windows(start_date_str, end_date_str, checkpoint=None, force=False, window_days=WINDOW_DAYS):
+    """
+    Regroupe les jours à scraper entièrement en fenêtres d'au plus window_days
+    jours consécutifs. Les jours terminés ou à reprendre page par page restent
+    isolés (scrape_day les ignore ou les reprend) et coupent les fenêtres.
+    """
+    window = []
+    for date_str in iter_days(start_date_str, end_date_str):
+        if day_resume_plan(date_str, checkpoint, force) == []:
+            window.append(date_str)
+            if len(window) == window_days:
+                yield window
+                window = []
+            continue
+        if window:
+            yield window
+            window = []
+        yield [date_str]
+    if window:
+        yield window
+
+def loop_windows(start_date_str, end_date_str, checkpoint=None, force=False, window_days=WINDOW_DAYS):
+    total_requests = total_records = 0
+    for days in plan_windows(start_date_str, end_date_str, checkpoint, force, window_days):
+        requests_done, records = scrape_window(days, checkpoint, force)
+        total_requests += requests_done
+        total_records += records
+    drain_retry_queue(checkpoint)
+    if checkpoint:
+        print(f"🗂️  Checkpoint {checkpoint.path} : {checkpoint.summary('jour')}")
+    print(f"🔌 Connexions : {client.stats()}")
+    if cache.enabled:
+        print(f"🗄️  Cache : {cache.stats()}")
+    metrics.export(DAILY_DIR, "scraper")
+    return total_requests, total_records
+
+def parse_args(default_workers=MAX_WORKERS):
+    parser = argparse.ArgumentParser(description="Scraping des résultats de consultations attribuées")
+    parser.add_argument("start", nargs="?", default="06/07/2025", help="Date de début JJ/MM/AAAA")
+    parser.add_argument("end", nargs="?", default="12/07/2025", help="Date de fin JJ/MM/AAAA")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-scraper tous les jours de l'intervalle, même déjà terminés")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-vérifier les jours terminés et ne re-scraper que ceux dont "
+                             "l'empreinte (nombre de résultats + page 1) a changé")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Journal de reprise")
+    parser.add_argument("--parser", choices=sorted(PARSERS), default=PARSER, help="Backend d'analyse HTML")
+    parser.add_argument("--workers", type=int, default=default_workers, help="Requêtes I/O simultanées")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="Processus d'analyse HTML (0 : analyse dans les threads I/O)")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS,
+                        help="Jours par recherche, découpés si trop de résultats (1 : un jour par recherche)")
+    add_cache_args(parser)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    loop_days("06/07/2025", "12/07/2025")
+    args = parse_args()
+    MAX_WORKERS = args.workers
+    client = HttpClient(pool_size=MAX_WORKERS, headers=headers, http2=HTTP2)
+    cache = cache_from_args(args)
+    with configure_parsing(args.parser, args.parse_workers), Checkpoint(args.checkpoint) as checkpoint, cache:
+        if args.refresh:
+            loop_refresh(args.start, args.end, checkpoint)
+        elif args.window_days > 1:
+            loop_windows(args.start, args.end, checkpoint, args.force, args.window_days)
+        else:
+            loop_days(args.start, args.end, checkpoint, args.force)
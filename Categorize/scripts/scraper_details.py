@@ -1,112 +1,255 @@
-import requests
-from bs4 import BeautifulSoup
-import concurrent.futures
+import argparse
 import time
 import os
 import json
-import threading
+
+from checkpoint import Checkpoint, STATUS_EMPTY, STATUS_FAILED, STATUS_OK
+from columnar_store import read_columns, update_store
+from consultation_index import CONSULT_FILES, CONSULT_OUTPUT, INDEX_FILE, ConsultationIndex, open_lines
+from html_parsers import PARSERS
+from http_client import HTTP_ERRORS, HttpClient
+from metrics import metrics
+from ndjson_writer import COMPRESSION_SUFFIXES, NdjsonWriter
+from parse_pool import ParsePool, detail_job, pipeline
+from rate_limiter import AdaptiveRateLimiter, failure_signal
+from response_cache import ResponseCache, add_cache_args, cache_from_args
+from retry_queue import RetryQueue
 
 BASE_URL = "https://www.marchespublics.gov.ma/bdc/entreprise/consultation/show/"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
-MAX_RETRIES = 20
+MAX_RETRIES = 3  # tentatives par passe ; les échecs partent ensuite dans la file différée
+DEFERRED_ROUNDS = 3  # tours de reprise différée après la passe principale
+DEFERRED_DELAY = 10.0  # secondes avant le 1er tour, doublées à chaque tour
 TIMEOUT = 60
 MAX_WORKERS = 10
-
-lock = threading.Lock()
-output_path = os.path.join("data_daily", "consultations.ndjson")  # newline-delimited JSON
-
-def fetch_and_parse(id_):
+RATE_LIMIT = 4.0  # requêtes/s au démarrage, ajusté ensuite selon les réponses
+HTTP2 = False
+PARSER = "bs4"  # ou "lxml" (XPath, plus rapide, mêmes résultats)
+PARSE_WORKERS = 4  # processus d'analyse HTML, indépendants des MAX_WORKERS threads I/O
+MAX_IN_FLIGHT = 4 * MAX_WORKERS  # IDs téléchargés/analysés simultanément au maximum
+COMPRESSION = None  # ou "gzip" / "zstd" : consultations.ndjson.gz / .zst
+
+limiter = AdaptiveRateLimiter(initial_rate=RATE_LIMIT)
+# Un seul client pour tous les IDs : plus de handshake TCP+TLS par consultation
+client = HttpClient(pool_size=MAX_WORKERS, headers=HEADERS, http2=HTTP2)
+# Désactivé par défaut, voir --cache / --replay
+cache = ResponseCache()
+DAILY_DIR = "data_daily"
+output_path = CONSULT_OUTPUT  # newline-delimited JSON
+consult_files = CONSULT_FILES  # contient output_path et ses variantes compressées
+checkpoint_path = os.path.join(DAILY_DIR, "checkpoint_details.jsonl")
+dead_letter_path = os.path.join(DAILY_DIR, "dead_letter_details.jsonl")
+consult_index_path = INDEX_FILE
+
+def fetch_html(id_):
+    """Étage I/O : HTML brut de la page de détail, ou None après MAX_RETRIES échecs."""
     url = f"{BASE_URL}{id_}"
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    cached = cache.get(url)
+    if cached is not None:
+        return cached
+    if cache.replay:
+        print(f"[{id_}] Absent du cache (replay).")
+        return None
 
     for attempt in range(1, MAX_RETRIES + 1):
+        limiter.acquire()
         try:
-            response = session.get(url, timeout=TIMEOUT)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            h4 = soup.find("h4")
-            objet_tag = soup.find("span", class_="text-black")
-            if not h4 or not objet_tag:
-                print(f"[{id_}] Page sans contenu structuré.")
-                return None
-
-            reference = h4.text.strip()
-            objet = objet_tag.text.strip()
-
-            details = soup.find_all("div", class_="d-flex flex-column")
-            if len(details) < 6:
-                print(f"[{id_}] Détails incomplets.")
-                return None
-
-            acheteur = details[0].find_all("span")[1].text.strip()
-            date_mise_en_ligne = details[1].find_all("span")[1].text.strip()
-            date_limite = details[2].find_all("span")[1].text.strip()
-            lieu = details[3].find_all("span")[1].text.strip()
-            categorie = details[4].find_all("span")[1].text.strip()
-            nature = details[5].find_all("span")[1].text.strip()
-
-            articles = []
-            accordion_items = soup.find_all("div", class_="accordion-item")
-            for item in accordion_items:
-                titre = item.find("button", class_="accordion-button").get_text(strip=True)
-                sous_cartes = item.find_all("div", class_="content__article--subMiniCard")
-                quantite = sous_cartes[1].text.strip() if len(sous_cartes) > 1 else "N/A"
-                articles.append({
-                    "titre": titre,
-                    "quantité": quantite
-                })
-
-            return {
-                "id": id_,
-                "référence": reference,
-                "objet": objet,
-                "acheteur": acheteur,
-                "date_mise_en_ligne": date_mise_en_ligne,
-                "date_limite": date_limite,
-                "lieu": lieu,
-                "catégorie": categorie,
-                "nature": nature,
-                "articles": articles
-            }
-
-        except requests.RequestException as e:
+            with metrics.span("requete"):
+                response = client.get(url, timeout=TIMEOUT)
+                response.raise_for_status()
+            limiter.on_success()
+            cache.put(url, response.text)
+            return response.text
+
+        except HTTP_ERRORS as e:
             print(f"[{id_}] Échec tentative {attempt}: {e}")
-            time.sleep(1)
+            metrics.inc("reessais")
+            status, retry_after = failure_signal(e)
+            limiter.on_failure(status, retry_after)
+            time.sleep(limiter.retry_delay(attempt, retry_after))
 
     print(f"[{id_}] Abandon après {MAX_RETRIES} tentatives.")
     return None
 
 
-def write_result(result):
-    with lock:
-        with open(output_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(result, ensure_ascii=False) + "\n")
-
-
-def main():
-    os.makedirs("data_daily", exist_ok=True)
-    # Si fichier existe, on le vide d'abord
-    open(output_path, "w", encoding="utf-8").close()
-
-    start_id = 215533
-    end_id = 219782
+def handle_parsed(id_, parsed, checkpoint, writer):
+    consultation, reason = parsed
+    if consultation is None:
+        print(f"[{id_}] {reason}")
+        checkpoint.record("id", id_, STATUS_EMPTY)
+        return STATUS_EMPTY
+    # L'ID n'est marqué "ok" qu'une fois sa ligne fsyncée par le writer
+    writer.write(consultation, on_durable=lambda: checkpoint.record("id", id_, STATUS_OK))
+    return STATUS_OK
+
+
+def attributed_ids(daily_dir=DAILY_DIR, store_dir=None):
+    """
+    IDs de détail référencés par les cartes des fichiers attributed_*.json.
+    Avec store_dir, le stockage en colonnes est mis à jour puis seule sa
+    colonne id_consultation est lue.
+    """
+    if store_dir:
+        update_store(daily_dir, store_dir)
+        column = read_columns(store_dir, ["id_consultation"])["id_consultation"]
+        ids = sorted({int(i) for i in column if i > 0})  # -1 : ID absent
+        print(f"🔗 {len(ids)} IDs de détail référencés dans {store_dir}")
+        return ids
+    ids = set()
+    files = sorted(f for f in os.listdir(daily_dir) if f.startswith("attributed_") and f.endswith(".json"))
+    for filename in files:
+        with open(os.path.join(daily_dir, filename), "r", encoding="utf-8") as f:
+            try:
+                records = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"[⚠️] Erreur de lecture JSON dans {filename} : {e}")
+                continue
+        ids.update(r["id_consultation"] for r in records if r and r.get("id_consultation"))
+    print(f"🔗 {len(ids)} IDs de détail référencés dans {len(files)} fichiers attributed_*.json")
+    return sorted(ids)
+
+
+def update_consultation_index():
+    """Ajoute les consultations écrites à l'index de jointure de fusionner.py."""
+    with ConsultationIndex(consult_index_path) as index:
+        added = index.update(consult_files)
+    print(f"📚 {added} consultations ajoutées à l'index {consult_index_path}")
+
+
+def read_consultations(path):
+    """Consultations d'un fichier écrit par NdjsonWriter (lignes complètes uniquement)."""
+    with open_lines(path) as f:
+        for raw in f:
+            if not raw.endswith(b"\n") or not raw.strip():
+                continue
+            try:
+                yield json.loads(raw)
+            except json.JSONDecodeError as e:
+                print(f"[⚠️] Ligne illisible dans {path} : {e}")
+
+
+def swap_in_forced(compression):
+    """
+    --force écrit dans output_path + ".force" : ses consultations remplacent
+    ensuite celles de même ID dans output_path (réécrit puis remplacé d'un
+    coup), au lieu de s'y ajouter en double.
+    """
+    suffix = COMPRESSION_SUFFIXES[compression]
+    forced, target = output_path + ".force" + suffix, output_path + suffix
+    if not os.path.exists(forced):
+        return
+    forced_ids = {c.get("id") for c in read_consultations(forced)}
+    merged_path = output_path + ".tmp" + suffix
+    if os.path.exists(merged_path):
+        os.remove(merged_path)  # réécriture interrompue : on recommence
+    replaced = 0
+    with NdjsonWriter(output_path + ".tmp", compression) as merged:
+        if os.path.exists(target):
+            for consultation in read_consultations(target):
+                if consultation.get("id") in forced_ids:
+                    replaced += 1
+                else:
+                    merged.write(consultation)
+        for consultation in read_consultations(forced):
+            merged.write(consultation)
+    os.replace(merged_path, target)
+    os.remove(forced)
+    print(f"♻️  {len(forced_ids)} consultations re-téléchargées, {replaced} anciennes lignes remplacées dans {target}")
+
+
+def main(ids, force=False, parser_name=PARSER, parse_workers=PARSE_WORKERS,
+         max_in_flight=MAX_IN_FLIGHT, compression=COMPRESSION):
+    os.makedirs(DAILY_DIR, exist_ok=True)
     valid_count = 0
+    skipped = 0
+    retry_queue = RetryQueue(dead_letter_path, rounds=DEFERRED_ROUNDS, base_delay=DEFERRED_DELAY)
+    # Run --force interrompu avant le remplacement : ses lignes sont déjà marquées "ok"
+    for leftover in COMPRESSION_SUFFIXES:
+        swap_in_forced(leftover)
+
+    with Checkpoint(checkpoint_path) as checkpoint, \
+            ParsePool(parse_workers, parser_name) as parse_pool, \
+            NdjsonWriter(output_path + ".force" if force else output_path, compression) as writer:
+        def pending_ids():
+            # Reprise : on ne refait que les IDs absents du checkpoint ou en échec.
+            # Générateur : rien n'est matérialisé pour tout l'intervalle.
+            nonlocal skipped
+            for i in ids:
+                if force or not checkpoint.is_done("id", i):
+                    yield i
+                else:
+                    skipped += 1
+
+        def process(ids_):
+            # Les threads I/O téléchargent, les processus de parse_pool analysent ;
+            # au plus max_in_flight IDs sont en cours à la fois
+            nonlocal valid_count
+            stages = pipeline(
+                ids_,
+                fetch_html,
+                lambda html, id_: parse_pool.submit(detail_job, html, id_),
+                MAX_WORKERS,
+                max_in_flight,
+            )
+            for id_, ok, parsed in stages:
+                if not ok:
+                    # Pas de nouvelles tentatives ici : l'ID sera repris après la passe
+                    checkpoint.record("id", id_, STATUS_FAILED)
+                    retry_queue.push({"type": "id", "cle": id_})
+                elif handle_parsed(id_, parsed, checkpoint, writer) == STATUS_OK:
+                    valid_count += 1
+                    print(f"[{id_}] ✅")
+
+        process(pending_ids())
+        print(f"🗂️  {skipped} IDs déjà traités ignorés.")
+        retry_queue.drain(lambda items: process(item["cle"] for item in items))
+    # Après fermeture du writer : tous les "ok" sont enregistrés
+    print(f"🗂️  Checkpoint {checkpoint.path} : {checkpoint.summary('id')}")
+    print(f"💾 {writer.lines_written} lignes écrites en {writer.batches_written} lots dans {writer.path}")
+    if force:
+        swap_in_forced(compression)
+    if output_path + COMPRESSION_SUFFIXES[compression] not in consult_files:
+        print(f"[⚠️] {output_path} n'est pas dans la liste des fichiers de consultations indexés")
+    update_consultation_index()
+    print(f"🔌 Connexions : {client.stats()}")
+    if cache.enabled:
+        print(f"🗄️  Cache : {cache.stats()}")
+    metrics.export(DAILY_DIR, "details")
+    print(f"\n✅ Total consultations valides récupérées : {valid_count}")
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_id = {executor.submit(fetch_and_parse, i): i for i in range(start_id, end_id + 1)}
-
-        for future in concurrent.futures.as_completed(future_to_id):
-            result = future.result()
-            if result:
-                write_result(result)
-                valid_count += 1
-                print(f"[{result['id']}] ✅")
 
-    print(f"\n✅ Total consultations valides récupérées : {valid_count}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scraping des pages de détail des consultations")
+    parser.add_argument("--start-id", type=int,
+                        help="Parcourir tout un intervalle d'IDs (ex. 215533) au lieu des IDs "
+                             "référencés dans les fichiers attributed_*.json")
+    parser.add_argument("--end-id", type=int, help="Fin de l'intervalle d'IDs (ex. 219782)")
+    parser.add_argument("--store", help="Lire les IDs dans ce stockage en colonnes (voir columnar_store.py)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-télécharger les IDs sélectionnés, même déjà traités "
+                             "(leurs anciennes lignes sont remplacées)")
+    parser.add_argument("--parser", choices=sorted(PARSERS), default=PARSER, help="Backend d'analyse HTML")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Threads I/O")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="Processus d'analyse HTML (0 : analyse dans les threads I/O)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Fenêtre d'IDs en cours (défaut : 4 x workers)")
+    parser.add_argument("--compression", choices=[c for c in COMPRESSION_SUFFIXES if c], default=COMPRESSION,
+                        help="Écrire consultations.ndjson compressé")
+    add_cache_args(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    MAX_WORKERS = args.workers
+    client = HttpClient(pool_size=MAX_WORKERS, headers=HEADERS, http2=HTTP2)
+    cache = cache_from_args(args)
+    if args.start_id is not None and args.end_id is not None:
+        ids = range(args.start_id, args.end_id + 1)
+    else:
+        # Par défaut : uniquement les consultations qui ont un résultat attribué
+        ids = attributed_ids(store_dir=args.store)
+    with cache:
+        main(ids, args.force, args.parser, args.parse_workers,
+             args.max_in_flight or 4 * MAX_WORKERS, args.compression)
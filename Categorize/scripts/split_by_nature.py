@@ -1,41 +1,232 @@
+import argparse
+import hashlib
 import json
 import os
+import shutil
 
-# Charger les données
-with open("merged.jsonl", "r", encoding="utf-8") as f:
-    data = [json.loads(line) for line in f]
-
-# Dictionnaire pour regrouper par nature
-nature_dict = {}
-nature_id_map = {}
-current_id = 1
-
-# Regrouper les éléments par nature
-for item in data:
-    nature = item.get("nature", "").strip()
-    
-    if not nature:
-        continue  # Ignore les éléments sans nature
-    
-    if nature not in nature_dict:
-        nature_dict[nature] = []
-        nature_id_map[nature] = {"id": current_id, "count": 0}
-        current_id += 1
-    
-    nature_dict[nature].append(item)
-    nature_id_map[nature]["count"] += 1
-
-# Sauvegarder chaque groupe dans un fichier séparé
-for nature, items in nature_dict.items():
-    file_id = nature_id_map[nature]["id"]
-    filename = f"../data/natures_new/data_nature_{file_id}.jsonl"
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        for item in items:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-# Sauvegarder le mapping des natures
-with open("../data/natures_new/natures.json", "w", encoding="utf-8") as f:
-    json.dump(nature_id_map, f, ensure_ascii=False, indent=2)
-
-print(f"{len(nature_dict)} fichiers créés (un par nature). Détails dans natures.json")
+# Répartit un fichier JSONL fusionné en un fichier data_nature_<id>.jsonl par
+# nature, en flux : une ligne lue, une ligne mise dans le tampon de sa nature,
+# et les tampons sont vidés en fin de fichier ou dès qu'ils dépassent
+# BUFFER_LINES lignes. La mémoire ne dépend plus de la taille de l'entrée.
+# Les ids viennent du registre natures.json, relu à chaque exécution : une
+# nature garde son id d'un run à l'autre, une nouvelle nature prend le
+# suivant. Avec --ajouter, les lignes sont ajoutées aux fichiers existants
+# au lieu de tout réécrire ; un fichier d'entrée déjà ajouté (même contenu,
+# reconnu à son empreinte SHA-256) est ignoré.
+# Un ajout est transactionnel : la taille de chaque fichier de nature, le
+# registre et les sources d'avant l'ajout sont notés dans natures_en_cours.json.
+# Si le run échoue ou est interrompu, les fichiers sont tronqués à ces
+# tailles et le registre restauré (tout de suite, ou au run suivant).
+# Une réécriture complète (sans --ajouter) écrit dans REWRITE_DIR : les
+# fichiers de nature ne sont remplacés qu'une fois l'entrée entièrement lue.
+# Usage : python split_by_nature.py merged.jsonl
+#         python split_by_nature.py merged_outputs/merged_output_strict_montant_2025-07-15.jsonl --ajouter
+
+# --- Configuration ---
+INPUT_FILE = "merged.jsonl"
+OUTPUT_DIR = "../data/natures_new"
+REGISTRY_FILE = "natures.json"  # nature -> {"id", "count"}, dans OUTPUT_DIR
+SOURCES_FILE = "natures_sources.json"  # empreinte -> fichier déjà ajouté avec --ajouter
+PENDING_FILE = "natures_en_cours.json"  # état d'avant l'ajout en cours
+REWRITE_DIR = "reecriture.tmp"  # sous-dossier de OUTPUT_DIR, réécriture complète en cours
+BUFFER_LINES = 1000  # lignes en attente par nature avant écriture
+MAX_BUFFERED = 50000  # lignes en attente, toutes natures confondues
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def nature_path(output_dir, file_id):
+    return os.path.join(output_dir, f"data_nature_{file_id}.jsonl")
+
+
+def file_digest(path):
+    """Empreinte SHA-256 du contenu : indépendante du chemin et de la date de modification."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def begin(output_dir, registry, sources):
+    """Note l'état d'avant l'ajout : taille des fichiers de nature, registre et sources."""
+    positions = {}
+    for entry in registry.values():
+        path = nature_path(output_dir, entry["id"])
+        positions[str(entry["id"])] = os.path.getsize(path) if os.path.exists(path) else 0
+    save_json(os.path.join(output_dir, PENDING_FILE),
+              {"positions": positions, "registre": registry, "sources": sources})
+
+
+def commit(output_dir, registry, sources):
+    save_json(os.path.join(output_dir, REGISTRY_FILE), registry)
+    save_json(os.path.join(output_dir, SOURCES_FILE), sources)
+    os.remove(os.path.join(output_dir, PENDING_FILE))
+
+
+def rollback(output_dir):
+    """Annule un ajout inachevé ; renvoie False s'il n'y en avait pas."""
+    pending_path = os.path.join(output_dir, PENDING_FILE)
+    pending = load_json(pending_path, None)
+    if pending is None:
+        return False
+    positions = pending["positions"]
+    for name in os.listdir(output_dir):
+        if not (name.startswith("data_nature_") and name.endswith(".jsonl")):
+            continue
+        file_id = name[len("data_nature_"):-len(".jsonl")]
+        path = os.path.join(output_dir, name)
+        if file_id in positions:
+            with open(path, "r+b") as f:
+                f.truncate(positions[file_id])
+        else:
+            os.remove(path)  # nature apparue pendant l'ajout annulé
+    save_json(os.path.join(output_dir, REGISTRY_FILE), pending["registre"])
+    save_json(os.path.join(output_dir, SOURCES_FILE), pending["sources"])
+    os.remove(pending_path)
+    return True
+
+
+class NatureSplitter:
+    def __init__(self, output_dir, registry):
+        self.output_dir = output_dir
+        self.registry = registry
+        self.next_id = max((entry["id"] for entry in registry.values()), default=0) + 1
+        self.buffers = {}
+        self.buffered = 0
+
+    def file_id(self, nature):
+        entry = self.registry.get(nature)
+        if entry is None:
+            entry = self.registry[nature] = {"id": self.next_id, "count": 0}
+            self.next_id += 1
+        return entry["id"]
+
+    def add(self, nature, line):
+        file_id = self.file_id(nature)
+        buffer = self.buffers.setdefault(file_id, [])
+        buffer.append(line)
+        self.registry[nature]["count"] += 1
+        self.buffered += 1
+        if len(buffer) >= BUFFER_LINES:
+            self.flush(file_id)
+        elif self.buffered >= MAX_BUFFERED:
+            self.flush(max(self.buffers, key=lambda i: len(self.buffers[i])))
+
+    def flush(self, file_id):
+        buffer = self.buffers.pop(file_id, [])
+        if buffer:
+            # Ouverture en ajout à chaque vidage : pas de descripteur ouvert par nature
+            with open(nature_path(self.output_dir, file_id), "a", encoding="utf-8") as f:
+                f.writelines(buffer)
+            self.buffered -= len(buffer)
+
+    def close(self):
+        for file_id in list(self.buffers):
+            self.flush(file_id)
+
+
+def split_lines(input_file, splitter):
+    written = 0
+    with open(input_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            nature = (item.get("nature") or "").strip()
+            if not nature:
+                continue  # Ignore les éléments sans nature
+            splitter.add(nature, line if line.endswith("\n") else line + "\n")
+            written += 1
+    splitter.close()
+    return written
+
+
+def rewrite(input_file, output_dir, rewrite_dir, registry, source_key):
+    """
+    Réécriture complète : les ids sont conservés, les fichiers écrits dans
+    rewrite_dir puis mis en place ; en cas d'échec les sorties précédentes
+    restent intactes.
+    """
+    for entry in registry.values():
+        entry["count"] = 0
+    os.makedirs(rewrite_dir)
+    try:
+        written = split_lines(input_file, NatureSplitter(rewrite_dir, registry))
+    except BaseException:
+        shutil.rmtree(rewrite_dir, ignore_errors=True)
+        raise
+    for entry in registry.values():
+        new_path = nature_path(rewrite_dir, entry["id"])
+        if not os.path.exists(new_path):
+            open(new_path, "w", encoding="utf-8").close()  # nature absente de l'entrée : vidée
+        os.replace(new_path, nature_path(output_dir, entry["id"]))
+    os.rmdir(rewrite_dir)
+    save_json(os.path.join(output_dir, REGISTRY_FILE), registry)
+    save_json(os.path.join(output_dir, SOURCES_FILE), {source_key: os.path.abspath(input_file)})
+    return written
+
+
+def split(input_file=INPUT_FILE, output_dir=OUTPUT_DIR, append=False):
+    """Répartit input_file par nature ; renvoie le nombre de lignes écrites, ou None si déjà ajouté."""
+    os.makedirs(output_dir, exist_ok=True)
+    if rollback(output_dir):
+        print(f"↩️  Ajout interrompu annulé dans {output_dir}")
+    registry = load_json(os.path.join(output_dir, REGISTRY_FILE), {})
+    sources = load_json(os.path.join(output_dir, SOURCES_FILE), {})
+
+    for path, known in list(sources.items()):
+        if isinstance(known, list):
+            # Ancien format chemin -> [mtime, taille] : empreinte si le fichier est inchangé
+            del sources[path]
+            if os.path.exists(path) and [os.stat(path).st_mtime, os.stat(path).st_size] == known:
+                sources[file_digest(path)] = path
+    source_key = file_digest(input_file)
+    if append and source_key in sources:
+        return None
+    rewrite_dir = os.path.join(output_dir, REWRITE_DIR)
+    shutil.rmtree(rewrite_dir, ignore_errors=True)  # réécriture interrompue
+    if not append:
+        return rewrite(input_file, output_dir, rewrite_dir, registry, source_key)
+
+    begin(output_dir, registry, sources)
+    splitter = NatureSplitter(output_dir, registry)
+    try:
+        written = split_lines(input_file, splitter)
+    except BaseException:
+        rollback(output_dir)
+        raise
+
+    sources = {**sources, source_key: os.path.abspath(input_file)}
+    commit(output_dir, registry, sources)
+    return written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Répartition d'un fichier fusionné par nature")
+    parser.add_argument("entree", nargs="?", default=INPUT_FILE, help="Fichier JSONL à répartir")
+    parser.add_argument("--sortie", default=OUTPUT_DIR, help="Dossier des fichiers data_nature_<id>.jsonl")
+    parser.add_argument("--ajouter", action="store_true",
+                        help="Ajouter aux fichiers existants au lieu de tout réécrire")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    written = split(args.entree, args.sortie, args.ajouter)
+    if written is None:
+        print(f"⏭️  {args.entree} a déjà été ajouté, rien à faire.")
+    else:
+        registry = load_json(os.path.join(args.sortie, REGISTRY_FILE), {})
+        print(f"{written} lignes réparties, {len(registry)} natures. Détails dans {REGISTRY_FILE}")
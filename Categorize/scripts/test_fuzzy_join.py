@@ -0,0 +1,33 @@
+from fuzzy_join import THRESHOLD, BlockingIndex
+
+# Consultations (clés nettoyées reference, objet, acheteur) de l'index de jointure
+KEYS = [
+    ("25/2025", "FOURNITURE DE MATERIEL INFORMATIQUE", "COMMUNE DE RABAT"),
+    ("", "TRAVAUX D'ENTRETIEN DU RESEAU D'ECLAIRAGE", "COMMUNE DE FES"),
+]
+
+
+def record(reference, objet, acheteur):
+    return {"reference": reference, "objet": objet, "acheteur": acheteur}
+
+
+def test_reference_differente_non_appariee():
+    """Objet et acheteur identiques mais références non vides différentes : pas de jointure."""
+    index = BlockingIndex(KEYS)
+    key, score, _ = index.best_match(record(" 26/2025", "Fourniture de matériel informatique", "Commune de Rabat"))
+    assert key is None or score < THRESHOLD
+
+
+def test_meme_reference_appariee():
+    index = BlockingIndex(KEYS)
+    key, score, _ = index.best_match(record("25 / 2025", "Fourniture materiel informatique", "Commune de Rabat"))
+    assert key == KEYS[0] and score >= THRESHOLD
+
+
+def test_reference_absente_appariee_sur_objet_et_acheteur():
+    """Une référence vide d'un côté ne vaut ni concordance ni désaccord."""
+    index = BlockingIndex(KEYS)
+    key, score, _ = index.best_match(record("", "Fourniture de materiel informatique.", "Commune de Rabat"))
+    assert key == KEYS[0] and score >= THRESHOLD
+    key, score, _ = index.best_match(record("12/2025", "Travaux d'entretien du reseau d'eclairage", "Commune de Fes"))
+    assert key == KEYS[1] and score >= THRESHOLD
@@ -0,0 +1,68 @@
+import unicodedata
+from functools import lru_cache
+from string import punctuation
+
+# Normalisation et tokenisation partagées par canonical.py,
+# process_old_data_natures.py et predict_new_data.py.
+# Même résultat que l'ancien enchaînement NFD -> encode("ascii", "ignore") ->
+# re.sub(rf"[{punctuation}]", " ") -> re.sub(r"\s+", " "), sans regex : la
+# ponctuation est remplacée par bytes.translate avec une table de 256 octets
+# construite une fois, et la décomposition NFD n'est faite que pour les
+# textes non ASCII. La liste de mots vides NLTK est chargée une seule fois.
+
+# --- Configuration ---
+MIN_TOKEN_LENGTH = 3
+BATCH_SEPARATOR = "\x00"  # ni ponctuation ni espace : survit à la normalisation
+
+# Classe rf"[{punctuation}]" des anciens normaliseurs : "\]" y échappe le
+# crochet, la barre oblique inverse n'en fait donc pas partie
+PUNCTUATION = punctuation.replace("\\", "")
+PUNCTUATION_TABLE = bytes.maketrans(PUNCTUATION.encode("ascii"), b" " * len(PUNCTUATION))
+
+
+def fold(text):
+    """Minuscules, sans accents ni caractères non ASCII, ponctuation -> espaces (espaces non réduits)."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFD", text)
+    return text.encode("ascii", "ignore").translate(PUNCTUATION_TABLE).decode("ascii")
+
+
+@lru_cache(maxsize=None)
+def stopwords_fr():
+    # nltk n'est nécessaire que pour calculer des tokens
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words("french"))
+
+
+def normalize(text):
+    """Minuscules, sans accents, ponctuation remplacée par des espaces."""
+    return " ".join(fold(text or "").split())
+
+
+def tokens_of(normalized, stopwords=None):
+    """Mots d'un texte déjà normalisé, sans mots vides ni mots courts (ordre d'apparition)."""
+    stop = stopwords_fr() if stopwords is None else stopwords
+    return list(dict.fromkeys(t for t in normalized.split() if t not in stop and len(t) >= MIN_TOKEN_LENGTH))
+
+
+def tokenize(text, stopwords=None):
+    return tokens_of(fold(text or ""), stopwords)
+
+
+def fold_batch(texts):
+    """fold() sur une liste : le lot entier est replié en un seul appel."""
+    texts = [text or "" for text in texts]
+    joined = BATCH_SEPARATOR.join(texts)
+    if joined.count(BATCH_SEPARATOR) != len(texts) - 1:
+        return [fold(text) for text in texts]  # séparateur présent dans un texte
+    return fold(joined).split(BATCH_SEPARATOR)
+
+
+def normalize_batch(texts):
+    return [" ".join(folded.split()) for folded in fold_batch(texts)]
+
+
+def tokenize_batch(texts, stopwords=None):
+    stop = stopwords_fr() if stopwords is None else stopwords
+    return [tokens_of(folded, stop) for folded in fold_batch(texts)]
@@ -4,7 +4,8 @@ import os
 from unidecode import unidecode
 
 # Charger le modèle spaCy pour le français
-nlp = spacy.load('fr_core_news_sm')
+# Seuls le morphologizer et le lemmatizer servent : parser et ner désactivés
+nlp = spacy.load('fr_core_news_sm', disable=["parser", "ner"])
 
 # Mots vides à exclure
 stop_words = set(nlp.Defaults.stop_words)
@@ -26,15 +27,15 @@ def process_category_file(file_path, fields_to_use):
 
     all_words = []
 
+    combined_texts = []
     for item in data:
         # Concaténer les champs spécifiés
         texts = [item.get(field, "") for field in fields_to_use if isinstance(item.get(field, ""), str)]
         combined_text = " ".join(texts)
-        combined_text = normalize_text(combined_text)
-
-        # Traitement NLP avec spaCy
-        doc = nlp(combined_text)
+        combined_texts.append(normalize_text(combined_text))
 
+    # Traitement NLP avec spaCy, par lots plutôt qu'un appel nlp() par élément
+    for doc in nlp.pipe(combined_texts, batch_size=256):
         # Lemmatisation + filtrage
         words = [token.lemma_ for token in doc
                  if token.lemma_ not in stop_words
@@ -16,6 +16,7 @@ def categorize_data(input_file):
         data = json.load(f)
 
     amounts = [item['montant'] for item in data]
+    amounts_array = np.asarray(amounts, dtype=np.float64)
 
     for r in range(3, 101):
         if len(amounts) < r:
@@ -29,15 +30,10 @@ def categorize_data(input_file):
         # Initialiser les catégories
         categories = {f'categorie_{i+1:02d}': [] for i in range(r)}
 
-        # Répartition
-        for item in data:
-            amount = item['montant']
-            category_index = 0
-            for i, threshold in enumerate(thresholds):
-                if amount <= threshold:
-                    category_index = i
-                    break
-                category_index = r - 1
+        # Répartition : premier seuil >= montant (recherche dichotomique sur toute la colonne),
+        # r - 1 au-delà du dernier seuil
+        category_indices = np.searchsorted(thresholds, amounts_array, side='left')
+        for item, category_index in zip(data, category_indices.tolist()):
             category_name = f'categorie_{category_index+1:02d}'
             categories[category_name].append(item)
 
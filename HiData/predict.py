@@ -5,7 +5,8 @@ from pathlib import Path
 import statistics
 
 # Charger modèle spaCy
-nlp = spacy.load("fr_core_news_sm")
+# Seuls le morphologizer et le lemmatizer servent : parser et ner désactivés
+nlp = spacy.load("fr_core_news_sm", disable=["parser", "ner"])
 stop_words = set(nlp.Defaults.stop_words)
 
 def preprocess(text):
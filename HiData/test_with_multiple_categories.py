@@ -4,7 +4,8 @@ from unidecode import unidecode
 from pathlib import Path
 
 # Charger modèle spaCy français
-nlp = spacy.load("fr_core_news_sm")
+# Seuls le morphologizer et le lemmatizer servent : parser et ner désactivés
+nlp = spacy.load("fr_core_news_sm", disable=["parser", "ner"])
 stop_words = set(nlp.Defaults.stop_words)
 
 def preprocess(text):